@@ -0,0 +1,91 @@
+"""
+Admission control for the LLM stage
+At most ADMISSION_MAX_CONCURRENCY requests run the provider chain at once and at most
+ADMISSION_MAX_QUEUE wait for a slot. Anything beyond that - or waiting longer than
+ADMISSION_QUEUE_TIMEOUT_SECONDS - is shed and served a degraded answer right away.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import tracing
+from config import ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS
+from observability import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED, ADMISSION_WAIT
+
+_semaphore: Optional[asyncio.Semaphore] = None  # created on first use, inside the server's event loop
+_in_flight = 0
+_queued = 0
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(ADMISSION_MAX_CONCURRENCY)
+    return _semaphore
+
+async def acquire() -> Optional[str]:
+    """
+    Wait for an LLM stage slot
+
+    Returns:
+        None once admitted (call release() when done), otherwise the shed reason
+        ("queue_full" or "queue_timeout")
+    """
+    global _in_flight, _queued
+    semaphore = _get_semaphore()
+    if not semaphore.locked():
+        await semaphore.acquire()  # free slot: returns without suspending
+        ADMISSION_WAIT.observe(0)
+    elif _queued >= ADMISSION_MAX_QUEUE:
+        ADMISSION_SHED.labels(reason="queue_full").inc()
+        return "queue_full"
+    else:
+        start = time.time()
+        _queued += 1
+        ADMISSION_QUEUE_DEPTH.set(_queued)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            ADMISSION_SHED.labels(reason="queue_timeout").inc()
+            return "queue_timeout"
+        finally:
+            _queued -= 1
+            ADMISSION_QUEUE_DEPTH.set(_queued)
+            ADMISSION_WAIT.observe((time.time() - start) * 1000)
+
+    _in_flight += 1
+    ADMISSION_IN_FLIGHT.set(_in_flight)
+    return None
+
+def release() -> None:
+    global _in_flight
+    _in_flight -= 1
+    ADMISSION_IN_FLIGHT.set(_in_flight)
+    _get_semaphore().release()
+
+@asynccontextmanager
+async def slot():
+    """
+    async with admission.slot() as shed_reason: ...
+
+    shed_reason is None when the request was admitted to the LLM stage.
+    """
+    with tracing.span("admission_wait"):
+        shed_reason = await acquire()
+    if shed_reason:
+        logging.warning(f"Load shedding ({shed_reason}): {_in_flight} in flight, {_queued} queued")
+    try:
+        yield shed_reason
+    finally:
+        if shed_reason is None:
+            release()
+
+def stats() -> dict:
+    return {
+        "in_flight": _in_flight,
+        "queued": _queued,
+        "max_concurrency": ADMISSION_MAX_CONCURRENCY,
+        "max_queue": ADMISSION_MAX_QUEUE,
+        "queue_timeout_seconds": ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    }
@@ -0,0 +1,132 @@
+"""
+Asynchronous audit log sink
+Requests only enqueue a record; a background thread writes batches of JSON lines,
+rotates the file by size/age, gzips rotated files and keeps a bounded number of them
+"""
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from config import (
+    AUDIT_LOG_PATH, AUDIT_SAMPLE_RATE, AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL_SECONDS,
+    AUDIT_MAX_FIELD_CHARS, AUDIT_ROTATE_BYTES, AUDIT_ROTATE_SECONDS, AUDIT_BACKUP_COUNT, AUDIT_COMPRESS,
+)
+
+_queue: "queue.Queue[dict]" = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_opened_at = time.time()
+
+def _count(result: str, n: int = 1) -> None:
+    try:
+        from observability import AUDIT_RECORDS
+        AUDIT_RECORDS.labels(result=result).inc(n)
+    except Exception:
+        pass
+
+def _truncate(value):
+    if isinstance(value, str) and len(value) > AUDIT_MAX_FIELD_CHARS:
+        return value[:AUDIT_MAX_FIELD_CHARS] + f"... [{len(value) - AUDIT_MAX_FIELD_CHARS} chars truncated]"
+    return value
+
+def submit(record: dict, always: bool = False) -> bool:
+    """
+    Queue an audit record without blocking
+
+    Args:
+        record: JSON-serializable fields (long strings are truncated)
+        always: Bypass sampling (errors, guardrail interventions)
+
+    Returns:
+        True if the record was queued
+    """
+    if not always and AUDIT_SAMPLE_RATE < 1.0 and random.random() >= AUDIT_SAMPLE_RATE:
+        _count("sampled_out")
+        return False
+    _ensure_started()
+    entry = {"ts": datetime.now().isoformat(), **{k: _truncate(v) for k, v in record.items()}}
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        _count("dropped")
+        return False
+    return True
+
+def _ensure_started() -> None:
+    global _thread
+    if _thread is None:
+        with _lock:
+            if _thread is None:
+                _thread = threading.Thread(target=_run, name="audit-writer", daemon=True)
+                _thread.start()
+
+def _run() -> None:
+    while True:
+        batch = [_queue.get()]
+        deadline = time.time() + AUDIT_FLUSH_INTERVAL_SECONDS
+        while len(batch) < AUDIT_BATCH_SIZE:
+            try:
+                batch.append(_queue.get(timeout=max(0.0, deadline - time.time())))
+            except queue.Empty:
+                break
+        _write(batch)
+        for _ in batch:
+            _queue.task_done()
+
+def _write(batch: list) -> None:
+    try:
+        from observability import AUDIT_QUEUE_DEPTH
+        AUDIT_QUEUE_DEPTH.set(_queue.qsize())
+    except Exception:
+        pass
+    try:
+        os.makedirs(os.path.dirname(AUDIT_LOG_PATH), exist_ok=True)
+        _maybe_rotate()
+        with open(AUDIT_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry, default=str, ensure_ascii=False) + "\n" for entry in batch))
+        _count("written", len(batch))
+    except Exception as e:
+        _count("failed", len(batch))
+        logging.error(f"Audit write failed ({len(batch)} records lost): {e}")
+
+def _maybe_rotate() -> None:
+    global _opened_at
+    try:
+        size = os.path.getsize(AUDIT_LOG_PATH)
+    except OSError:
+        _opened_at = time.time()
+        return
+    if size < AUDIT_ROTATE_BYTES and time.time() - _opened_at < AUDIT_ROTATE_SECONDS:
+        return
+    base, ext = os.path.splitext(AUDIT_LOG_PATH)
+    rotated = f"{base}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{ext}"
+    os.replace(AUDIT_LOG_PATH, rotated)
+    _opened_at = time.time()
+    if AUDIT_COMPRESS:
+        with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+    # keep only the newest AUDIT_BACKUP_COUNT rotated files
+    for old in sorted(glob.glob(f"{base}-*{ext}*"))[:-AUDIT_BACKUP_COUNT or None]:
+        os.remove(old)
+    logging.info(f"Audit log rotated ({size} bytes)")
+
+def flush(timeout: float = 5.0) -> None:
+    """Wait (bounded) for queued records to be written, e.g. at shutdown"""
+    if _thread is None:
+        return
+    end = time.time() + timeout
+    while _queue.unfinished_tasks and time.time() < end:
+        time.sleep(0.05)
+
+atexit.register(flush)
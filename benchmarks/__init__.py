@@ -0,0 +1,8 @@
+"""
+Offline benchmark suite
+Runs the pipeline against fake LLM, embedding and search providers (no network, no
+API keys) and compares stage and end-to-end latency percentiles with a stored baseline.
+
+    python -m benchmarks.run                     # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --update-baseline   # record a new baseline
+"""
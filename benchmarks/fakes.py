@@ -0,0 +1,174 @@
+"""
+Deterministic stand-ins for the network providers
+Each fake sleeps for a latency drawn from a seeded distribution and returns a canned
+answer, so benchmark runs are repeatable and measure our own overhead around the calls.
+
+Latency specs: "fixed:MS", "uniform:LO,HI", "lognormal:MEDIAN,SIGMA" (all milliseconds
+except SIGMA).
+"""
+import hashlib
+import math
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import List
+
+_ANSWER = ("Plywood Studio stocks Centuryply, Sainik and Greenply boards in BWP, BWR and MR grades "
+           "from 4mm to 25mm; visit our Goshamahal showroom for current rates. ({source})")
+
+class Latency:
+    """Seeded latency sampler (thread-safe)"""
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, args = spec.partition(":")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        if kind not in ("fixed", "uniform", "lognormal") or len(self.args) != {"fixed": 1, "uniform": 2, "lognormal": 2}[kind]:
+            raise ValueError(f"Invalid latency spec {spec!r} (use fixed:MS, uniform:LO,HI or lognormal:MEDIAN,SIGMA)")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._random.uniform(*self.args)
+            median, sigma = self.args
+            return self._random.lognormvariate(math.log(median), sigma)
+
+    def sleep(self) -> None:
+        time.sleep(self.sample_ms() / 1000.0)
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class FakeOpenAIClient:
+    """Implements the slice of openai.OpenAI used by llm_client_openai"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            with_raw_response=SimpleNamespace(create=self._create)))
+
+    def _create(self, model: str, messages: list, max_tokens: int = 256, **kwargs):
+        self.latency.sleep()
+        prompt = "".join(m["content"] for m in messages)
+        content = _ANSWER.format(source=f"fake {model}")
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=_tokens(prompt), completion_tokens=_tokens(content),
+                                  total_tokens=_tokens(prompt) + _tokens(content),
+                                  prompt_tokens_details=SimpleNamespace(cached_tokens=0)),
+        )
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+class FakeInferenceClient:
+    """Implements InferenceClient.chat_completion as used by llm_client_huggingface and hf_warmer"""
+
+    latency: Latency = None  # shared by every instance (llm_client_huggingface keeps per-timeout clients)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def chat_completion(self, messages: list, model: str, max_tokens: int = 256, **kwargs):
+        FakeInferenceClient.latency.sleep()
+        prompt = "".join(m["content"] for m in messages)
+        content = _ANSWER.format(source=f"fake {model}")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=_tokens(prompt), completion_tokens=_tokens(content)),
+        )
+
+def fake_search(latency: Latency, engine: str):
+    """Replacement for web_search._search_with_<engine>"""
+    def search(query: str, num_results: int = 3) -> List[dict]:
+        latency.sleep()
+        return [{"title": f"{query} - result {i}", "snippet": f"Specifications and features for {query} ({engine} #{i}).",
+                 "url": f"https://example.com/{engine}/{i}", "engine": engine}
+                for i in range(num_results)]
+    return search
+
+def fake_embeddings(latency: Latency, dimensions: int = 64):
+    """Hash-based deterministic embeddings (a langchain Embeddings subclass)"""
+    from langchain_core.embeddings import Embeddings
+
+    def vector(text: str) -> List[float]:
+        digest = hashlib.sha256(text.lower().encode("utf-8")).digest()
+        return [((digest[i % len(digest)] + i) % 256) / 255.0 for i in range(dimensions)]
+
+    class FakeEmbeddings(Embeddings):
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            latency.sleep()
+            return [vector(t) for t in texts]
+
+        def embed_query(self, text: str) -> List[float]:
+            latency.sleep()
+            return vector(text)
+
+    return FakeEmbeddings()
+
+def fake_chat_model(latency: Latency):
+    """A langchain chat model returning the canned answer after the sampled latency"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class FakeChatModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "benchmark-fake"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            latency.sleep()
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=_ANSWER.format(source="fake rag")))])
+
+    return FakeChatModel()
+
+def install(llm: Latency, search: Latency, embed: Latency) -> List[str]:
+    """
+    Patch the provider modules with fakes; call after the environment is configured
+
+    Returns the names of the providers that were faked (RAG needs langchain/faiss).
+    """
+    installed = []
+    import llm_client_openai
+    llm_client_openai.client = FakeOpenAIClient(llm)
+    installed.append("openai")
+
+    import llm_client_huggingface
+    FakeInferenceClient.latency = llm
+    llm_client_huggingface.InferenceClient = FakeInferenceClient
+    llm_client_huggingface.HF_CLIENT = FakeInferenceClient()
+    llm_client_huggingface._deadline_clients.clear()
+    installed.append("huggingface")
+
+    import web_search
+    web_search._search_with_duckduckgo = lambda query, num_results=3: fake_search(search, "duckduckgo")(query, num_results)
+    web_search._search_with_serper = fake_search(search, "serper")
+    installed.append("web_search")
+
+    try:
+        # patch langchain_openai before rag_system binds the names: its import auto-initializes
+        # the index, which must embed with the fakes rather than call OpenAI
+        import langchain_openai
+        make_embeddings = lambda **kwargs: fake_embeddings(embed)
+        make_chat_model = lambda **kwargs: fake_chat_model(llm)
+        langchain_openai.OpenAIEmbeddings = make_embeddings
+        langchain_openai.ChatOpenAI = make_chat_model
+        already_imported = "rag_system" in sys.modules
+        import rag_system
+        rag_system.OpenAIEmbeddings = make_embeddings
+        rag_system.ChatOpenAI = make_chat_model
+        if already_imported:
+            rag_system.initialize_rag_system()  # rebuild the index with the fakes
+        installed.append("rag")
+    except ImportError:
+        pass
+
+    import http_pool
+    http_pool.prewarm = lambda *args, **kwargs: None
+    return installed
@@ -0,0 +1,303 @@
+"""
+Offline pipeline benchmarks
+Measures per-stage micro-benchmarks, run_pipeline and /chat end to end (throughput and
+p50/p95/p99, plus per-stage percentiles from the request traces) with every network
+provider replaced by the fakes in benchmarks/fakes.py, then compares the results with
+benchmarks/baseline.json.
+
+    python -m benchmarks.run [--iterations 50] [--concurrency 4] [--provider openai|huggingface]
+                             [--llm-latency lognormal:300,0.3] [--update-baseline]
+
+Exit status: 0 ok, 1 regression beyond the thresholds, 2 baseline recorded with other settings.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLDS = {
+    "latency_ratio": 0.25,    # p50/p95/p99 may grow by this share...
+    "min_delta_ms": 5.0,      # ...and by at least this much (ignores scheduler jitter on ms-scale stages)
+    "throughput_ratio": 0.20, # throughput may drop by this share
+}
+
+QUESTIONS = [
+    "What is marine plywood and where is it used?",
+    "Tell me about Centuryply Club Prime",
+    "What are the specifications of Greenply BWP plywood?",
+    "Price of 18mm BWP plywood",
+    "What doors do you have?",
+    "Compare Sainik and Greenply for kitchen cabinets",
+    "Which laminate finish is best for a wardrobe?",
+    "What sizes does Sainik MR plywood come in?",
+    "Do you sell door hardware?",
+    "What is the difference between BWR and MR grade?",
+]
+
+def _configure_environment(args) -> None:
+    """Point every provider at the fakes before any repo module reads its config"""
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark-fake",
+        "HUGGINGFACE_API_KEY": "benchmark-fake",
+        "SERPER_API_KEY": "benchmark-fake",
+        "USE_HUGGINGFACE": "true" if args.provider == "huggingface" else "false",
+        "EXECUTION_MODE": args.execution_mode,
+        "ADAPTIVE_ORDERING": "false",  # keep the provider order fixed between runs
+        "HF_WARMER_ENABLED": "false",
+        "REDIS_URL": "redis://127.0.0.1:1/0",  # unreachable: always the in-memory cache
+        "OPENAI_RPM_LIMIT": "1000000", "OPENAI_TPM_LIMIT": "1000000000",
+        "HUGGINGFACE_RPM_LIMIT": "1000000", "HUGGINGFACE_TPM_LIMIT": "1000000000",
+        "AUDIT_LOG_PATH": os.path.join(tempfile.mkdtemp(prefix="benchmark-audit-"), "audit.jsonl"),
+        "PROFILE_MODE": "off",
+    })
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+def summarize(latencies_ms: List[float], wall_seconds: float) -> dict:
+    return {
+        "count": len(latencies_ms),
+        "throughput_rps": round(len(latencies_ms) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+    }
+
+def _stage_summary(per_request: List[Dict[str, float]]) -> dict:
+    stages = {}
+    for durations in per_request:
+        for name, duration in durations.items():
+            stages.setdefault(name, []).append(duration)
+    return {name: {k: v for k, v in summarize(values, 1.0).items() if k != "throughput_rps"}
+            for name, values in sorted(stages.items())}
+
+def _run_concurrently(fn: Callable[[int], dict], iterations: int, concurrency: int):
+    """Run fn(i) for each iteration; returns (results, wall seconds)"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as pool:
+        results = list(pool.map(fn, range(iterations)))
+    return results, time.perf_counter() - started
+
+def bench_stages(iterations: int) -> dict:
+    """Micro-benchmarks of the CPU-only stages"""
+    import catalogue
+    import conversation
+    import prompts
+    from business_chatbot import get_relevant_context
+    from cache_store import get as cache_get, set as cache_set
+    from guardrails import apply_guardrails, is_business_related
+    from postprocess import secure_output
+
+    history = [("user", QUESTIONS[0]), ("assistant", "Marine plywood is BWP grade plywood for wet areas.")]
+    answer = "Call us on 98765 43210 or mail sales@example.com for Centuryply Club Prime rates."
+    stages = {
+        "guardrail_check": lambda q: is_business_related(q),
+        "context_build": lambda q: prompts.render("chat", context=get_relevant_context(q),
+                                                  history=conversation.format_history(history), question=q),
+        "catalogue": lambda q: catalogue.answer(q),
+        "cache_roundtrip": lambda q: (cache_set(f"benchmark:{q}", answer, 60), cache_get(f"benchmark:{q}")),
+        "postprocess": lambda q: secure_output(apply_guardrails(answer)),
+    }
+    results = {}
+    for name, fn in stages.items():
+        latencies = []
+        started = time.perf_counter()
+        for i in range(iterations):
+            begin = time.perf_counter()
+            fn(QUESTIONS[i % len(QUESTIONS)])
+            latencies.append((time.perf_counter() - begin) * 1000)
+        results[name] = summarize(latencies, time.perf_counter() - started)
+    return results
+
+def _clear_caches(warm: bool) -> None:
+    import cache_store
+    if not warm:
+        cache_store._client.clear()
+
+def bench_pipeline(iterations: int, concurrency: int, warm: bool) -> dict:
+    """cli_interface.run_pipeline end to end"""
+    import contextvars
+    import tracing
+    import usage
+    from cli_interface import run_pipeline
+
+    def one(i: int) -> dict:
+        question = QUESTIONS[i % len(QUESTIONS)]
+        _clear_caches(warm)
+        ctx = contextvars.copy_context()  # each run gets its own trace/usage context
+        begin = time.perf_counter()
+        answer = ctx.run(run_pipeline, question)
+        elapsed = (time.perf_counter() - begin) * 1000
+        stages = {}
+        for record in ctx.run(tracing.spans):
+            stages[record["name"]] = stages.get(record["name"], 0.0) + record["duration_ms"]
+        return {"ms": elapsed, "stages": stages, "route": ctx.run(usage.current)["route"],
+                "error": answer.startswith("Error")}
+
+    runs, wall = _run_concurrently(one, iterations, concurrency)
+    return _end_to_end(runs, wall)
+
+def bench_chat(iterations: int, concurrency: int, warm: bool) -> dict:
+    """POST /chat through the ASGI app (admission control, guardrails, cache, audit)"""
+    from fastapi.testclient import TestClient
+    from business_chatbot import app
+
+    def stages_from(header: str) -> Dict[str, float]:
+        stages = {}
+        for part in filter(None, (p.strip() for p in header.split(","))):
+            name, _, duration = part.partition(";dur=")
+            if name != "total" and duration:
+                stages[name] = float(duration)
+        return stages
+
+    with TestClient(app) as client:  # one event loop for every request (admission control is loop-bound)
+        def one(i: int) -> dict:
+            _clear_caches(warm)
+            begin = time.perf_counter()
+            response = client.post("/chat", json={"message": QUESTIONS[i % len(QUESTIONS)], "user_id": f"benchmark-{i}"})
+            elapsed = (time.perf_counter() - begin) * 1000
+            body = response.json() if response.status_code == 200 else {}
+            return {"ms": elapsed, "stages": stages_from(response.headers.get("server-timing", "")),
+                    "route": (body.get("usage") or {}).get("route"),
+                    "error": response.status_code != 200 or "technical difficulties" in body.get("response", "")}
+
+        runs, wall = _run_concurrently(one, iterations, concurrency)
+    return _end_to_end(runs, wall)
+
+def _end_to_end(runs: List[dict], wall: float) -> dict:
+    result = summarize([run["ms"] for run in runs], wall)
+    result["errors"] = sum(run["error"] for run in runs)
+    routes = {}
+    for run in runs:
+        routes[run["route"] or "none"] = routes.get(run["route"] or "none", 0) + 1
+    result["routes"] = routes
+    result["stages"] = _stage_summary([run["stages"] for run in runs])
+    return result
+
+def compare(results: dict, baseline: dict, thresholds: dict) -> List[str]:
+    """Human-readable regressions of results against baseline results"""
+    regressions = []
+
+    def check(label: str, current: dict, previous: dict) -> None:
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            now, then = current.get(metric), previous.get(metric)
+            if now is None or then is None:
+                continue
+            if now > then * (1 + thresholds["latency_ratio"]) and now - then > thresholds["min_delta_ms"]:
+                regressions.append(f"{label} {metric}: {then:.2f} -> {now:.2f}")
+        now, then = current.get("throughput_rps"), previous.get("throughput_rps")
+        # same noise floor as latency: sub-ms stages swing by large ratios between runs
+        if (now and then and now < then * (1 - thresholds["throughput_ratio"])
+                and 1000.0 / now - 1000.0 / then > thresholds["min_delta_ms"]):
+            regressions.append(f"{label} throughput_rps: {then:.2f} -> {now:.2f}")
+
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        if scenario == "stages":
+            for stage, stats in current.items():
+                if stage in previous:
+                    check(f"stages.{stage}", stats, previous[stage])
+            continue
+        check(scenario, current, previous)
+        for stage, stats in current.get("stages", {}).items():
+            if stage in previous.get("stages", {}):
+                check(f"{scenario}.{stage}", stats, previous["stages"][stage])
+    return regressions
+
+def _print_results(results: dict) -> None:
+    row = "{:<34} {:>7} {:>10} {:>10} {:>10} {:>10}"
+    print(row.format("benchmark", "count", "rps", "p50 ms", "p95 ms", "p99 ms"))
+    for scenario, result in results.items():
+        entries = result.items() if scenario == "stages" else [(scenario, result)] + [
+            (f"  {scenario}.{stage}", stats) for stage, stats in result["stages"].items()]
+        for name, stats in entries:
+            label = f"stages.{name}" if scenario == "stages" else name
+            print(row.format(label, stats["count"], stats.get("throughput_rps", ""), stats["p50_ms"],
+                             stats["p95_ms"], stats["p99_ms"]))
+        if scenario != "stages":
+            print(f"  errors: {result['errors']}, routes: {result['routes']}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks with fake providers")
+    parser.add_argument("--iterations", type=int, default=50, help="Runs per benchmark")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent run_pipeline / /chat calls")
+    parser.add_argument("--scenarios", default="stages,pipeline,chat", help="Comma-separated: stages, pipeline, chat")
+    parser.add_argument("--provider", choices=("openai", "huggingface"), default="openai", help="Provider chain to exercise")
+    parser.add_argument("--execution-mode", choices=("sequential", "hedged"), default="sequential")
+    parser.add_argument("--llm-latency", default="lognormal:300,0.3", help="Fake LLM latency spec")
+    parser.add_argument("--search-latency", default="lognormal:150,0.4", help="Fake web search latency spec")
+    parser.add_argument("--embed-latency", default="fixed:5", help="Fake embedding latency spec")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warm-cache", action="store_true", help="Keep response/web caches between runs")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    _configure_environment(args)
+    logging.basicConfig(level=logging.WARNING)
+    from benchmarks import fakes
+    faked = fakes.install(fakes.Latency(args.llm_latency, args.seed), fakes.Latency(args.search_latency, args.seed + 1),
+                          fakes.Latency(args.embed_latency, args.seed + 2))
+    import web_search
+    web_search.SERPER_API_KEY = "benchmark-fake"  # race both (fake) engines like production with a Serper key
+    print(f"Fake providers: {', '.join(faked)}")
+
+    settings = {key: getattr(args, key) for key in ("iterations", "concurrency", "provider", "execution_mode",
+                                                    "llm_latency", "search_latency", "embed_latency", "seed", "warm_cache")}
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    results = {}
+    if "stages" in scenarios:
+        results["stages"] = bench_stages(args.iterations)
+    if "pipeline" in scenarios:
+        results["pipeline"] = bench_pipeline(args.iterations, args.concurrency, args.warm_cache)
+    if "chat" in scenarios:
+        results["chat"] = bench_chat(args.iterations, args.concurrency, args.warm_cache)
+    _print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+
+    if args.update_baseline:
+        thresholds = DEFAULT_THRESHOLDS
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                thresholds = json.load(f).get("thresholds", DEFAULT_THRESHOLDS)  # keep tuned thresholds
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "thresholds": thresholds, "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet, run with --update-baseline to record one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print(f"Baseline was recorded with different settings, not comparing: {baseline.get('settings')}")
+        return 2
+    regressions = compare(results, baseline["results"], {**DEFAULT_THRESHOLDS, **baseline.get("thresholds", {})})
+    if regressions:
+        print("❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
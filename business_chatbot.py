@@ -1,17 +1,34 @@
 # Modern ChatGPT-style Plywood Studio Chatbot
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Response
 from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import time, uuid, logging
+import time, uuid, logging, contextvars
 import uvicorn
 from datetime import datetime
 
 # Use the working components
 from cache_store import get as cache_get, set as cache_set
-from llm_client_langchain import call as llm_call
+from llm_client_langchain import call as llm_call, degraded_answer
 from postprocess import secure_output
 from guardrails import apply_guardrails, is_business_related
-from config import CACHE_TTL_SECONDS
+from config import CACHE_TTL_SECONDS, REQUEST_DEADLINE_SECONDS, ADMIN_TOKEN, ADAPTIVE_ORDERING, TRACEMALLOC_TOP_N
+from config import USE_HUGGINGFACE, HUGGINGFACE_API_KEY, HUGGINGFACE_DEFAULT_MODEL, HUGGINGFACE_FALLBACK_MODEL, HF_WARMER_ENABLED
+import deadline
+import provider_stats
+import rate_limits
+import hf_warmer
+import http_pool
+import knowledge_base
+import prompts
+import usage
+import conversation
+import admission
+import tracing
+import profiling
+import memory_report
+from observability import record_metric, log as audit_log, REQUESTS_IN_FLIGHT
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 app = FastAPI(
     title="🏗️ Plywood Studio AI Assistant",
@@ -19,14 +36,25 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+async def warm_up():
+    """Pre-warm provider connections, start watching the knowledge base file and keep HF models warm"""
+    http_pool.prewarm()
+    knowledge_base.start_watcher()
+    if USE_HUGGINGFACE and HUGGINGFACE_API_KEY and HF_WARMER_ENABLED:
+        hf_warmer.start([HUGGINGFACE_DEFAULT_MODEL, HUGGINGFACE_FALLBACK_MODEL])
+
 class ChatMessage(BaseModel):
     message: str
     user_id: str | None = None
+    session_id: str | None = None  # conversation memory key (no memory without one)
 
 class ChatResponse(BaseModel):
     response: str
     timestamp: str
     response_time_ms: int
+    usage: dict | None = None  # tokens, estimated cost and answering route for this request
+    cached: bool = False  # answered from the response cache
 
 @app.get("/", response_class=HTMLResponse)
 async def chat_interface():
@@ -475,6 +503,10 @@ async def chat_interface():
             document.getElementById('typingIndicator').style.display = 'none';
         }
         
+        // One conversation per browser tab
+        const sessionId = sessionStorage.getItem('sessionId') || (crypto.randomUUID ? crypto.randomUUID() : String(Date.now()) + Math.random().toString(16).slice(2));
+        sessionStorage.setItem('sessionId', sessionId);
+        
         async function sendMessage() {
             const input = document.getElementById('chatInput');
             const sendButton = document.getElementById('sendButton');
@@ -501,7 +533,8 @@ async def chat_interface():
                     },
                     body: JSON.stringify({
                         message: message,
-                        user_id: 'web-user'
+                        user_id: 'web-user',
+                        session_id: sessionId
                     })
                 });
                 
@@ -537,112 +570,141 @@ async def chat_interface():
 """
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(message: ChatMessage):
+async def chat_endpoint(message: ChatMessage, response: Response,
+                        x_profile: str | None = Header(default=None),
+                        x_admin_token: str | None = Header(default=None)):
     """Enhanced chat endpoint with plywood business focus"""
     start_time = time.time()
+    deadline.start(REQUEST_DEADLINE_SECONDS)
+    usage.start()
+    tracing.start()
+    REQUESTS_IN_FLIGHT.inc()
     
     try:
         # Check if question is business-related first
-        if not is_business_related(message.message):
+        with tracing.span("guardrail_check"):
+            business_related = is_business_related(message.message)
+        if not business_related:
             logging.warning(f"Off-topic question rejected: {message.message}")
             processing_time = int((time.time() - start_time) * 1000)
+            audit_log(message.message, None, None, guardrail_output="off_topic_rejected",
+                      latency_ms=processing_time, user_id=message.user_id)
             return ChatResponse(
                 response="I'm sorry, but I can only answer questions related to plywood products, doors, laminates, and our Plywood Studio business. Please ask me about our products, brands (Centuryply, Sainik, Greenply), specifications, pricing, or store location.",
                 timestamp=datetime.now().isoformat(),
                 response_time_ms=processing_time
             )
         
-        # Check cache first
+        # Earlier turns of this conversation (empty for a new session); only explicit
+        # sessions have memory, a shared user_id must not mix different callers' turns
+        session_id = message.session_id
+        with tracing.span("conversation_load"):
+            chat_history = conversation.history(session_id)
+        
+        # Check cache first (follow-ups depend on the conversation, so only first turns are cached)
         cache_key = f"plywood_query:{hash(message.message)}"
-        cached_response = cache_get(cache_key)
+        with tracing.span("cache_lookup"):
+            cached_response = cache_get(cache_key) if not chat_history else None
         
         if cached_response:
+            await run_in_threadpool(contextvars.copy_context().run, conversation.remember,
+                                    session_id, message.message, cached_response)
             logging.info(f"Cache hit for question: {message.message}")
+            usage.answered("cache", cache_hit=True, depth=0)
             processing_time = int((time.time() - start_time) * 1000)
+            audit_log(message.message, None, cached_response, model="cache", latency_ms=processing_time,
+                      user_id=message.user_id, session_id=session_id, route="cache")
             return ChatResponse(
                 response=cached_response,
                 timestamp=datetime.now().isoformat(),
-                response_time_ms=processing_time
+                response_time_ms=processing_time,
+                usage=usage.current(),
+                cached=True
             )
         
         # Build specialized prompt for plywood business
-        context = get_relevant_context(message.message)
-        prompt_template = """You are an expert assistant for Plywood Studio in Hyderabad. Use the following information to answer the customer's question accurately and helpfully.
-
-PLYWOOD STUDIO INFORMATION:
-{context}
-
-CUSTOMER QUESTION: {query}
-
-Please provide a helpful, accurate response focusing on our plywood products, doors, laminate sheets, and services. Be professional and informative."""
-
-        prompt = prompt_template.format(
-            context=context,
-            query=message.message
-        )
-        
-        # Get LLM response
-        llm_start = time.time()
-        raw_response = llm_call("gpt-3.5-turbo", prompt)
-        llm_time = int((time.time() - llm_start) * 1000)
-        logging.info(f"LLM latency: {llm_time}ms")
+        with tracing.span("context_build"):
+            context = get_relevant_context(message.message)
+            prompt = prompts.render("chat", context=context, history=conversation.format_history(chat_history),
+                                    question=message.message)
+        
+        # Get LLM response (admission-controlled; shed requests get a degraded answer immediately)
+        async with admission.slot() as shed_reason:
+            if shed_reason:
+                with tracing.span("degraded_answer"):
+                    raw_response = degraded_answer(prompt, question=message.message)
+            else:
+                llm_start = time.time()
+                # run the blocking provider chain off the event loop, carrying the deadline/usage/trace context
+                ctx = contextvars.copy_context()
+                # sampled/requested profiles cover the provider chain in the worker thread, not other requests on the loop
+                chain = llm_call
+                if profiling.should_profile(force=_profile_requested(x_profile, x_admin_token)):
+                    chain = profiling.wrap("chat", llm_call, force=True)
+                with tracing.span("llm"):
+                    raw_response = await run_in_threadpool(ctx.run, chain, "gpt-3.5-turbo", prompt, chat_history=chat_history,
+                                                          question=message.message)
+                llm_time = int((time.time() - llm_start) * 1000)
+                record_metric("llm_latency_ms", llm_time)
+                logging.info(f"LLM latency: {llm_time}ms")
         
         # Apply safety checks
-        safe_response = apply_guardrails(raw_response)
-        final_response = secure_output(safe_response)
-        
-        # Cache the response
-        cache_set(cache_key, final_response, CACHE_TTL_SECONDS)
-        logging.info(f"Cached answer for question: {message.message}")
+        with tracing.span("postprocess"):
+            safe_response = apply_guardrails(raw_response)
+            final_response = secure_output(safe_response)
+        
+        # Cache the response (degraded answers are not cached, the next request may get the full chain)
+        with tracing.span("cache_write"):
+            if not chat_history and not shed_reason:
+                cache_set(cache_key, final_response, CACHE_TTL_SECONDS)
+                logging.info(f"Cached answer for question: {message.message}")
+            # blocking (cache I/O, optional LLM summary): keep it off the event loop
+            await run_in_threadpool(contextvars.copy_context().run, conversation.remember,
+                                    session_id, message.message, final_response)
         
         processing_time = int((time.time() - start_time) * 1000)
+        request_usage = usage.current()
+        audit_log(message.message, prompt, final_response,
+                  guardrail_output=safe_response if safe_response != raw_response else None,
+                  model="gpt-3.5-turbo", latency_ms=processing_time, user_id=message.user_id,
+                  retrieved_context=context, session_id=session_id, route=request_usage["route"],
+                  shed_reason=shed_reason, usage=request_usage, stages=tracing.spans())
         
         return ChatResponse(
             response=final_response,
             timestamp=datetime.now().isoformat(),
-            response_time_ms=processing_time
+            response_time_ms=processing_time,
+            usage=request_usage
         )
         
     except Exception as e:
         logging.error(f"Error in chat endpoint: {e}")
         processing_time = int((time.time() - start_time) * 1000)
+        audit_log(message.message, None, None, latency_ms=processing_time, user_id=message.user_id, error=str(e))
         return ChatResponse(
             response="I apologize, but I'm experiencing some technical difficulties. Please try asking your question again.",
             timestamp=datetime.now().isoformat(),
             response_time_ms=processing_time
         )
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        response.headers["Server-Timing"] = tracing.server_timing()
+        tracing.log_summary()
 
 def get_relevant_context(query: str) -> str:
     """Get relevant business information based on the query"""
     query_lower = query.lower()
-    relevant_context = []
-    
-    # Business info
-    if any(word in query_lower for word in ['business', 'company', 'location', 'address', 'contact', 'about']):
-        relevant_context.append("Plywood Studio is a partnership firm established in 2022, located at 5-5-983, 5-5-982/1, Goshamahal, Hyderabad-500012, Telangana. We are GST registered (36ABCFP0708R1ZW) with 5-25 Cr annual turnover and up to 10 employees. We have a 5.0 star rating on IndiaMART.")
-    
-    # Products
-    if any(word in query_lower for word in ['plywood', 'brand', 'product', 'wood']):
-        relevant_context.append("We are authorized dealers for premium plywood brands: Centuryply (Club Prime, Bond 710), Sainik MR Plywood, and Greenply. We offer various grades and specifications for different applications.")
+    kb = knowledge_base.snapshot()
     
-    # Doors
-    if any(word in query_lower for word in ['door', 'doors', 'flush', 'panel']):
-        relevant_context.append("Our wooden door range includes: Greenply Plywood Flush Doors, Wooden Panel Polish Doors, and Plywood Laminate Doors. Available in standard and custom sizes.")
-    
-    # Laminate
-    if any(word in query_lower for word in ['laminate', 'sheet', 'sunmica']):
-        relevant_context.append("We supply laminate sheets in various thicknesses including 1mm and 1.5mm options, with different finishes and colors for interior decoration.")
-    
-    # Hardware
-    if any(word in query_lower for word in ['hardware', 'lock', 'locks']):
-        relevant_context.append("We offer door hardware including Quba Vault Main Door Rim Locks and other quality door accessories.")
+    # Business info, products, doors, laminate, hardware snippets from the knowledge file
+    relevant_context = [
+        snippet["text"] for snippet in kb.get("context_snippets", [])
+        if any(word in query_lower for word in snippet["keywords"])
+    ]
     
     # Default context if nothing specific
     if not relevant_context:
-        relevant_context = [
-            "Plywood Studio specializes in premium plywood, wooden doors, laminate sheets, and door hardware. We carry trusted brands like Centuryply, Sainik, and Greenply.",
-            "Located in Goshamahal, Hyderabad since 2022. Contact us via IndiaMART for quotes and availability."
-        ]
+        relevant_context = list(kb.get("default_context", []))
     
     return "\n\n".join(relevant_context)
 
@@ -663,6 +725,74 @@ async def get_business_info():
 async def health():
     return {"status": "healthy", "service": "Plywood Studio AI Assistant"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (same registry as observability.start_metrics_server)"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def _require_admin(token: str | None) -> None:
+    """Reject admin requests without the configured ADMIN_TOKEN (admin endpoints don't exist without one)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def _profile_requested(flag: str | None, token: str | None) -> bool:
+    """X-Profile forces a profile only with a valid admin token (never when ADMIN_TOKEN is unset)"""
+    return bool(flag) and flag.lower() not in ("0", "false", "no") and bool(ADMIN_TOKEN) and token == ADMIN_TOKEN
+
+@app.get("/admin/providers")
+async def provider_ranking(x_admin_token: str | None = Header(default=None)):
+    """Live provider ranking (EWMA latency, success rate, p95) used by the adaptive chain"""
+    _require_admin(x_admin_token)
+    return {
+        "adaptive_ordering": ADAPTIVE_ORDERING,
+        "providers": provider_stats.ranking(),
+        "rate_limits": rate_limits.snapshot(),
+        "huggingface_models": hf_warmer.status()
+    }
+
+@app.get("/admin/admission")
+async def admission_status(x_admin_token: str | None = Header(default=None)):
+    """LLM stage concurrency, queue depth and limits"""
+    _require_admin(x_admin_token)
+    return admission.stats()
+
+@app.get("/admin/prompts")
+async def prompt_templates(x_admin_token: str | None = Header(default=None)):
+    """Registered prompt templates with their versions and shared prefix size"""
+    _require_admin(x_admin_token)
+    return {"templates": prompts.templates()}
+
+@app.get("/admin/memory")
+async def memory_usage(tracemalloc: str | None = None, limit: int = TRACEMALLOC_TOP_N,
+                       x_admin_token: str | None = Header(default=None)):
+    """
+    Approximate bytes and entry counts of caches, indexes and loaded modules
+
+    ?tracemalloc=start begins allocation tracing (slows the process), ?tracemalloc=top
+    adds the top allocators by source line, ?tracemalloc=stop ends tracing.
+    """
+    _require_admin(x_admin_token)
+    # walking large caches is CPU-bound, keep it off the event loop
+    report = await run_in_threadpool(memory_report.report)
+    if tracemalloc:
+        report["tracemalloc"] = await run_in_threadpool(memory_report.tracemalloc_control, tracemalloc, limit)
+    return report
+
+@app.get("/admin/profiles")
+async def stored_profiles(x_admin_token: str | None = Header(default=None)):
+    """Profiling mode and the most recent stored profiles"""
+    _require_admin(x_admin_token)
+    return profiling.status()
+
+@app.delete("/chat/session/{session_id}")
+async def reset_session(session_id: str, x_admin_token: str | None = Header(default=None)):
+    """Forget a conversation (admin only: session ids are the only key to a conversation)"""
+    _require_admin(x_admin_token)
+    conversation.forget(session_id)
+    return {"session_id": session_id, "status": "cleared"}
+
 if __name__ == "__main__":
     print("🚀 Starting Plywood Studio AI Assistant...")
     print("🏗️ Specialized for plywood business queries!")
@@ -31,8 +31,26 @@ def _key(key: str) -> str:
     """Generate a cache key."""
     return f"genai:cache:{key}"
 
+# Cache tier by key prefix (anything else is a response cache entry, e.g. the CLI's raw question keys)
+_TIERS = {"plywood_query": "response", "web_search": "web_search", "conversation": "conversation"}
+
+def _tier(key: str) -> str:
+    return _TIERS.get(key.split(":", 1)[0], "response")
+
+def _record(key: str, event: str, n: int = 1) -> None:
+    try:
+        from observability import CACHE_EVENTS
+        CACHE_EVENTS.labels(tier=_tier(key), event=event).inc(n)
+    except Exception:
+        pass
+
 def get(key: str) -> Optional[str]:
     """Get a value from the cache."""
+    value = _get(key)
+    _record(key, "hit" if value else "miss")
+    return value
+
+def _get(key: str) -> Optional[str]:
     if USE_REDIS:
         value = _client.get(_key(key))
         return value.decode('utf-8') if value else None
@@ -49,11 +67,49 @@ def get(key: str) -> Optional[str]:
             return None
         # expired - remove and return None
         _client.pop(_key(key), None)
+        _record(key, "expired")
         return None
     
 def set(key: str, value: str, ttl: int = 3600) -> None:
     """Set a value in the cache with an optional TTL."""
+    _record(key, "set")
     if USE_REDIS:
         _client.setex(_key(key), ttl, value)
     else:
-        _client[_key(key)] = (value, time.time() + ttl)  # Store value with expiry time
\ No newline at end of file
+        _client[_key(key)] = (value, time.time() + ttl)  # Store value with expiry time
+
+def delete(key: str, event: str = "delete") -> None:
+    """Remove a value from the cache (event="eviction" when dropped to enforce a capacity cap)."""
+    _record(key, event)
+    if USE_REDIS:
+        _client.delete(_key(key))
+    else:
+        _client.pop(_key(key), None)
+
+def purge_expired() -> int:
+    """Drop expired entries from the in-memory backend (Redis expires keys itself)."""
+    if USE_REDIS:
+        return 0
+    now = time.time()
+    expired = [k for k, (_, expiry) in list(_client.items()) if expiry <= now]
+    for k in expired:
+        _client.pop(k, None)
+        _record(k[len(_key("")):], "expired")
+    return len(expired)
+
+def memory_usage() -> dict:
+    """Entry counts and approximate bytes per tier (Redis: server memory and key counts)"""
+    tiers = {}
+    if USE_REDIS:
+        prefix = _key("")
+        for raw in _client.scan_iter(match=f"{prefix}*", count=1000):
+            tier = tiers.setdefault(_tier(raw.decode("utf-8")[len(prefix):]), {"entries": 0})
+            tier["entries"] += 1
+        return {"backend": "redis", "used_memory_bytes": _client.info("memory").get("used_memory"), "tiers": tiers}
+    import sys
+    for key, entry in list(_client.items()):
+        tier = tiers.setdefault(_tier(key[len(_key("")):]), {"entries": 0, "approx_bytes": 0})
+        tier["entries"] += 1
+        tier["approx_bytes"] += sys.getsizeof(key) + sys.getsizeof(entry) + sum(sys.getsizeof(part) for part in entry)
+    return {"backend": "memory", "approx_bytes": sys.getsizeof(_client) + sum(t["approx_bytes"] for t in tiers.values()),
+            "tiers": tiers}
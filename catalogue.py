@@ -0,0 +1,284 @@
+"""
+Product catalogue - SQLite (FTS5) index over the knowledge base for structured spec queries
+Answers questions like "price of 18mm BWP Centuryply" or "which sizes does flush door come in"
+directly from the database, without an LLM or web round trip
+"""
+import logging
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import knowledge_base
+
+_SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,      -- plywood | brand_product | door | laminate
+    brand TEXT,                  -- centuryply | sainik | greenply | NULL
+    name TEXT NOT NULL,
+    grades TEXT NOT NULL,        -- space-padded grade list, e.g. ' MR BWP '
+    description TEXT NOT NULL,
+    applications TEXT
+);
+CREATE TABLE product_sizes (
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    size TEXT NOT NULL           -- e.g. '7ft x 3ft' (longer side first)
+);
+CREATE TABLE product_thicknesses (
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    thickness TEXT NOT NULL      -- e.g. '0.8mm' (laminate sheets)
+);
+CREATE TABLE thicknesses (
+    thickness_mm REAL PRIMARY KEY,
+    application TEXT
+);
+CREATE TABLE grades (
+    grade TEXT PRIMARY KEY,
+    description TEXT NOT NULL
+);
+CREATE INDEX idx_products_brand ON products(brand);
+CREATE VIRTUAL TABLE products_fts USING fts5(name, brand, grades, description, applications,
+                                             content='products', content_rowid='id', tokenize='porter');
+"""
+
+_GRADE_PATTERN = re.compile(r"\b(BWP|BWR|MR|Commercial|Marine)\b", re.IGNORECASE)
+_THICKNESS_PATTERN = re.compile(r"\b(\d+(?:\.\d+)?)\s*mm\b", re.IGNORECASE)
+_SIZE_PATTERN = re.compile(r"\b(\d+(?:\.\d+)?)\s*(?:ft|feet|')\s*[x×]\s*(\d+(?:\.\d+)?)\s*(?:ft|feet|')?", re.IGNORECASE)
+_DOOR_TYPES = {"flush": "Flush Doors", "panel": "Panel Doors", "laminate door": "Laminate Doors"}
+_PRICE_WORDS = ("price", "cost", "rate", "mrp", "how much")
+_SIZE_WORDS = ("size", "dimension")
+_THICKNESS_WORDS = ("thickness", "thick")  # matched as whole words (plural allowed), not substrings
+_STOPWORDS = {"what", "which", "does", "do", "you", "have", "the", "and", "for", "come", "with", "are", "your",
+              "available", "sizes", "size", "price", "cost", "rate", "how", "much", "thickness", "thick", "of", "in"}
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_brand_aliases: Dict[str, str] = {}
+
+def _grades_of(text: str) -> List[str]:
+    grades = []
+    for match in _GRADE_PATTERN.findall(text):
+        grade = match.upper() if match.upper() in ("BWP", "BWR", "MR") else match.title()
+        if grade == "Marine":
+            grade = "BWP"  # marine plywood is BWP grade
+        if grade not in grades:
+            grades.append(grade)
+    return grades
+
+def _build(kb: dict) -> sqlite3.Connection:
+    """Build a fresh in-memory catalogue from a knowledge snapshot"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+
+    def insert(category, brand, name, grades, description, applications=None, sizes=(), thicknesses=()):
+        cur = conn.execute(
+            "INSERT INTO products (category, brand, name, grades, description, applications) VALUES (?, ?, ?, ?, ?, ?)",
+            (category, brand, name, f" {' '.join(grades)} ", description, applications))
+        for size in sizes:
+            conn.execute("INSERT INTO product_sizes (product_id, size) VALUES (?, ?)", (cur.lastrowid, size))
+        for thickness in thicknesses:
+            conn.execute("INSERT INTO product_thicknesses (product_id, thickness) VALUES (?, ?)", (cur.lastrowid, thickness))
+
+    for key, entry in kb["plywood"].items():
+        name = entry.get("name", key.replace("_", " ").title())
+        insert("plywood", None, name, _grades_of(f"{key.replace('_', ' ')} {name}"),
+               entry["description"], entry.get("applications"))
+
+    for brand, entry in kb["brands"].items():
+        for product, desc in entry.get("products_we_carry", {}).items():
+            name = product if product.lower().startswith(brand) else f"{entry.get('name', brand.title())} {product}"
+            insert("brand_product", brand, name, _grades_of(f"{product} {desc}"), desc)
+
+    for key, entry in kb["doors"].items():
+        sizes = [_size_label(a, b) for a, b in _SIZE_PATTERN.findall(entry.get("sizes") or "")]
+        brand = next((b for b in kb["brands"] if b in entry.get("brands_we_carry", "").lower()), None)
+        insert("door", brand, entry.get("name", key.replace("_", " ").title()), [],
+               entry["description"], entry.get("applications"), sizes)
+
+    laminates = kb["laminates"]
+    insert("laminate", None, "Decorative Laminates", [], laminates["description"], laminates.get("applications"),
+           thicknesses=[t.strip() for t in laminates.get("thickness_options", "").split("(")[0].split(",") if t.strip()])
+
+    thickness_specs = kb["technical_specs"].get("plywood_thickness", {})
+    applications = thickness_specs.get("applications", {})
+    for size in thickness_specs.get("common_sizes", []):
+        mm = float(size.rstrip("m"))
+        application = next((app for label, app in applications.items()
+                            if mm in [float(x) for x in re.findall(r"\d+(?:\.\d+)?", label)]
+                            or _in_range(mm, label)), None)
+        conn.execute("INSERT INTO thicknesses (thickness_mm, application) VALUES (?, ?)", (mm, application))
+
+    for grade, desc in kb["technical_specs"].get("plywood_grades", {}).items():
+        conn.execute("INSERT INTO grades (grade, description) VALUES (?, ?)", (grade, desc))
+
+    conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+    conn.commit()
+    return conn
+
+def _size_label(a: str, b: str) -> str:
+    """'3', '7' -> '7ft x 3ft' (longer side first, so either order in a question matches)"""
+    longer, shorter = sorted((float(a), float(b)), reverse=True)
+    return f"{longer:g}ft x {shorter:g}ft"
+
+def _mentions(q: str, words) -> bool:
+    """Whole-word match (plural allowed): 'rate' must not match 'moderate' or 'corporate'"""
+    return any(re.search(rf"\b{re.escape(word)}s?\b", q) for word in words)
+
+def _in_range(mm: float, label: str) -> bool:
+    bounds = [float(x) for x in re.findall(r"\d+(?:\.\d+)?", label)]
+    return len(bounds) == 2 and bounds[0] <= mm <= bounds[1]
+
+def reload(kb: Optional[dict] = None) -> None:
+    """Rebuild the catalogue from the current knowledge snapshot and swap it in"""
+    global _conn, _brand_aliases
+    kb = kb or knowledge_base.snapshot()
+    conn = _build(kb)
+    aliases = {}
+    for brand, entry in kb["brands"].items():
+        for alias in [brand] + entry.get("aliases", []):
+            aliases[alias.lower()] = brand
+    with _lock:
+        old, _conn, _brand_aliases = _conn, conn, aliases
+    if old is not None:
+        old.close()
+    count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    logging.info(f"Catalogue built: {count} products (knowledge version {kb.get('version')})")
+
+def parse_query(question: str) -> dict:
+    """Extract brand, grade, thickness, size, door type and intent from a question"""
+    q = question.lower()
+    parsed = {
+        "brand": next((brand for alias, brand in _brand_aliases.items() if re.search(rf"\b{re.escape(alias)}\b", q)), None),
+        "grades": [g for g in _grades_of(question) if g != "Commercial"] + (["Commercial"] if "commercial" in q else []),
+        "thickness_mm": float(_THICKNESS_PATTERN.search(q).group(1)) if _THICKNESS_PATTERN.search(q) else None,
+        "size": None,
+        "door": next((name for word, name in _DOOR_TYPES.items() if word in q and "door" in q), None),
+        "intent": None,
+    }
+    size = _SIZE_PATTERN.search(q)
+    if size:
+        parsed["size"] = _size_label(size.group(1), size.group(2))
+    if _mentions(q, _PRICE_WORDS):
+        parsed["intent"] = "price"
+    elif _mentions(q, _SIZE_WORDS):
+        parsed["intent"] = "sizes"
+    elif _mentions(q, _THICKNESS_WORDS):
+        parsed["intent"] = "thickness"
+    return parsed
+
+def _query(sql: str, params=()) -> List[sqlite3.Row]:
+    with _lock:
+        if _conn is None:
+            return []
+        return _conn.execute(sql, params).fetchall()
+
+def memory_usage() -> dict:
+    """Product count and bytes of the in-memory SQLite database"""
+    page_count = _query("PRAGMA page_count")
+    page_size = _query("PRAGMA page_size")
+    products = _query("SELECT COUNT(*) FROM products")
+    return {
+        "products": products[0][0] if products else 0,
+        "approx_bytes": page_count[0][0] * page_size[0][0] if page_count else 0,
+        "aliases": len(_brand_aliases),
+    }
+
+def _matching_products(parsed: dict, question: str) -> List[sqlite3.Row]:
+    clauses, params = [], []
+    if parsed["door"]:
+        clauses.append("p.name = ?")
+        params.append(parsed["door"])
+    if parsed["brand"]:
+        clauses.append("p.brand = ?")
+        params.append(parsed["brand"])
+    for grade in parsed["grades"]:
+        clauses.append("p.grades LIKE ?")
+        params.append(f"% {grade} %")
+    if parsed["size"]:
+        clauses.append("EXISTS (SELECT 1 FROM product_sizes s WHERE s.product_id = p.id AND s.size = ?)")
+        params.append(parsed["size"])
+    if clauses:
+        rows = _query(f"SELECT p.* FROM products p WHERE {' AND '.join(clauses)} ORDER BY p.category, p.id", params)
+        if rows or parsed["door"] or parsed["size"]:
+            return rows
+    if parsed["intent"] == "sizes" or (parsed["intent"] == "thickness" and parsed["thickness_mm"] is None):
+        # attribute questions need the product category named ("laminate", "door"), never loose full-text hits
+        return _query("SELECT * FROM products WHERE ? LIKE '%' || category || '%' ORDER BY category, id",
+                      (question.lower(),))
+    if parsed["thickness_mm"] is not None:
+        return []  # a bare thickness question is answered from the thickness table alone
+    # no structured filter matched: fall back to full-text ranking
+    terms = [t for t in re.findall(r"[a-z0-9]+", question.lower()) if len(t) > 2 and t not in _STOPWORDS]
+    if not terms:
+        return []
+    match = " OR ".join(f'"{t}"' for t in terms)
+    return _query("SELECT p.* FROM products_fts JOIN products p ON p.id = products_fts.rowid "
+                  "WHERE products_fts MATCH ? ORDER BY bm25(products_fts) LIMIT 3", (match,))
+
+def answer(question: str) -> Optional[str]:
+    """
+    Answer a structured spec query straight from the catalogue
+
+    Returns None unless the question carries a recognized intent (price, sizes,
+    thickness) plus at least one attribute the catalogue can filter on (size and
+    thickness questions may instead name the product category, e.g. "laminate
+    thickness"). A parsed size must match a stocked size, e.g. "7ft x 3ft doors".
+    Size and thickness questions are only answered when the matched products have
+    that attribute on record, so "what thickness of plywood for kitchen cabinets?"
+    goes to the LLM instead.
+    """
+    if _conn is None:
+        return None
+    parsed = parse_query(question)
+    has_attribute = parsed["brand"] or parsed["grades"] or parsed["thickness_mm"] or parsed["door"] or parsed["size"]
+    if not parsed["intent"] or not (has_attribute or parsed["intent"] in ("sizes", "thickness")):
+        return None
+
+    products = _matching_products(parsed, question)
+    lines = []
+
+    if parsed["intent"] == "sizes":
+        for product in products:
+            sizes = [row["size"] for row in _query("SELECT size FROM product_sizes WHERE product_id = ?", (product["id"],))]
+            if sizes:
+                lines.append(f"**{product['name']}** come in: {', '.join(sizes)} (custom sizes available on order)")
+        if not lines:
+            return None
+    else:
+        if parsed["thickness_mm"] is not None:
+            row = _query("SELECT * FROM thicknesses WHERE thickness_mm = ?", (parsed["thickness_mm"],))
+            mm = f"{parsed['thickness_mm']:g}mm"
+            if row:
+                usage = f" - typically used for {row[0]['application'].lower()}" if row[0]["application"] else ""
+                lines.append(f"**{mm}** is a standard thickness we stock{usage}.")
+            else:
+                common = ", ".join(f"{r['thickness_mm']:g}mm" for r in _query("SELECT thickness_mm FROM thicknesses ORDER BY thickness_mm"))
+                lines.append(f"**{mm}** is not one of our standard thicknesses ({common}); ask us about special orders.")
+        if parsed["intent"] == "thickness":
+            for product in products:
+                options = [row["thickness"] for row in _query(
+                    "SELECT thickness FROM product_thicknesses WHERE product_id = ?", (product["id"],))]
+                if options:
+                    lines.append(f"**{product['name']}** come in: {', '.join(options)}")
+            if not lines:
+                return None
+        for grade in parsed["grades"]:
+            row = _query("SELECT description FROM grades WHERE grade = ?", (grade,))
+            if row:
+                lines.append(f"**{grade}**: {row[0]['description']}")
+        for product in products[:4]:
+            lines.append(f"• **{product['name']}**: {product['description']}")
+        if not products and not lines:
+            return None
+
+    if parsed["intent"] == "price":
+        lines.append("\n💡 Prices change with market rates and order quantity - contact us via IndiaMART (www.indiamart.com/plywoodstudio) or visit our Goshamahal showroom for a current quote.")
+    else:
+        lines.append("\n💡 Visit our Goshamahal showroom or contact via IndiaMART for current stock.")
+    logging.info(f"Catalogue answered structured query ({parsed['intent']}): {parsed}")
+    return "\n".join(lines)
+
+knowledge_base.on_reload(reload)
+reload()
@@ -19,14 +19,28 @@ from cache_store import get as cache_get, set as cache_set
 from router import build_prompt
 from llm_client_langchain import call as llm_call  # Now with LangChain RAG!
 from postprocess import secure_output
-from config import CACHE_TTL_SECONDS
+from config import CACHE_TTL_SECONDS, REQUEST_DEADLINE_SECONDS
+import deadline
+import tracing
+import profiling
+from observability import log as audit_log
+import usage
 from guardrails import apply_guardrails, is_business_related
 
-def run_pipeline(question: str):
+def run_pipeline(question: str, profile: bool = False):
     """
     Run the intelligent pipeline with smart LLM routing
+
+    profile forces a profile of this run (otherwise PROFILE_MODE decides)
     """
+    with profiling.profile("cli", force=profile):
+        return _run_pipeline(question)
+
+def _run_pipeline(question: str):
     logging.info(f"Starting pipeline for question: {question}")
+    deadline.start(REQUEST_DEADLINE_SECONDS)
+    usage.start()
+    tracing.start()
     
     # Step 0: Check if question is business-related
     if not is_business_related(question):
@@ -37,6 +51,7 @@ def run_pipeline(question: str):
     cached = cache_get(question)
     if cached:
         logging.info(f"Cache hit for question: {question}")
+        usage.answered("cache", cache_hit=True, depth=0)
         return cached
     
     # Step 2: Use simple context (no vector retrieval for now)
@@ -44,14 +59,16 @@ def run_pipeline(question: str):
     
     # Step 3: Build prompt
     model, prompt = build_prompt(question, simple_context)
-    logging.info("Assembled prompt:")
-    logging.info(prompt)
+    logging.debug(f"Assembled prompt:\n{prompt}")
     
     # Step 4: Call LLM (smart routing between OpenAI/HuggingFace)
     start_llm = time.time()
-    answer = llm_call(model, prompt)
+    answer = llm_call(model, prompt, question=question)
     llm_latency = int((time.time() - start_llm) * 1000)  # in milliseconds
     logging.info(f"LLM latency: {llm_latency}ms")
+    tracing.log_summary()
+    totals = usage.current()
+    logging.info(f"Route: {totals['route']}, tokens: {totals['total_tokens']}, estimated cost: ${totals['estimated_cost_usd']:.5f}")
     
     # Step 5: Post-process
     post_processed = secure_output(answer)
@@ -63,15 +80,20 @@ def run_pipeline(question: str):
     cache_set(question, secured, CACHE_TTL_SECONDS)
     logging.info(f"Cached answer for question: {question}")
     
+    # Step 8: Audit record (queued, written in the background)
+    audit_log(question, prompt, secured, guardrail_output=secured if secured != post_processed else None,
+              model=model, latency_ms=llm_latency, route=totals["route"], usage=totals)
+    
     return secured
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the intelligent RAG pipeline")
     parser.add_argument("--question", type=str, required=True, help="The question to answer")
+    parser.add_argument("--profile", action="store_true", help="Write a profile of this run to PROFILE_DIR")
     args = parser.parse_args()
     
     try:
-        response = run_pipeline(args.question)
+        response = run_pipeline(args.question, profile=args.profile)
         print(f"\n🤖 Response: {response}")
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -9,6 +9,10 @@ OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
 HUGGINGFACE_API_KEY: str | None = os.getenv("HUGGINGFACE_API_KEY")
 SERPER_API_KEY: str | None = os.getenv("SERPER_API_KEY")
 
+# Provider endpoints (unset = the public APIs; point at loadtest/stub_server.py for load tests)
+OPENAI_BASE_URL: str | None = os.getenv("OPENAI_BASE_URL") or None  # e.g. http://localhost:9000/v1
+HUGGINGFACE_BASE_URL: str | None = os.getenv("HUGGINGFACE_BASE_URL") or None  # e.g. http://localhost:9000
+
 # Model Configuration
 USE_HUGGINGFACE = os.getenv("USE_HUGGINGFACE", "false").lower() == "true"
 
@@ -31,4 +35,121 @@ MAX_TOKENS = 800  # Increased for detailed answers
 
 # Cache 
 CACHE_TTL_SECONDS = 1800 # 30 minutes
-VECTOR_TOP_K = 2  # number of top results to retrieve
\ No newline at end of file
+VECTOR_TOP_K = 2  # number of top results to retrieve
+
+# Request deadline (end-to-end budget for the fallback chain)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))
+DEADLINE_RESERVE_SECONDS = 0.5  # kept back so the curated fallback always has time to run
+MIN_STEP_BUDGET_SECONDS = 2.0  # skip a provider step if less than this is left
+
+# Provider execution mode: "sequential" (default chain) or "hedged"
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "sequential").lower()
+HEDGE_PERCENTILE = 95  # hedge once the primary is slower than its p95 latency
+HEDGE_DEFAULT_DELAY_SECONDS = 2.0  # used until HEDGE_MIN_SAMPLES latencies are recorded
+HEDGE_MIN_SAMPLES = 20
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))  # max share of calls that may hedge
+HEDGE_MAX_WORKERS = 8
+
+# Latency-adaptive provider ordering (opt-in: off keeps the fixed PROVIDER_DEFAULT_ORDER)
+ADAPTIVE_ORDERING = os.getenv("ADAPTIVE_ORDERING", "false").lower() == "true"
+PROVIDER_DEFAULT_ORDER = ("huggingface", "rag", "web_search", "openai")  # also the cold-start ranking
+PROVIDER_QUALITY = {"huggingface": 0.7, "rag": 0.9, "web_search": 0.6, "openai": 0.8}  # relative answer quality
+PROVIDER_QUALITY_FLOOR = float(os.getenv("PROVIDER_QUALITY_FLOOR", "0.5"))
+PROVIDER_MIN_SUCCESS_RATE = 0.2  # skip providers failing more often than this...
+PROVIDER_PROBE_INTERVAL = 10  # ...except on every Nth request so they can recover
+EWMA_ALPHA = 0.2
+
+# Admin endpoints are disabled (404) unless ADMIN_TOKEN is set; requests then need a matching X-Admin-Token header
+ADMIN_TOKEN: str | None = os.getenv("ADMIN_TOKEN")
+
+# Pooled HTTP clients
+HTTP_POOL_CONNECTIONS = 10  # distinct hosts kept in the pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # connections per host
+HTTP_CONNECT_TIMEOUT_SECONDS = 3.0
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+HTTP_PREWARM_URLS = (
+    f"{OPENAI_BASE_URL or 'https://api.openai.com/v1'}/models",
+    HUGGINGFACE_BASE_URL or "https://router.huggingface.co",
+    "https://google.serper.dev",
+    "https://api.duckduckgo.com",
+)
+
+# Web search result cache
+WEB_SEARCH_CACHE_TTL_SECONDS = 86400  # one round trip per topic per day
+WEB_SEARCH_NEGATIVE_TTL_SECONDS = 300  # empty/failed lookups retried after 5 minutes
+WEB_SEARCH_DEADLINE_SECONDS = 6.0  # shared budget for the concurrent Serper + DuckDuckGo queries
+
+# Web snippets fed back into the RAG index
+WEB_DOCUMENT_TTL_SECONDS = 86400  # web documents are retrievable for a day
+WEB_DOCUMENT_GC_INTERVAL_SECONDS = 600
+
+# Knowledge base data file (hot-reloaded when it changes)
+KNOWLEDGE_BASE_PATH = os.getenv("KNOWLEDGE_BASE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "knowledge_base.json"))
+KNOWLEDGE_RELOAD_INTERVAL_SECONDS = 10
+
+# Structured spec queries answered from the SQLite catalogue before any LLM call
+CATALOGUE_FAST_PATH = os.getenv("CATALOGUE_FAST_PATH", "true").lower() == "true"
+
+# Token cost estimates (USD per 1K tokens: prompt, completion); unlisted models count as free
+TOKEN_PRICES_USD_PER_1K = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "text-embedding-3-small": (0.00002, 0.0),
+}
+CACHED_PROMPT_PRICE_RATIO = 0.5  # provider-cached prompt tokens are billed at this share of the prompt price
+
+# Multi-turn conversation memory (stored in the cache backend, keyed by session_id / user_id)
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "600"))  # recent turns kept verbatim
+CONVERSATION_SUMMARY_TOKENS = 200  # older turns are compacted into a summary of at most this size
+CONVERSATION_MIN_TURNS = 1  # question/answer pairs always kept verbatim, whatever their size
+CONVERSATION_MAX_TURN_CHARS = 1500  # stored turns are clipped to this length
+CONVERSATION_IDLE_TTL_SECONDS = int(os.getenv("CONVERSATION_IDLE_TTL_SECONDS", "1800"))  # idle sessions expire
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "5000"))  # least recently active evicted beyond this
+CONVERSATION_SUMMARIZER = os.getenv("CONVERSATION_SUMMARIZER", "extractive").lower()  # "extractive" or "llm"
+
+# Admission control in front of the LLM stage of /chat
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8"))  # requests in the provider chain at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))  # requests allowed to wait for a slot
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2.0"))  # max wait before shedding
+
+# Client-side rate-limit budgets per provider (replaced by x-ratelimit-* response headers when sent)
+RATE_LIMITS = {
+    "openai": {"rpm": int(os.getenv("OPENAI_RPM_LIMIT", "500")), "tpm": int(os.getenv("OPENAI_TPM_LIMIT", "200000"))},
+    "huggingface": {"rpm": int(os.getenv("HUGGINGFACE_RPM_LIMIT", "60")), "tpm": int(os.getenv("HUGGINGFACE_TPM_LIMIT", "100000"))},
+}
+RATE_LIMIT_MAX_WAIT_SECONDS = 1.0  # queue a call this long for budget, otherwise reroute to the next provider
+RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS = 10.0  # back-off after a 429 without a Retry-After header
+
+# Hugging Face model warm-up (background probes instead of sleeping inside requests)
+HF_WARMER_ENABLED = os.getenv("HF_WARMER_ENABLED", "true").lower() == "true"
+HF_KEEP_WARM_INTERVAL_SECONDS = 240  # probe warm models this often so they aren't unloaded
+HF_WARMUP_BACKOFF_BASE_SECONDS = 5.0  # first re-probe of a loading model; doubles per failed probe
+HF_WARMUP_BACKOFF_MAX_SECONDS = 120.0
+HF_RETRY_BACKOFF_BASE_SECONDS = 0.5  # in-request retries of transient errors (full jitter, doubles per attempt)
+HF_RETRY_BACKOFF_MAX_SECONDS = 4.0
+
+# Audit log (batched JSONL written off the request path)
+AUDIT_LOG_PATH = os.getenv("AUDIT_LOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "audit.jsonl"))
+AUDIT_SAMPLE_RATE = float(os.getenv("AUDIT_SAMPLE_RATE", "1.0"))  # share of normal requests audited; errors always are
+AUDIT_QUEUE_SIZE = 10000  # records buffered in memory; beyond this new records are dropped, never blocking a request
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_INTERVAL_SECONDS = 2.0
+AUDIT_MAX_FIELD_CHARS = 4000  # prompts/outputs/context are truncated to this length
+AUDIT_ROTATE_BYTES = int(os.getenv("AUDIT_ROTATE_BYTES", str(50 * 1024 * 1024)))
+AUDIT_ROTATE_SECONDS = 86400
+AUDIT_BACKUP_COUNT = 7  # rotated files kept
+AUDIT_COMPRESS = os.getenv("AUDIT_COMPRESS", "true").lower() == "true"  # gzip rotated files
+
+# Opt-in request profiling (or per request with X-Profile + a valid X-Admin-Token)
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off").lower()  # "off", "sample" (PROFILE_SAMPLE_RATE of requests) or "all"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.01"))
+PROFILE_ENGINE = os.getenv("PROFILE_ENGINE", "sampling").lower()  # "sampling" (folded stacks) or "cprofile" (.prof)
+PROFILE_SAMPLING_INTERVAL_SECONDS = 0.005
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "profiles"))
+PROFILE_MAX_FILES = 50  # oldest profiles are deleted beyond this
+PROFILE_MAX_TOTAL_BYTES = 100 * 1024 * 1024
+
+# Memory accounting (/admin/memory)
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "5"))  # stack depth recorded per allocation once tracing is started
+TRACEMALLOC_TOP_N = 25
@@ -0,0 +1,201 @@
+"""
+Multi-turn conversation memory
+Per-session state lives in the cache backend (Redis or in-memory): a running summary
+plus the most recent turns. Once the recent turns exceed the token budget the oldest
+ones are compacted into the summary, so the history added to prompts stays bounded.
+Idle sessions expire with the cache TTL and the least recently active ones are
+evicted beyond CONVERSATION_MAX_SESSIONS.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import prompts
+from cache_store import get as cache_get, set as cache_set, delete as cache_delete, purge_expired
+from config import (
+    CONVERSATION_TOKEN_BUDGET, CONVERSATION_SUMMARY_TOKENS, CONVERSATION_MIN_TURNS,
+    CONVERSATION_MAX_TURN_CHARS, CONVERSATION_IDLE_TTL_SECONDS, CONVERSATION_MAX_SESSIONS,
+    CONVERSATION_SUMMARIZER, OPENAI_API_KEY, OPENAI_DEFAULT_MODEL,
+)
+
+_PURGE_INTERVAL_SECONDS = 60
+
+_lock = threading.Lock()
+_active: "OrderedDict[str, float]" = OrderedDict()  # session id -> last activity, least recent first
+_last_purge = 0.0
+
+def _key(session_id: str) -> str:
+    return f"conversation:{session_id}"
+
+def _empty() -> dict:
+    return {"summary": "", "turns": [], "compacted_turns": 0}
+
+def _load(session_id: str) -> dict:
+    raw = cache_get(_key(session_id))
+    if not raw:
+        return _empty()
+    try:
+        return json.loads(raw)
+    except ValueError:
+        logging.warning(f"Discarding unreadable conversation state for session {session_id}")
+        return _empty()
+
+def history(session_id: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Conversation so far as (role, content) pairs, oldest first
+
+    A compacted summary of older turns, if any, comes first with role "summary".
+    """
+    if not session_id:
+        return []
+    state = _load(session_id)
+    turns = [(turn["role"], turn["content"]) for turn in state["turns"]]
+    if state["summary"]:
+        turns.insert(0, ("summary", state["summary"]))
+    return turns
+
+def remember(session_id: Optional[str], question: str, answer: str) -> None:
+    """
+    Append a question/answer pair to the session, compacting older turns if over budget
+
+    Blocking (cache I/O, and an OpenAI call with CONVERSATION_SUMMARIZER=llm): call it
+    from a worker thread, not the event loop. The summary is written outside _lock so
+    one slow summary doesn't stall every other session.
+    """
+    if not session_id:
+        return
+    with _lock:
+        state = _load(session_id)
+        state["turns"].append({"role": "user", "content": _clip(question)})
+        state["turns"].append({"role": "assistant", "content": _clip(answer)})
+        cache_set(_key(session_id), json.dumps(state), CONVERSATION_IDLE_TTL_SECONDS)
+        _touch(session_id)
+        dropped, summary = _compactable(state["turns"]), state["summary"]
+    if dropped:
+        _compact(session_id, summary, dropped)
+    _purge_if_due()
+
+def forget(session_id: str) -> None:
+    """Drop a session's conversation state"""
+    with _lock:
+        cache_delete(_key(session_id))
+        _active.pop(session_id, None)
+
+def stats() -> dict:
+    with _lock:
+        return {"active_sessions": len(_active), "max_sessions": CONVERSATION_MAX_SESSIONS}
+
+def format_history(chat_history: Optional[List[Tuple[str, str]]]) -> str:
+    """Render history for a prompt ("" when there is none, so single-turn prompts are unchanged)"""
+    if not chat_history:
+        return ""
+    lines = []
+    for role, content in chat_history:
+        if role == "summary":
+            lines.append(f"Earlier in this conversation:\n{content}")
+        else:
+            lines.append(f"{'Customer' if role == 'user' else 'Assistant'}: {content}")
+    return "CONVERSATION SO FAR:\n" + "\n".join(lines) + "\n\n"
+
+def last_user_turn(chat_history: Optional[List[Tuple[str, str]]]) -> str:
+    """Most recent customer message, used to make follow-up retrieval queries self-contained"""
+    for role, content in reversed(chat_history or []):
+        if role == "user":
+            return content
+    return ""
+
+def _clip(text: str) -> str:
+    text = text.strip()
+    return text if len(text) <= CONVERSATION_MAX_TURN_CHARS else text[:CONVERSATION_MAX_TURN_CHARS].rstrip() + "…"
+
+def _turn_tokens(turns: List[dict]) -> int:
+    return sum(prompts.count_tokens(turn["content"]) for turn in turns)
+
+def _compactable(turns: List[dict]) -> List[dict]:
+    """The oldest question/answer pairs to drop so the recent turns fit the budget"""
+    kept = list(turns)
+    while _turn_tokens(kept) > CONVERSATION_TOKEN_BUDGET and len(kept) > 2 * CONVERSATION_MIN_TURNS:
+        del kept[:2]
+    return turns[:len(turns) - len(kept)]
+
+def _compact(session_id: str, summary: str, dropped: List[dict]) -> None:
+    """Fold dropped turns into the summary (computed without the lock), then swap it in"""
+    updated = _summarize(summary, dropped)
+    with _lock:
+        state = _load(session_id)
+        if state["summary"] != summary or state["turns"][:len(dropped)] != dropped:
+            return  # a concurrent turn already compacted these (or the session was reset)
+        del state["turns"][:len(dropped)]
+        state["summary"] = updated
+        state["compacted_turns"] += len(dropped) // 2
+        cache_set(_key(session_id), json.dumps(state), CONVERSATION_IDLE_TTL_SECONDS)
+    logging.info(f"Compacted {len(dropped) // 2} conversation turns into summary "
+                 f"({prompts.count_tokens(updated)} tokens)")
+
+def _summarize(summary: str, dropped: List[dict]) -> str:
+    if CONVERSATION_SUMMARIZER == "llm" and OPENAI_API_KEY:
+        updated = _summarize_with_llm(summary, dropped)
+        if updated:
+            return updated
+    return _summarize_extractive(summary, dropped)
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", text.replace("\n", " ").strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "…"
+
+def _summarize_extractive(summary: str, dropped: List[dict]) -> str:
+    """One line per compacted pair; oldest lines drop off once the summary exceeds its budget"""
+    lines = [line for line in summary.split("\n") if line]
+    for question, answer in zip(dropped[::2], dropped[1::2]):
+        lines.append(f"- Customer asked: {_first_sentence(question['content'])} "
+                     f"We replied: {_first_sentence(answer['content'])}")
+    while len(lines) > 1 and prompts.count_tokens("\n".join(lines)) > CONVERSATION_SUMMARY_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def _summarize_with_llm(summary: str, dropped: List[dict]) -> Optional[str]:
+    try:
+        import usage
+        from llm_client_openai import call as openai_call
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in dropped)
+        prompt = (f"Update this running summary of a customer conversation with the new turns below. "
+                  f"Keep product names, sizes, grades and quantities the customer mentioned. "
+                  f"Reply with the summary only.\n\nCURRENT SUMMARY:\n{summary or '(none)'}\n\nNEW TURNS:\n{transcript}")
+        with usage.route("memory"):
+            result = openai_call(OPENAI_DEFAULT_MODEL, prompt, temperature=0, max_tokens=CONVERSATION_SUMMARY_TOKENS)
+        if not result.startswith("Error"):
+            return result.strip()
+        logging.warning(f"LLM conversation summary failed, using extractive summary: {result}")
+    except Exception as e:
+        logging.warning(f"LLM conversation summary failed, using extractive summary: {e}")
+    return None
+
+def _touch(session_id: str) -> None:
+    """Mark a session active; evict the least recently active beyond the cap (caller holds _lock)"""
+    now = time.time()
+    _active[session_id] = now
+    _active.move_to_end(session_id)
+
+    idle_cutoff = now - CONVERSATION_IDLE_TTL_SECONDS
+    while _active and next(iter(_active.values())) < idle_cutoff:
+        _active.popitem(last=False)  # already expired in the cache backend
+    while len(_active) > CONVERSATION_MAX_SESSIONS:
+        evicted, _ = _active.popitem(last=False)
+        cache_delete(_key(evicted), event="eviction")
+        logging.info(f"Evicted conversation for session {evicted} (session cap {CONVERSATION_MAX_SESSIONS})")
+
+def _purge_if_due() -> None:
+    """Sweep expired cache entries at most every _PURGE_INTERVAL_SECONDS (an O(n) scan, run outside _lock)"""
+    global _last_purge
+    now = time.time()
+    with _lock:
+        if now - _last_purge <= _PURGE_INTERVAL_SECONDS:
+            return
+        _last_purge = now
+    purged = purge_expired()
+    if purged:
+        logging.info(f"Purged {purged} expired cache entries")
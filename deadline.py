@@ -0,0 +1,54 @@
+"""
+Per-request deadline propagation
+The endpoint starts a time budget and every step of the fallback chain asks how much is left
+"""
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def start(budget_seconds: float) -> float:
+    """Start a deadline for the current request and return its absolute expiry (monotonic)"""
+    expiry = time.monotonic() + budget_seconds
+    _deadline.set(expiry)
+    logging.info(f"Request deadline set: {budget_seconds:.1f}s budget")
+    return expiry
+
+def clear() -> None:
+    """Remove the deadline from the current context"""
+    _deadline.set(None)
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None if no deadline is active"""
+    expiry = _deadline.get()
+    if expiry is None:
+        return None
+    return max(0.0, expiry - time.monotonic())
+
+def expired() -> bool:
+    """True once the current request has used up its budget"""
+    left = remaining()
+    return left is not None and left <= 0
+
+def has_budget(min_seconds: float) -> bool:
+    """True if there is no deadline or at least min_seconds are left"""
+    left = remaining()
+    return left is None or left >= min_seconds
+
+def timeout(default: float, reserve: float = 0.0) -> float:
+    """
+    HTTP/client timeout derived from the remaining budget
+
+    Args:
+        default: Timeout to use when no deadline is active (and the upper bound otherwise)
+        reserve: Seconds to keep back for the steps that follow (e.g. the curated fallback)
+
+    Returns:
+        min(default, remaining - reserve), never below a small floor so clients don't reject it
+    """
+    left = remaining()
+    if left is None:
+        return default
+    return max(0.05, min(default, left - reserve))
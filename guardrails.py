@@ -26,6 +26,13 @@ BUSINESS_KEYWORDS = {
     "what", "tell", "about", "information", "details", "explain", "describe"
 }
 
+def _count(reason: str) -> None:
+    try:
+        from observability import GUARDRAIL_EVENTS
+        GUARDRAIL_EVENTS.labels(reason=reason).inc()
+    except Exception:
+        pass
+
 # PII PATTERNS
 
 PII_PATTERNS = [
@@ -61,6 +68,7 @@ def is_business_related(question: str) -> bool:
     for off_topic in off_topic_keywords:
         if off_topic in question_lower:
             logger.warning(f"Question rejected (off-topic keyword: {off_topic})")
+            _count("off_topic")
             return False
     
     # Check for greetings (always allow)
@@ -109,11 +117,14 @@ def apply_guardrails(text: str) -> str:
     for word in BANNED_WORDS:
         if word.lower() in text.lower():
             logger.warning(f"Banned word found: {word}")
+            _count("banned_word")
             text = text.replace(word, "BANNED_CONTENT")
             
     # 2. Check for PII
     for pattern, replacement in PII_PATTERNS:
-        text = re.sub(pattern, replacement, text)
+        text, redactions = re.subn(pattern, replacement, text)
+        if redactions:
+            _count("pii_redacted")
     
     if original_text != text:
         logger.info("Guardrails modified the output")
@@ -0,0 +1,128 @@
+"""
+Hedged provider execution
+Launch the primary provider and, if it hasn't answered within its p95 latency,
+race a secondary provider and keep whichever succeeds first
+"""
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional, Tuple
+
+import deadline
+import profiling
+import provider_stats
+from config import HEDGE_DEFAULT_DELAY_SECONDS, HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, HEDGE_BUDGET_RATIO, HEDGE_MAX_WORKERS
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+
+# Hedging budget: every primary call earns HEDGE_BUDGET_RATIO tokens, every hedge spends one
+_budget_lock = threading.Lock()
+_budget_tokens = 1.0
+_BUDGET_CAP = 10.0
+
+def _is_success(result: Optional[str]) -> bool:
+    return bool(result) and not result.startswith("Error")
+
+def hedge_delay(provider: str) -> float:
+    """Seconds to wait for the primary before hedging (its p95 latency, or the configured default)"""
+    p95_ms = provider_stats.percentile(provider, HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES)
+    if p95_ms is None:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    return p95_ms / 1000.0
+
+def _earn_budget() -> None:
+    global _budget_tokens
+    with _budget_lock:
+        _budget_tokens = min(_BUDGET_CAP, _budget_tokens + HEDGE_BUDGET_RATIO)
+
+def _spend_budget() -> bool:
+    global _budget_tokens
+    with _budget_lock:
+        if _budget_tokens >= 1.0:
+            _budget_tokens -= 1.0
+            return True
+        return False
+
+def _submit(provider: str, fn: Callable[[], str]):
+    # copy the context so the request deadline follows the call into the worker thread
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, profiling.run_attached, provider_stats.timed, provider, fn)
+
+def _result(future) -> Optional[str]:
+    try:
+        return future.result()
+    except Exception as e:
+        logging.warning(f"Hedged call raised: {e}")
+        return None
+
+def hedged_call(primary: Tuple[str, Callable[[], str]],
+                secondary: Tuple[str, Callable[[], str]]) -> Tuple[Optional[str], str]:
+    """
+    Run primary, hedging with secondary if primary is slow
+
+    Args:
+        primary: (provider name, zero-argument callable)
+        secondary: (provider name, zero-argument callable)
+
+    Returns:
+        (response, provider name) - response is an "Error..." string if both failed
+    """
+    primary_name, primary_fn = primary
+    secondary_name, secondary_fn = secondary
+    _earn_budget()
+
+    delay = hedge_delay(primary_name)
+    left = deadline.remaining()
+    if left is not None:
+        delay = min(delay, left)
+
+    primary_future = _submit(primary_name, primary_fn)
+    done, _ = wait([primary_future], timeout=delay)
+    if done:
+        result = _result(primary_future)
+        if _is_success(result):
+            return result, primary_name
+        # primary failed fast - fall back without hedging, still within the request deadline
+        if deadline.expired():
+            return result or "Error: Deadline exceeded", primary_name
+        logging.info(f"{primary_name} failed, trying {secondary_name}")
+        secondary_future = _submit(secondary_name, secondary_fn)
+        done, _ = wait([secondary_future], timeout=deadline.remaining())
+        if not done:
+            secondary_future.cancel()
+            return "Error: Deadline exceeded", secondary_name
+        return _result(secondary_future) or "Error: Hedged providers unavailable", secondary_name
+
+    if deadline.expired():
+        # the deadline was shorter than the hedge delay: a hedge now would be paid for and never used
+        primary_future.cancel()
+        return "Error: Deadline exceeded", primary_name
+
+    if not _spend_budget():
+        logging.info(f"Hedging budget exhausted, waiting for {primary_name}")
+        done, _ = wait([primary_future], timeout=deadline.remaining())
+        result = _result(primary_future) if done else "Error: Deadline exceeded"
+        return result, primary_name
+
+    logging.info(f"⏱️ {primary_name} slower than {delay:.2f}s, hedging with {secondary_name}")
+    secondary_future = _submit(secondary_name, secondary_fn)
+    futures = {primary_future: primary_name, secondary_future: secondary_name}
+    pending = set(futures)
+    last_error = "Error: Hedged providers unavailable"
+    while pending:
+        done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            last_error = "Error: Deadline exceeded while hedging"
+            break
+        for future in done:
+            result = _result(future)
+            if _is_success(result):
+                for loser in pending:
+                    # a running thread can't be interrupted; its result is simply discarded
+                    loser.cancel()
+                    logging.info(f"Discarding slower provider {futures[loser]}")
+                return result, futures[future]
+            if result:
+                last_error = result
+    return last_error, primary_name
@@ -0,0 +1,132 @@
+"""
+Background warm-up for Hugging Face models
+Live requests never wait for a model to load: a model seen loading is marked cold and
+requests skip straight to the next provider while this thread probes it (jittered
+exponential backoff) until it answers, then keeps it warm with periodic 1-token probes.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from config import (
+    HF_KEEP_WARM_INTERVAL_SECONDS, HF_WARMUP_BACKOFF_BASE_SECONDS, HF_WARMUP_BACKOFF_MAX_SECONDS,
+)
+
+UNKNOWN, WARM, COLD, FAILING = "unknown", "warm", "cold", "failing"
+_PROBE_PROMPT = "ping"
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_models: Dict[str, dict] = {}
+_thread: Optional[threading.Thread] = None
+
+def _entry(model: str) -> dict:
+    if model not in _models:
+        _models[model] = {"state": UNKNOWN, "failures": 0, "next_probe": 0.0, "last_probe": None, "last_error": None}
+    return _models[model]
+
+def jittered_backoff(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def is_ready(model: str) -> bool:
+    """False while a model is known to be loading; requests should skip it"""
+    with _lock:
+        entry = _entry(model)
+        if entry["state"] != COLD:
+            return True
+        # without the warmer thread a live request is the probe, once the backoff has passed
+        return _thread is None and time.time() >= entry["next_probe"]
+
+def mark_warm(model: str) -> None:
+    _set(model, WARM, error=None)
+
+def mark_cold(model: str, error: str = "loading") -> None:
+    """A request saw the model loading: skip it and let the warmer bring it up"""
+    _set(model, COLD, error=error)
+    _wake.set()
+
+def _set(model: str, state: str, error: Optional[str]) -> None:
+    now = time.time()
+    with _lock:
+        entry = _entry(model)
+        previous = entry["state"]
+        entry["state"] = state
+        entry["last_error"] = error
+        if state == WARM:
+            entry["failures"] = 0
+            entry["next_probe"] = now + HF_KEEP_WARM_INTERVAL_SECONDS
+        else:
+            entry["next_probe"] = now + jittered_backoff(entry["failures"], HF_WARMUP_BACKOFF_BASE_SECONDS,
+                                                         HF_WARMUP_BACKOFF_MAX_SECONDS)
+            entry["failures"] += 1
+    if previous != state:
+        logging.info(f"Hugging Face model {model}: {previous} -> {state}")
+    try:
+        from observability import HF_MODEL_WARM
+        HF_MODEL_WARM.labels(model=model).set(1 if state == WARM else 0)
+    except Exception:
+        pass
+
+def _probe(model: str) -> None:
+    """One lightweight completion; updates the model state from the outcome"""
+    import rate_limits
+    from llm_client_huggingface import HF_CLIENT
+    if HF_CLIENT is None or not rate_limits.acquire("huggingface", model, 2):
+        with _lock:
+            _entry(model)["next_probe"] = time.time() + HF_WARMUP_BACKOFF_BASE_SECONDS  # no budget, try later
+        return
+    result = "ok"
+    try:
+        HF_CLIENT.chat_completion(messages=[{"role": "user", "content": _PROBE_PROMPT}], model=model, max_tokens=1)
+        mark_warm(model)
+    except Exception as e:
+        rate_limits.settle("huggingface", model, 2, 0)  # refund the probe's reservation
+        error_str = str(e).lower()
+        if "loading" in error_str or "503" in error_str:
+            result = "loading"
+            _set(model, COLD, error=str(e)[:200])
+        else:
+            result = "error"
+            _set(model, FAILING, error=str(e)[:200])
+    finally:
+        with _lock:
+            _entry(model)["last_probe"] = time.time()
+        try:
+            from observability import HF_WARM_PROBES
+            HF_WARM_PROBES.labels(model=model, result=result).inc()
+        except Exception:
+            pass
+
+def _run() -> None:
+    while True:
+        with _lock:
+            now = time.time()
+            due = [model for model, entry in _models.items() if entry["next_probe"] <= now]
+            next_at = min((entry["next_probe"] for entry in _models.values()), default=now + HF_KEEP_WARM_INTERVAL_SECONDS)
+        for model in due:
+            _probe(model)
+        _wake.wait(timeout=max(1.0, next_at - time.time()) if not due else 1.0)
+        _wake.clear()
+
+def start(models: Iterable[str]) -> None:
+    """Register models and start the warmer thread (idempotent)"""
+    global _thread
+    with _lock:
+        for model in models:
+            _entry(model)
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run, name="hf-warmer", daemon=True)
+        _thread.start()
+    logging.info(f"Hugging Face warmer started for {', '.join(_models)}")
+
+def status() -> list:
+    with _lock:
+        now = time.time()
+        return [{"model": model, "state": entry["state"], "failures": entry["failures"],
+                 "next_probe_in_seconds": round(max(0.0, entry["next_probe"] - now), 1),
+                 "last_probe": entry["last_probe"], "last_error": entry["last_error"]}
+                for model, entry in _models.items()]
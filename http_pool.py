@@ -0,0 +1,155 @@
+"""
+Shared pooled HTTP clients for all outbound calls
+Keep-alive connection pools (requests for Serper/DuckDuckGo/Hugging Face, httpx for OpenAI),
+pre-warmed at startup and exported as Prometheus metrics
+"""
+import logging
+import threading
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS, HTTP2_ENABLED, HTTP_PREWARM_URLS, OPENAI_BASE_URL,
+)
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_httpx_client = None
+_httpx_stats_warned = False
+
+def session() -> requests.Session:
+    """Process-wide requests.Session with a tuned keep-alive pool"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                      pool_maxsize=HTTP_POOL_MAXSIZE,
+                                      max_retries=0)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({"Connection": "keep-alive"})
+                _session = s
+                logging.info(f"HTTP pool ready ({HTTP_POOL_CONNECTIONS} hosts x {HTTP_POOL_MAXSIZE} connections)")
+    return _session
+
+def timeout(read_seconds: float) -> Tuple[float, float]:
+    """(connect, read) timeout tuple for requests"""
+    return (min(HTTP_CONNECT_TIMEOUT_SECONDS, read_seconds), read_seconds)
+
+def httpx_client():
+    """Process-wide httpx.Client (HTTP/2 when the h2 package is installed), or None without httpx"""
+    global _httpx_client
+    if httpx is None:
+        return None
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                http2 = HTTP2_ENABLED
+                if http2:
+                    try:
+                        import h2  # noqa: F401
+                    except ImportError:
+                        logging.info("h2 not installed, OpenAI client will use HTTP/1.1 keep-alive")
+                        http2 = False
+                _httpx_client = httpx.Client(
+                    http2=http2,
+                    limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE,
+                                        max_keepalive_connections=HTTP_POOL_MAXSIZE,
+                                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS),
+                    timeout=httpx.Timeout(60.0, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+                )
+    return _httpx_client
+
+def prewarm(urls=HTTP_PREWARM_URLS) -> None:
+    """Open keep-alive connections to upstream hosts in the background (TCP+TLS handshake done up front)"""
+    def _warm():
+        for url in urls:
+            try:
+                if url.startswith(OPENAI_BASE_URL or "https://api.openai.com") and httpx_client() is not None:
+                    httpx_client().head(url, timeout=HTTP_CONNECT_TIMEOUT_SECONDS * 2)
+                else:
+                    session().head(url, timeout=timeout(HTTP_CONNECT_TIMEOUT_SECONDS * 2))
+                logging.info(f"Pre-warmed connection to {url}")
+            except Exception as e:
+                logging.warning(f"Could not pre-warm {url}: {e}")
+    threading.Thread(target=_warm, name="http-prewarm", daemon=True).start()
+
+def pool_stats() -> list:
+    """Per-host connection pool utilization"""
+    rows = []
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+                rows.append({
+                    "client": "requests",
+                    "host": pool.host,
+                    "connections_opened": pool.num_connections,
+                    "idle": idle,
+                    "requests": pool.num_requests,
+                    "maxsize": pool.maxsize,
+                })
+    if _httpx_client is not None:
+        rows.extend(_httpx_pool_stats())
+    return rows
+
+def _httpx_pool_stats() -> list:
+    """
+    Best-effort httpx pool rows
+
+    httpx has no public pool API, so this reads httpcore's ConnectionPool behind the
+    client's private _transport. Any layout change yields no rows (logged once) rather
+    than an error at scrape time.
+    """
+    global _httpx_stats_warned
+    pool = getattr(getattr(_httpx_client, "_transport", None), "_pool", None)
+    hosts = {}
+    try:
+        for conn in getattr(pool, "connections", None) or ():
+            origin = getattr(conn, "_origin", None)
+            host = origin.host.decode() if origin is not None else "unknown"
+            row = hosts.setdefault(host, {"client": "httpx", "host": host, "connections_opened": 0,
+                                          "idle": 0, "requests": None, "maxsize": HTTP_POOL_MAXSIZE})
+            row["connections_opened"] += 1
+            row["idle"] += 1 if conn.is_idle() else 0
+    except Exception as e:
+        if not _httpx_stats_warned:
+            _httpx_stats_warned = True
+            logging.warning(f"httpx pool metrics unavailable with this httpx/httpcore version: {e}")
+        return []
+    return list(hosts.values())
+
+try:
+    from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+    class _PoolCollector:
+        """Reads pool utilization at scrape time"""
+        def collect(self):
+            opened = GaugeMetricFamily("genai_http_pool_connections", "Open pooled connections per host", labels=["client", "host"])
+            idle = GaugeMetricFamily("genai_http_pool_idle_connections", "Idle keep-alive connections per host", labels=["client", "host"])
+            in_use = GaugeMetricFamily("genai_http_pool_in_use_connections", "Checked-out connections per host", labels=["client", "host"])
+            for row in pool_stats():
+                labels = [row["client"], row["host"]]
+                opened.add_metric(labels, row["connections_opened"])
+                idle.add_metric(labels, row["idle"])
+                in_use.add_metric(labels, max(0, row["connections_opened"] - row["idle"]))
+            yield opened
+            yield idle
+            yield in_use
+
+    REGISTRY.register(_PoolCollector())
+except ImportError:
+    pass
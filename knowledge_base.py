@@ -1,256 +1,362 @@
 """
 Intelligent Knowledge Base - Detailed product information for Plywood Studio
+Loaded from a versioned data file (data/knowledge_base.json) and hot-reloaded when it changes
 """
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
-# Comprehensive product knowledge
-PLYWOOD_KNOWLEDGE = {
-    "marine_plywood": {
-        "description": "Marine plywood is the highest grade of plywood, made with waterproof adhesive (BWP - Boiling Water Proof). It's designed to withstand moisture, humidity, and wet conditions.",
-        "features": [
-            "BWP (Boiling Water Proof) grade adhesive",
-            "No voids or gaps in the core layers",
-            "High resistance to moisture and humidity",
-            "Termite and borer resistant",
-            "Durable construction, longer lifespan",
-            "Smooth, uniform surface"
-        ],
-        "applications": "Outdoor furniture, boat building, kitchen cabinets, bathrooms, coastal areas",
-        "brands_we_carry": "Sainik MR Plywood, Centuryply Marine Grade",
-        "difference_from_regular": "Marine plywood uses BWP glue vs MR (Moisture Resistant) or commercial grade glue in regular plywood. It has no core gaps and is made with better quality veneers."
-    },
+from config import KNOWLEDGE_BASE_PATH, KNOWLEDGE_RELOAD_INTERVAL_SECONDS
+
+_REQUIRED_SECTIONS = ("version", "plywood", "brands", "doors", "laminates", "technical_specs")
+
+# Current knowledge snapshot - replaced as a whole on reload, never mutated in place
+_snapshot: dict = {}
+_snapshot_mtime: Optional[float] = None
+_reload_lock = threading.Lock()
+_listeners: List[Callable[[dict], None]] = []
+_watcher = None
+
+# Module-level views of the current snapshot (kept for existing importers)
+PLYWOOD_KNOWLEDGE: dict = {}
+BRAND_KNOWLEDGE: dict = {}
+DOOR_KNOWLEDGE: dict = {}
+LAMINATE_KNOWLEDGE: dict = {}
+TECHNICAL_SPECS: dict = {}
+
+def snapshot() -> dict:
+    """The current knowledge snapshot; hold on to the returned dict for a consistent view"""
+    return _snapshot
+
+def version() -> str:
+    return _snapshot.get("version", "unknown")
+
+def _read(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    missing = [section for section in _REQUIRED_SECTIONS if section not in data]
+    if missing:
+        raise ValueError(f"knowledge base file {path} is missing sections: {', '.join(missing)}")
+    return data
+
+def reload(path: str = KNOWLEDGE_BASE_PATH, force: bool = False) -> bool:
+    """
+    Load the knowledge file and swap it in atomically
+
+    Returns True if a new snapshot was installed. A broken file is logged and the
+    previous snapshot stays in place.
+    """
+    global _snapshot, _snapshot_mtime
+    global PLYWOOD_KNOWLEDGE, BRAND_KNOWLEDGE, DOOR_KNOWLEDGE, LAMINATE_KNOWLEDGE, TECHNICAL_SPECS
+    
+    with _reload_lock:
+        try:
+            mtime = os.path.getmtime(path)
+            if not force and mtime == _snapshot_mtime:
+                return False
+            data = _read(path)
+        except Exception as e:
+            logging.error(f"Knowledge base reload failed, keeping version {version()}: {e}")
+            return False
+        
+        old_version = _snapshot.get("version")
+        # derived, read-only views - built once here so requests never re-render
+        data["alias_index"] = _build_alias_index(data)
+        data["rendered_answers"] = _render_answers(data)
+        data["rendered_documents"] = _render_documents(data)
+        _snapshot = data
+        _snapshot_mtime = mtime
+        PLYWOOD_KNOWLEDGE = data["plywood"]
+        BRAND_KNOWLEDGE = data["brands"]
+        DOOR_KNOWLEDGE = data["doors"]
+        LAMINATE_KNOWLEDGE = data["laminates"]
+        TECHNICAL_SPECS = data["technical_specs"]
+        logging.info(f"Knowledge base loaded: version {data['version']} (previous: {old_version})")
     
-    "commercial_plywood": {
-        "description": "Commercial plywood is the most economical grade, suitable for interior applications where moisture exposure is minimal.",
-        "features": [
-            "Made with urea formaldehyde adhesive",
-            "Cost-effective option",
-            "Good for dry indoor use",
-            "Various thickness options (4mm to 25mm)"
-        ],
-        "applications": "Indoor furniture, partitions, false ceilings, interior paneling",
-        "brands_we_carry": "Centuryply, Greenply commercial grades"
-    },
+    for listener in list(_listeners):
+        try:
+            listener(data)
+        except Exception as e:
+            logging.warning(f"Knowledge reload listener {getattr(listener, '__name__', listener)} failed: {e}")
+    return True
+
+def on_reload(callback: Callable[[dict], None]) -> None:
+    """Register a callback run with the new snapshot after each successful reload"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+def start_watcher(path: str = KNOWLEDGE_BASE_PATH, interval: float = KNOWLEDGE_RELOAD_INTERVAL_SECONDS) -> None:
+    """Poll the knowledge file's mtime in the background and hot-reload on change"""
+    global _watcher
+    if _watcher and _watcher.is_alive():
+        return
     
-    "mr_plywood": {
-        "description": "MR (Moisture Resistant) Plywood is made with phenolic adhesive, offering better moisture resistance than commercial plywood.",
-        "features": [
-            "Phenolic resin adhesive",
-            "Moderate moisture resistance",
-            "Good strength and durability",
-            "Affordable for most applications"
-        ],
-        "applications": "Home furniture, bedroom furniture, living room furniture, interior applications",
-        "brands_we_carry": "Sainik MR Plywood, Centuryply Bond 710"
-    },
+    def _loop():
+        while True:
+            time.sleep(interval)
+            reload(path)
     
-    "bwp_plywood": {
-        "description": "BWP (Boiling Water Proof) Plywood uses phenol formaldehyde adhesive for maximum water resistance.",
-        "features": [
-            "Phenol formaldehyde adhesive",
-            "Excellent water resistance",
-            "Can withstand boiling water test",
-            "Premium quality veneers"
-        ],
-        "applications": "Kitchens, bathrooms, outdoor furniture, high moisture areas",
-        "brands_we_carry": "Centuryply Club Prime, Premium marine grade plywood"
-    }
-}
-
-BRAND_KNOWLEDGE = {
-    "centuryply": {
-        "description": "Centuryply is one of India's most trusted and largest plywood brands, known for innovation and quality.",
-        "history": "Established in 1986, Centuryply pioneered the concept of branded plywood in India.",
-        "products_we_carry": {
-            "Club Prime": "Premium BWP grade plywood with ViroKill technology (anti-viral and anti-bacterial)",
-            "Bond 710": "MR grade plywood with excellent bonding strength, 7-layer construction for 10mm thickness",
-            "Sainik 710": "BWP grade with enhanced moisture resistance"
-        },
-        "unique_features": "ViroKill technology, 6X Nail Holding Strength, Borer & Termite Proof, Zero Emission",
-        "warranty": "Varies by product - typically 5-25 years"
-    },
+    _watcher = threading.Thread(target=_loop, name="knowledge-watcher", daemon=True)
+    _watcher.start()
+    logging.info(f"Watching {path} for knowledge base changes every {interval}s")
+
+# Sections served by get_knowledge, in tie-break priority order
+_LOOKUP_SECTIONS = ("plywood", "brands", "doors")
+_MAX_NGRAM = 3
+
+def _normalize_token(token: str) -> str:
+    # crude singularization so "doors" matches "door"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens, with "18 mm" joined to "18mm" """
+    text = re.sub(r"(\d+(?:\.\d+)?)\s*mm\b", r"\1mm", text.lower())
+    return [_normalize_token(t) for t in re.findall(r"[a-z0-9.]+", text) if t.strip(".")]
+
+def _ngrams(tokens: List[str]):
+    for n in range(1, _MAX_NGRAM + 1):
+        for i in range(len(tokens) - n + 1):
+            yield tuple(tokens[i:i + n])
+
+def _entry_aliases(key: str, entry: dict) -> List[str]:
+    """Explicit aliases plus names derived from the entry key, display name and products"""
+    aliases = list(entry.get("aliases", []))
+    aliases.append(key.replace("_", " "))
+    if entry.get("name"):
+        aliases.append(entry["name"])
+    aliases.extend(entry.get("products_we_carry", {}).keys())
+    return aliases
+
+def _build_alias_index(data: dict) -> Dict[tuple, List[Tuple[str, str]]]:
+    """Map normalized alias n-grams to the (section, key) entries they name"""
+    index: Dict[tuple, List[Tuple[str, str]]] = {}
+    for section in _LOOKUP_SECTIONS:
+        for key, entry in data.get(section, {}).items():
+            for alias in _entry_aliases(key, entry):
+                tokens = tuple(_tokenize(alias))
+                if not tokens or len(tokens) > _MAX_NGRAM:
+                    continue
+                targets = index.setdefault(tokens, [])
+                if (section, key) not in targets:
+                    targets.append((section, key))
+    return index
+
+def search_knowledge(topic: str, limit: int = 3) -> List[Tuple[str, str, int]]:
+    """
+    Ranked knowledge entries matching a query
+
+    Every query n-gram is looked up in the alias index (constant time per n-gram);
+    an entry scores the length of each alias it matches, so "marine plywood" beats
+    "plywood". Ties keep the plywood > brands > doors priority.
+
+    Returns:
+        [(section, key, score), ...] best first
+    """
+    kb = snapshot()
+    index = kb.get("alias_index", {})
+    scores: Dict[Tuple[str, str], int] = {}
+    for gram in _ngrams(_tokenize(topic)):
+        for target in index.get(gram, ()):
+            scores[target] = scores.get(target, 0) + len(gram)
     
-    "sainik": {
-        "description": "Sainik is a premium plywood brand known for marine-grade quality and durability.",
-        "specialty": "Specializes in MR and BWP grade plywood with excellent moisture resistance",
-        "products_we_carry": {
-            "Sainik MR Plywood": "Moisture resistant grade suitable for all indoor applications",
-            "Sainik BWP": "Boiling water proof grade for high moisture areas"
-        },
-        "unique_features": "7-ply construction for 6mm, no core gaps, uniform thickness, smooth surface",
-        "warranty": "Long-term warranty against manufacturing defects"
-    },
+    priority = {section: i for i, section in enumerate(_LOOKUP_SECTIONS)}
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], priority[item[0][0]]))
+    return [(section, key, score) for (section, key), score in ranked[:limit]]
+
+def get_knowledge(topic: str) -> str:
+    """Get knowledge about a specific topic (pre-rendered when the snapshot was loaded)"""
+    kb = snapshot()  # one consistent view even if a reload lands mid-lookup
+    matches = search_knowledge(topic, limit=1)
+    if not matches:
+        return None
     
-    "greenply": {
-        "description": "Greenply is another leading plywood brand in India, known for eco-friendly products.",
-        "specialty": "Focus on environmental sustainability and green products",
-        "products_we_carry": {
-            "Greenply Plywood": "Various grades including MR and BWP",
-            "Greenply Flush Doors": "Engineered wooden doors with plywood facing",
-            "Greenply Laminates": "Decorative laminates for surfaces"
-        },
-        "unique_features": "E0 grade (low emission), termite resistant, borer proof",
-        "warranty": "Product-specific warranties available"
-    }
-}
-
-DOOR_KNOWLEDGE = {
-    "flush_doors": {
-        "description": "Flush doors have a smooth, flat surface made with plywood sheets on a wooden frame.",
-        "construction": "Solid wood frame with plywood facing on both sides, hollow or solid core",
-        "advantages": "Smooth finish, easy to paint, cost-effective, lightweight (hollow core)",
-        "applications": "Interior doors, bedroom doors, bathroom doors",
-        "sizes": "Standard: 7ft x 3ft, 7ft x 3.5ft, 8ft x 3ft, 8ft x 4ft (custom sizes available)",
-        "brands_we_carry": "Greenply Flush Doors"
-    },
+    section, key, _ = matches[0]
+    return kb["rendered_answers"][f"{section}:{key}"]
+
+def rendered_answer(section: str, key: str) -> Optional[str]:
+    """Pre-rendered markdown answer for one knowledge entry"""
+    return snapshot().get("rendered_answers", {}).get(f"{section}:{key}")
+
+def rendered_documents() -> Tuple[Tuple[str, dict], ...]:
+    """Pre-rendered RAG document texts for the current snapshot: ((content, metadata), ...)"""
+    return snapshot().get("rendered_documents", ())
+
+def _render_answers(data: dict) -> Dict[str, str]:
+    """Render every lookup entry into its markdown answer once per snapshot"""
+    formatters = {"plywood": _format_plywood_info, "brands": _format_brand_info, "doors": _format_door_info}
+    answers = {}
+    for section in _LOOKUP_SECTIONS:
+        for key, entry in data.get(section, {}).items():
+            name = entry.get("name", key.replace("_", " ").title())
+            answers[f"{section}:{key}"] = sys.intern(formatters[section](name, entry))
+    return answers
+
+def _render_documents(data: dict) -> Tuple[Tuple[str, dict], ...]:
+    """Render every knowledge entry into RAG document text once per snapshot: ((content, metadata), ...)"""
+    documents = []
     
-    "panel_doors": {
-        "description": "Panel doors have raised or recessed panels set within a frame, offering traditional aesthetic.",
-        "construction": "Solid wood frame with decorative panels",
-        "advantages": "Traditional look, elegant design, durable, various panel configurations",
-        "applications": "Main doors, bedroom doors, study room doors",
-        "finishes_available": "Natural wood, polish finish, painted"
-    },
+    # Add plywood knowledge
+    for product_type, info in data['plywood'].items():
+        content = f"""Product: {product_type.replace('_', ' ').title()}
+
+Description: {info['description']}
+
+Features:
+{chr(10).join('- ' + feature for feature in info.get('features', []))}
+
+Applications: {info.get('applications', 'N/A')}
+
+Brands Available: {info.get('brands_we_carry', 'Various brands')}
+
+{info.get('difference_from_regular', '')}
+"""
+        documents.append((content, {"type": "plywood", "product": product_type}))
     
-    "laminate_doors": {
-        "description": "Doors with decorative laminate finish on plywood base.",
-        "advantages": "Attractive finish, scratch resistant, easy to maintain, variety of designs",
-        "applications": "Modern interiors, commercial spaces, contemporary homes",
-        "finishes_available": "Wood grain, solid colors, textured finishes"
-    }
-}
-
-LAMINATE_KNOWLEDGE = {
-    "description": "Decorative laminates are thin sheets bonded to plywood or particleboard for aesthetic appeal.",
-    "types": {
-        "Sunmica": "Popular brand name, various thicknesses (0.8mm, 1mm, 1.5mm)",
-        "Wood grain": "Natural wood patterns",
-        "Solid colors": "Plain colors - white, black, cream, etc.",
-        "Textured": "Matt, glossy, or textured finishes"
-    },
-    "applications": "Furniture surfaces, kitchen cabinets, wardrobes, tables, wall paneling",
-    "thickness_options": "0.8mm, 1mm, 1.5mm (thicker for horizontal surfaces)",
-    "brands_we_carry": "Various brands including Greenply laminates"
-}
-
-TECHNICAL_SPECS = {
-    "plywood_thickness": {
-        "common_sizes": ["4mm", "6mm", "9mm", "12mm", "15mm", "18mm", "25mm"],
-        "applications": {
-            "4mm": "Backing panels, false ceilings",
-            "6mm": "Cabinet backs, drawer bottoms",
-            "9mm": "Furniture shutters, partitions",
-            "12mm": "Standard furniture, shelves",
-            "15mm-18mm": "Heavy duty furniture, countertops",
-            "25mm": "Industrial applications, heavy load bearing"
-        }
-    },
+    # Add brand knowledge
+    for brand, info in data['brands'].items():
+        products_text = "\n".join(
+            f"- {name}: {desc}" 
+            for name, desc in info.get('products_we_carry', {}).items()
+        )
+        
+        content = f"""Brand: {brand.title()}
+
+Description: {info['description']}
+
+History: {info.get('history', 'N/A')}
+
+Products We Carry:
+{products_text}
+
+Unique Features: {info.get('unique_features', 'N/A')}
+
+Warranty: {info.get('warranty', 'Available')}
+"""
+        documents.append((content, {"type": "brand", "brand": brand}))
     
-    "plywood_grades": {
-        "BWP": "Boiling Water Proof - Highest grade, phenol formaldehyde glue",
-        "BWR": "Boiling Water Resistant - Phenolic glue, good moisture resistance",
-        "MR": "Moisture Resistant - Urea formaldehyde modified, indoor use",
-        "Commercial": "Interior grade, minimal moisture resistance"
-    }
-}
+    # Add door knowledge
+    for door_type, info in data['doors'].items():
+        content = f"""Product: {door_type.replace('_', ' ').title()}
 
-def get_knowledge(topic: str) -> str:
-    """Get knowledge about a specific topic"""
-    topic_lower = topic.lower()
+Description: {info['description']}
+
+Construction: {info.get('construction', 'N/A')}
+
+Advantages: {info.get('advantages', 'N/A')}
+
+Applications: {info.get('applications', 'N/A')}
+
+Sizes Available: {info.get('sizes', 'Standard and custom sizes')}
+
+Brands: {info.get('brands_we_carry', 'Various brands')}
+"""
+        documents.append((content, {"type": "door", "product": door_type}))
     
-    # Plywood types
-    if "marine" in topic_lower:
-        info = PLYWOOD_KNOWLEDGE["marine_plywood"]
-        return _format_plywood_info("Marine Plywood", info)
-    elif "mr plywood" in topic_lower or "moisture resistant" in topic_lower:
-        info = PLYWOOD_KNOWLEDGE["mr_plywood"]
-        return _format_plywood_info("MR (Moisture Resistant) Plywood", info)
-    elif "bwp" in topic_lower or "boiling water" in topic_lower:
-        info = PLYWOOD_KNOWLEDGE["bwp_plywood"]
-        return _format_plywood_info("BWP (Boiling Water Proof) Plywood", info)
-    elif "commercial" in topic_lower:
-        info = PLYWOOD_KNOWLEDGE["commercial_plywood"]
-        return _format_plywood_info("Commercial Plywood", info)
+    # Add laminate knowledge
+    content = f"""Product: Decorative Laminates
+
+{data['laminates']['description']}
+
+Types Available:
+{chr(10).join(f"- {name}: {desc}" for name, desc in data['laminates']['types'].items())}
+
+Applications: {data['laminates']['applications']}
+
+Thickness Options: {data['laminates']['thickness_options']}
+
+Brands: {data['laminates']['brands_we_carry']}
+"""
+    documents.append((content, {"type": "laminate"}))
     
-    # Brands
-    if "centuryply" in topic_lower or "century ply" in topic_lower:
-        return _format_brand_info("Centuryply", BRAND_KNOWLEDGE["centuryply"])
-    elif "sainik" in topic_lower:
-        return _format_brand_info("Sainik", BRAND_KNOWLEDGE["sainik"])
-    elif "greenply" in topic_lower:
-        return _format_brand_info("Greenply", BRAND_KNOWLEDGE["greenply"])
+    # Add technical specifications
+    thickness_info = data['technical_specs']['plywood_thickness']
+    apps_text = "\n".join(
+        f"- {size}: {app}"
+        for size, app in thickness_info['applications'].items()
+    )
     
-    # Doors
-    if "flush door" in topic_lower:
-        return _format_door_info("Flush Doors", DOOR_KNOWLEDGE["flush_doors"])
-    elif "panel door" in topic_lower:
-        return _format_door_info("Panel Doors", DOOR_KNOWLEDGE["panel_doors"])
-    elif "laminate door" in topic_lower:
-        return _format_door_info("Laminate Doors", DOOR_KNOWLEDGE["laminate_doors"])
+    content = f"""Technical Specifications: Plywood Thickness
+
+Common Sizes: {', '.join(thickness_info['common_sizes'])}
+
+Applications by Thickness:
+{apps_text}
+
+Plywood Grades:
+{chr(10).join(f"- {grade}: {desc}" for grade, desc in data['technical_specs']['plywood_grades'].items())}
+"""
+    documents.append((content, {"type": "technical"}))
     
-    return None
+    documents.append((data.get("business_document", ""), {"type": "business"}))
+    return tuple((sys.intern(content), metadata) for content, metadata in documents)
 
 def _format_plywood_info(name: str, info: dict) -> str:
     """Format plywood information"""
-    output = f"**{name}**\n\n"
-    output += f"{info['description']}\n\n"
+    parts = [f"**{name}**\n\n", f"{info['description']}\n\n"]
     
     if "features" in info and info["features"]:
-        output += "**Key Features:**\n"
-        for feature in info["features"]:
-            output += f"• {feature}\n"
-        output += "\n"
+        parts.append("**Key Features:**\n")
+        parts.extend(f"• {feature}\n" for feature in info["features"])
+        parts.append("\n")
     
     if "applications" in info:
-        output += f"**Applications:** {info['applications']}\n\n"
+        parts.append(f"**Applications:** {info['applications']}\n\n")
     
     if "brands_we_carry" in info:
-        output += f"**Available at Plywood Studio:** {info['brands_we_carry']}\n\n"
+        parts.append(f"**Available at Plywood Studio:** {info['brands_we_carry']}\n\n")
     
     if "difference_from_regular" in info:
-        output += f"**Difference from Regular Plywood:** {info['difference_from_regular']}\n\n"
+        parts.append(f"**Difference from Regular Plywood:** {info['difference_from_regular']}\n\n")
     
-    output += "💡 For specific specifications, current stock, and pricing, contact us via IndiaMART or visit our Goshamahal, Hyderabad showroom."
+    parts.append("💡 For specific specifications, current stock, and pricing, contact us via IndiaMART or visit our Goshamahal, Hyderabad showroom.")
     
-    return output
+    return "".join(parts)
 
 def _format_brand_info(name: str, info: dict) -> str:
     """Format brand information"""
-    output = f"**{name}**\n\n"
-    output += f"{info['description']}\n\n"
+    parts = [f"**{name}**\n\n", f"{info['description']}\n\n"]
     
     if "history" in info:
-        output += f"**History:** {info['history']}\n\n"
+        parts.append(f"**History:** {info['history']}\n\n")
     
     if "products_we_carry" in info:
-        output += "**Products We Carry:**\n"
-        for product, desc in info["products_we_carry"].items():
-            output += f"• **{product}**: {desc}\n"
-        output += "\n"
+        parts.append("**Products We Carry:**\n")
+        parts.extend(f"• **{product}**: {desc}\n" for product, desc in info["products_we_carry"].items())
+        parts.append("\n")
     
     if "unique_features" in info:
-        output += f"**Unique Features:** {info['unique_features']}\n\n"
+        parts.append(f"**Unique Features:** {info['unique_features']}\n\n")
     
-    output += "💡 Contact us via IndiaMART (www.indiamart.com/plywoodstudio) for current availability and pricing."
+    parts.append("💡 Contact us via IndiaMART (www.indiamart.com/plywoodstudio) for current availability and pricing.")
     
-    return output
+    return "".join(parts)
 
 def _format_door_info(name: str, info: dict) -> str:
     """Format door information"""
-    output = f"**{name}**\n\n"
-    output += f"{info['description']}\n\n"
+    parts = [f"**{name}**\n\n", f"{info['description']}\n\n"]
     
     if "construction" in info:
-        output += f"**Construction:** {info['construction']}\n\n"
+        parts.append(f"**Construction:** {info['construction']}\n\n")
     
     if "advantages" in info:
-        output += f"**Advantages:** {info['advantages']}\n\n"
+        parts.append(f"**Advantages:** {info['advantages']}\n\n")
     
     if "sizes" in info:
-        output += f"**Sizes:** {info['sizes']}\n\n"
+        parts.append(f"**Sizes:** {info['sizes']}\n\n")
     
     if "brands_we_carry" in info:
-        output += f"**Brands:** {info['brands_we_carry']}\n\n"
+        parts.append(f"**Brands:** {info['brands_we_carry']}\n\n")
     
-    output += "💡 Visit our Goshamahal showroom or contact via IndiaMART for more details."
+    parts.append("💡 Visit our Goshamahal showroom or contact via IndiaMART for more details.")
     
-    return output
+    return "".join(parts)
+
+# Initial load (after the index/format helpers above are defined)
+reload(force=True)
@@ -3,13 +3,31 @@ Hugging Face API Client using official huggingface_hub SDK
 Supports Meta Llama and other instruction-tuned models
 """
 import logging
+import math
+import re
 import time
-from config import HUGGINGFACE_API_KEY, HUGGINGFACE_DEFAULT_MODEL, HUGGINGFACE_FALLBACK_MODEL, TEMPERATURE, MAX_TOKENS
+import deadline
+import hf_warmer
+import http_pool
+import prompts
+import rate_limits
+import usage
+from config import HUGGINGFACE_API_KEY, HUGGINGFACE_BASE_URL, HUGGINGFACE_DEFAULT_MODEL, HUGGINGFACE_FALLBACK_MODEL, TEMPERATURE, MAX_TOKENS, DEADLINE_RESERVE_SECONDS
+from config import HF_RETRY_BACKOFF_BASE_SECONDS, HF_RETRY_BACKOFF_MAX_SECONDS
+
+HF_TIMEOUT_SECONDS = 60  # per-call ceiling when no request deadline is active
+_TIMEOUT_BUCKET_SECONDS = 0.5  # deadline-bound clients are shared per timeout bucket (rounded down)
+_deadline_clients = {}  # timeout bucket -> InferenceClient
 
 try:
+    import huggingface_hub
     from huggingface_hub import InferenceClient
-    HF_CLIENT = InferenceClient(token=HUGGINGFACE_API_KEY) if HUGGINGFACE_API_KEY else None
+    # Route huggingface_hub's requests through the shared keep-alive pool
+    if hasattr(huggingface_hub, "configure_http_backend"):
+        huggingface_hub.configure_http_backend(backend_factory=http_pool.session)
+    HF_CLIENT = InferenceClient(token=HUGGINGFACE_API_KEY, base_url=HUGGINGFACE_BASE_URL, timeout=HF_TIMEOUT_SECONDS) if HUGGINGFACE_API_KEY else None
 except ImportError:
+    InferenceClient = None
     HF_CLIENT = None
     logging.warning("huggingface_hub not installed. Install with: pip install huggingface-hub")
 
@@ -34,7 +52,9 @@ def call(model: str, prompt: str, temperature: float = TEMPERATURE, max_tokens:
     if not result.startswith("Error"):
         return result
     
-    # Try fallback model if primary fails
+    # Try fallback model if primary fails (and the request still has budget)
+    if deadline.expired():
+        return result
     logging.warning(f"Primary model {model} failed, trying fallback {HUGGINGFACE_FALLBACK_MODEL}")
     result = _try_model(HUGGINGFACE_FALLBACK_MODEL, prompt, temperature, max_tokens)
     
@@ -43,16 +63,27 @@ def call(model: str, prompt: str, temperature: float = TEMPERATURE, max_tokens:
 def _try_model(model: str, prompt: str, temperature: float, max_tokens: int, retries: int = 3) -> str:
     """
     Try calling a specific Hugging Face model using official SDK (chat_completion)
+
+    Models that are loading are skipped (see hf_warmer) rather than waited for.
     """
     if not HF_CLIENT:
         return "Error: Hugging Face client not initialized (install huggingface-hub)"
+    if not hf_warmer.is_ready(model):
+        logging.info(f"Skipping {model}: still warming up")
+        return f"Error: Model {model} is warming up"
     
+    estimated_tokens = prompts.count_tokens(prompt) + max_tokens
     for attempt in range(retries):
+        if deadline.expired():
+            logging.warning(f"Request deadline reached, abandoning {model}")
+            return f"Error: Deadline exceeded before {model} responded"
+        if not rate_limits.acquire("huggingface", model, estimated_tokens):
+            return f"Error: Hugging Face rate-limit budget for {model} exhausted"
         try:
             logging.info(f"Calling Hugging Face model: {model} (attempt {attempt + 1}/{retries})")
             
             # Use chat_completion API for conversational models
-            response = HF_CLIENT.chat_completion(
+            response = _client_for_deadline().chat_completion(
                 messages=[{"role": "user", "content": prompt}],
                 model=model,
                 max_tokens=max_tokens,
@@ -65,24 +96,27 @@ def _try_model(model: str, prompt: str, temperature: float, max_tokens: int, ret
                 content = response.choices[0].message.content
                 if content and len(content) > 10:
                     logging.info(f"✅ Hugging Face success: {len(content)} chars")
+                    hf_warmer.mark_warm(model)
+                    _record_usage(model, response, prompt, content, estimated_tokens)
                     return content.strip()
+            rate_limits.settle("huggingface", model, estimated_tokens, 0)  # unusable reply: refund before retrying
             
         except Exception as e:
             error_str = str(e).lower()
+            rate_limits.settle("huggingface", model, estimated_tokens, 0)  # refund the token reservation
             
-            # Handle model loading
+            # Handle model loading: hand the model to the background warmer and move on
             if "loading" in error_str or "503" in error_str:
-                wait_time = 20
-                logging.info(f"Model {model} loading... waiting {wait_time}s")
-                time.sleep(wait_time)
-                continue
+                hf_warmer.mark_cold(model, error=str(e)[:200])
+                return f"Error: Model {model} is loading"
             
-            # Handle rate limiting
-            if "rate" in error_str or "429" in error_str:
-                wait_time = 5 * (attempt + 1)
-                logging.warning(f"Rate limited, waiting {wait_time}s")
-                time.sleep(wait_time)
-                continue
+            # Handle rate limiting: hold this model until Retry-After and let the chain move on
+            # (HTTP 429 or "rate limit" - a bare "rate" also matches "generate"/"accurate")
+            error_response = getattr(e, "response", None)
+            status = getattr(error_response, "status_code", None)
+            if status == 429 or "rate limit" in error_str or re.search(r"\b429\b", error_str):
+                rate_limits.penalize("huggingface", model, error_response.headers if error_response is not None else None)
+                return f"Error: Hugging Face rate limited ({model})"
             
             # Handle auth errors
             if "401" in error_str or "unauthorized" in error_str:
@@ -95,12 +129,54 @@ def _try_model(model: str, prompt: str, temperature: float, max_tokens: int, ret
             
             # Generic error
             logging.error(f"Hugging Face error: {e}")
-            if attempt < retries - 1:
-                time.sleep(2 * (attempt + 1))
+            if attempt < retries - 1 and _sleep_within_deadline(
+                    hf_warmer.jittered_backoff(attempt, HF_RETRY_BACKOFF_BASE_SECONDS, HF_RETRY_BACKOFF_MAX_SECONDS)):
                 continue
+            break
     
     return f"Error: Failed to get response from {model} after {retries} attempts"
 
+def _record_usage(model: str, response, prompt: str, content: str, estimated_tokens: int) -> None:
+    """Record token usage from the response, estimating it locally if the endpoint sent none"""
+    tokens = getattr(response, "usage", None)
+    if tokens is not None and getattr(tokens, "prompt_tokens", None) is not None:
+        prompt_tokens, completion_tokens, estimated = tokens.prompt_tokens, tokens.completion_tokens, False
+    else:
+        prompt_tokens, completion_tokens, estimated = prompts.count_tokens(prompt), prompts.count_tokens(content), True
+    usage.record("huggingface", model, prompt_tokens, completion_tokens, estimated=estimated)
+    rate_limits.settle("huggingface", model, estimated_tokens, prompt_tokens + completion_tokens)
+
+def _client_for_deadline():
+    """
+    Shared client, or a cached one whose timeout fits the remaining request budget
+
+    InferenceClient only takes a timeout per client, so the remaining budget is rounded
+    down to a _TIMEOUT_BUCKET_SECONDS step and each step reuses one client.
+    """
+    if deadline.remaining() is None:
+        return HF_CLIENT
+    budget = deadline.timeout(HF_TIMEOUT_SECONDS, reserve=DEADLINE_RESERVE_SECONDS)
+    bucket = max(_TIMEOUT_BUCKET_SECONDS, math.floor(budget / _TIMEOUT_BUCKET_SECONDS) * _TIMEOUT_BUCKET_SECONDS)
+    if bucket >= HF_TIMEOUT_SECONDS:
+        return HF_CLIENT
+    client = _deadline_clients.get(bucket)
+    if client is None:
+        client = _deadline_clients.setdefault(
+            bucket, InferenceClient(token=HUGGINGFACE_API_KEY, base_url=HUGGINGFACE_BASE_URL, timeout=bucket))
+    return client
+
+def _sleep_within_deadline(seconds: float) -> bool:
+    """
+    Sleep before a retry only if the request deadline leaves room for another attempt
+
+    A blocking time.sleep: callers run in a worker thread (run_in_threadpool / hedge
+    pool), never on the event loop.
+    """
+    if not deadline.has_budget(seconds + DEADLINE_RESERVE_SECONDS):
+        return False
+    time.sleep(seconds)
+    return True
+
 def test_connection() -> bool:
     """Test if Hugging Face API is working"""
     if not HUGGINGFACE_API_KEY:
@@ -5,70 +5,180 @@ Intelligent routing with RAG system, web search, and fallbacks
 import logging
 import random
 import re
-from config import USE_HUGGINGFACE, OPENAI_API_KEY, HUGGINGFACE_API_KEY, OPENAI_DEFAULT_MODEL
+import threading
+from typing import List, Optional, Tuple
+import conversation
+import deadline
+import prompts
+import provider_stats
+import tracing
+import usage
+from hedging import hedged_call
+from config import USE_HUGGINGFACE, OPENAI_API_KEY, HUGGINGFACE_API_KEY, OPENAI_DEFAULT_MODEL, MIN_STEP_BUDGET_SECONDS, EXECUTION_MODE
+from config import ADAPTIVE_ORDERING, PROVIDER_DEFAULT_ORDER, CATALOGUE_FAST_PATH
 
-def call(model: str, prompt: str) -> str:
+def call(model: str, prompt: str, chat_history: Optional[List[Tuple[str, str]]] = None,
+         question: Optional[str] = None) -> str:
     """
     Intelligent hybrid LLM client with priority chain:
+    0. Answer structured spec queries from the SQLite catalogue
     1. Try Hugging Face (Meta Llama / Mistral) - FREE
     2. Try LangChain RAG (vector search + conversational AI) - if OpenAI available
     3. Try web search for external info
     4. Try direct OpenAI
     5. Fall back to knowledge base
+
+    If a request deadline is active (see deadline.py), steps are skipped once the
+    remaining budget drops below MIN_STEP_BUDGET_SECONDS so the curated answer is
+    returned in time.
+
+    With EXECUTION_MODE=hedged the primary LLM provider is raced against a
+    secondary one (see hedging.py) before the remaining steps run.
+
+    With ADAPTIVE_ORDERING on, steps 1-4 are reordered by EWMA latency and
+    success rate (see provider_stats.rank); the order above is the cold-start
+    ranking.
+
+    chat_history is the session's earlier turns (see conversation.history) and is
+    passed to every LLM step so follow-up questions keep their context.
+
+    question is the customer's raw message; pass it whenever the prompt carries
+    history, since re-parsing it out of the rendered prompt is only a fallback.
     """
     logging.info(f"Processing with intelligent AI chain: {prompt[:100]}...")
     
-    # Extract user question for better routing
-    user_question = _extract_user_question(prompt)
+    # The raw question drives routing (catalogue, web search, provider templates)
+    user_question = question or _extract_user_question(prompt)
+    history = conversation.format_history(chat_history)
+    tried = set()
     
-    # Step 1: Try Hugging Face FIRST (if enabled and API key available)
-    if USE_HUGGINGFACE and HUGGINGFACE_API_KEY:
-        hf_response = _try_huggingface(model, prompt, user_question)
-        if hf_response and not hf_response.startswith("Error"):
-            logging.info("✅ Using Hugging Face (Meta Llama) response")
-            return hf_response
+    # Step 0: structured spec questions (brand/grade/thickness/size) straight from the catalogue
+    if CATALOGUE_FAST_PATH:
+        catalogue_response = _try_catalogue(user_question)
+        if catalogue_response:
+            logging.info("✅ Using catalogue response")
+            usage.answered("catalogue", depth=0)
+            return catalogue_response
     
-    # Step 2: Try LangChain RAG system (best option if OpenAI available!)
-    if OPENAI_API_KEY and not USE_HUGGINGFACE:
-        rag_response = _try_rag_system(user_question)
-        if rag_response and not rag_response.startswith("Error"):
-            logging.info("✅ Using LangChain RAG response")
-            return rag_response
+    # Hedged mode: race primary vs secondary LLM provider
+    if EXECUTION_MODE == "hedged":
+        pair = _hedge_pair(model, prompt, user_question, history, chat_history)
+        if pair and _has_budget("hedged LLM"):
+            response, provider = hedged_call(*pair)
+            tried.update(name for name, _ in pair)
+            if response and not response.startswith("Error"):
+                logging.info(f"✅ Using hedged {provider} response")
+                usage.answered(_STEP_ROUTES[provider], provider=provider, depth=len(tried))
+                return response
     
-    # Step 3: Try web search for specifications/detailed info
+    # Steps 1-4: provider chain (Hugging Face -> RAG -> web search -> OpenAI by default)
+    steps = {}
+    if USE_HUGGINGFACE and HUGGINGFACE_API_KEY:
+        steps["huggingface"] = _routed("huggingface", lambda: _try_huggingface(model, prompt, user_question, history))
+    if OPENAI_API_KEY and not USE_HUGGINGFACE:
+        steps["rag"] = _routed("rag", lambda: _try_rag_system(user_question, chat_history))
     if _needs_web_search(user_question):
-        web_response = _try_web_search_response(user_question, prompt)
-        if web_response and not web_response.startswith("Error"):
-            logging.info("✅ Using web-enhanced intelligent response")
-            return web_response
-    
-    # Step 4: Try direct OpenAI (without RAG)
+        steps["web_search"] = _routed("web_search", lambda: _try_web_search_response(user_question, prompt, history))
     if OPENAI_API_KEY and not USE_HUGGINGFACE:
-        openai_response = _try_openai(model, prompt, user_question)
-        if openai_response and not openai_response.startswith("Error"):
-            logging.info("✅ Using OpenAI GPT response")
-            return openai_response
+        steps["openai"] = _routed("openai", lambda: _try_openai(model, prompt, user_question, history))
+    
+    order = [name for name in PROVIDER_DEFAULT_ORDER if name in steps and name not in tried]
+    if ADAPTIVE_ORDERING:
+        order = provider_stats.rank(order)
+    
+    for name in order:
+        if not _has_budget(name):
+            continue
+        tried.add(name)
+        response = provider_stats.timed(name, steps[name])
+        if response and not response.startswith("Error"):
+            logging.info(f"✅ Using {_STEP_LABELS[name]} response")
+            usage.answered(_STEP_ROUTES[name], provider=name, depth=len(tried))
+            return response
     
     # Step 5: Fall back to curated responses (last resort)
     logging.info("Using curated fallback response")
+    usage.answered("curated", depth=len(tried) + 1)
+    with tracing.span("curated"):
+        return _generate_curated_response(user_question)
+
+def degraded_answer(prompt: str, question: Optional[str] = None) -> str:
+    """
+    Answer without any LLM or web call (catalogue, then knowledge base/curated responses)
+    Served to requests shed by admission control
+    """
+    user_question = question or _extract_user_question(prompt)
+    catalogue_response = _try_catalogue(user_question)
+    if catalogue_response:
+        usage.answered("catalogue", provider="degraded_catalogue", depth=0)
+        return catalogue_response
+    usage.answered("curated", provider="degraded_curated", depth=0)
     return _generate_curated_response(user_question)
 
+_STEP_LABELS = {
+    "huggingface": "Hugging Face (Meta Llama)",
+    "rag": "LangChain RAG",
+    "web_search": "web-enhanced intelligent",
+    "openai": "OpenAI GPT",
+}
+
+# Usage/cost accounting route for each provider step
+_STEP_ROUTES = {
+    "huggingface": "direct",
+    "rag": "rag",
+    "web_search": "web",
+    "openai": "direct",
+}
+
+def _routed(step: str, fn):
+    """Wrap a provider step so the tokens it spends are attributed to its route"""
+    def run():
+        with usage.route(_STEP_ROUTES[step]), tracing.span(f"provider.{step}"):
+            return fn()
+    return run
+
+def _try_catalogue(user_question: str):
+    """Answer structured spec queries from the SQLite catalogue (None if not a structured query)"""
+    try:
+        import catalogue
+        with tracing.span("catalogue"):
+            return catalogue.answer(user_question)
+    except Exception as e:
+        logging.warning(f"Catalogue lookup failed: {e}")
+        return None
+
+def _hedge_pair(model: str, prompt: str, user_question: str, history: str, chat_history):
+    """(primary, secondary) providers to race in hedged mode, or None if only one is available"""
+    openai = ("openai", _routed("openai", lambda: _try_openai(OPENAI_DEFAULT_MODEL, prompt, user_question, history)))
+    if USE_HUGGINGFACE and HUGGINGFACE_API_KEY and OPENAI_API_KEY:
+        return ("huggingface", _routed("huggingface", lambda: _try_huggingface(model, prompt, user_question, history))), openai
+    if OPENAI_API_KEY and not USE_HUGGINGFACE:
+        return ("rag", _routed("rag", lambda: _try_rag_system(user_question, chat_history))), openai
+    return None
+
+def _has_budget(step: str) -> bool:
+    """Check the request deadline before starting a provider step"""
+    if deadline.has_budget(MIN_STEP_BUDGET_SECONDS):
+        return True
+    logging.warning(f"Skipping {step}: request deadline nearly exhausted ({deadline.remaining():.2f}s left)")
+    return False
+
 def _extract_user_question(prompt: str) -> str:
-    """Extract the actual user question from prompt template"""
+    """Extract the actual user question from prompt template (the last Question:/Answer: pair)"""
     if "Question:" in prompt and "Answer:" in prompt:
-        start = prompt.find("Question:") + len("Question:")
-        end = prompt.find("Answer:")
+        start = prompt.rfind("Question:") + len("Question:")
+        end = prompt.rfind("Answer:")
         if start > 0 and end > start:
             return prompt[start:end].strip()
     return prompt
 
-def _try_rag_system(user_question: str) -> str:
+def _try_rag_system(user_question: str, chat_history=None) -> str:
     """Try LangChain RAG system for intelligent retrieval"""
     try:
         from rag_system import query_rag
         
         logging.info("Querying LangChain RAG system...")
-        result = query_rag(user_question)
+        result = query_rag(user_question, chat_history)
         
         if result and "answer" in result:
             answer = result["answer"]
@@ -84,32 +194,13 @@ def _try_rag_system(user_question: str) -> str:
     
     return "Error: RAG system unavailable"
 
-def _try_openai(model: str, full_prompt: str, user_question: str) -> str:
+def _try_openai(model: str, full_prompt: str, user_question: str, history: str = "") -> str:
     """Try OpenAI API with enhanced context (non-RAG fallback)"""
     try:
         from llm_client_openai import call as openai_call
         
-        # Build enhanced prompt with business context
-        enhanced_prompt = f"""You are an expert assistant for Plywood Studio, a premium plywood, doors, and laminate supplier in Hyderabad, India.
-
-BUSINESS INFORMATION:
-- Company: Plywood Studio (established 2022)
-- Location: Goshamahal, Hyderabad-500012, Telangana
-- Products: Premium plywood, wooden doors, laminate sheets, door hardware
-- Brands: Centuryply (Club Prime, Bond 710), Sainik MR Plywood, Greenply
-- Specialties: Wholesale trading, GST registered, 5-star IndiaMART rating
-
-CUSTOMER QUESTION:
-{user_question}
-
-INSTRUCTIONS:
-- Provide accurate, detailed, and helpful information
-- If you don't know specific product details, acknowledge it and provide general guidance
-- Be professional yet friendly
-- Focus on practical advice for customers
-- Mention our location in Hyderabad and how to contact us if relevant
-
-Your response:"""
+        # Build enhanced prompt with business context (shared cacheable prefix first)
+        enhanced_prompt = prompts.render("direct", history=history, question=user_question)
         
         response = openai_call(model if model != "test" else OPENAI_DEFAULT_MODEL, enhanced_prompt)
         
@@ -139,7 +230,7 @@ def _needs_web_search(question: str) -> bool:
     
     return any(keyword in question_lower for keyword in spec_keywords)
 
-def _try_web_search_response(user_question: str, full_prompt: str) -> str:
+def _try_web_search_response(user_question: str, full_prompt: str, history: str = "") -> str:
     """Try to enhance response with web search - works standalone or with AI"""
     try:
         from web_search import search_web, search_product_specs
@@ -174,23 +265,14 @@ def _try_web_search_response(user_question: str, full_prompt: str) -> str:
         
         # If we got web results, synthesize response
         if web_context:
+            _index_web_results(user_question, web_context)
+            
             # Try to use OpenAI for synthesis if available
-            if OPENAI_API_KEY:
+            if OPENAI_API_KEY and _has_budget("OpenAI web synthesis"):
                 try:
                     from llm_client_openai import call as openai_call
                     
-                    enhanced_prompt = f"""You are an expert assistant for Plywood Studio in Hyderabad.
-
-WEB SEARCH RESULTS:
-{web_context}
-
-CUSTOMER QUESTION:
-{user_question}
-
-Using the web search results above and your knowledge, provide a comprehensive answer.
-Mention that for exact specifications and current availability at Plywood Studio, they should contact us via IndiaMART or visit our Goshamahal showroom.
-
-Your response:"""
+                    enhanced_prompt = prompts.render("web_synthesis", web_context=web_context, history=history, question=user_question)
                     
                     response = openai_call(OPENAI_DEFAULT_MODEL, enhanced_prompt)
                     if not response.startswith("Error"):
@@ -212,27 +294,27 @@ Your response:"""
     
     return "Error: Web search unavailable"
 
-def _try_huggingface(model: str, full_prompt: str, user_question: str) -> str:
+def _index_web_results(user_question: str, web_context: str) -> None:
+    """Feed web snippets into the RAG index as expiring documents, off the request path"""
+    if not OPENAI_API_KEY or USE_HUGGINGFACE:
+        return  # RAG isn't queried in Hugging Face mode, don't build its index just to fill it
+    
+    def _index():
+        try:
+            from rag_system import add_web_results
+            add_web_results(user_question, web_context)
+        except Exception as e:
+            logging.warning(f"Indexing web results failed: {e}")
+    
+    threading.Thread(target=_index, name="rag-web-index", daemon=True).start()
+
+def _try_huggingface(model: str, full_prompt: str, user_question: str, history: str = "") -> str:
     """Try Hugging Face API with Meta Llama or Mistral models"""
     try:
         from llm_client_huggingface import call as hf_call
         
         # Build enhanced prompt with business context for better responses
-        enhanced_prompt = f"""You are an expert assistant for Plywood Studio, a premium plywood, doors, and laminate supplier in Hyderabad, India.
-
-BUSINESS INFORMATION:
-- Company: Plywood Studio (established 2022)
-- Location: Goshamahal, Hyderabad-500012, Telangana
-- Products: Premium plywood, wooden doors, laminate sheets, door hardware
-- Brands: Centuryply (Club Prime, Bond 710), Sainik MR Plywood, Greenply
-
-CUSTOMER QUESTION:
-{user_question}
-
-INSTRUCTIONS:
-Provide accurate, detailed, and helpful information about plywood products. Be professional yet friendly.
-
-Your response:"""
+        enhanced_prompt = prompts.render("huggingface", history=history, question=user_question)
         
         logging.info("Calling Hugging Face (Meta Llama)...")
         response = hf_call(model, enhanced_prompt)
@@ -3,13 +3,20 @@ OpenAI LLM Client - Real AI intelligence using GPT models
 """
 import logging
 from openai import OpenAI
-from config import OPENAI_API_KEY, TEMPERATURE, MAX_TOKENS
+import deadline
+import http_pool
+import prompts
+import rate_limits
+import usage
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, TEMPERATURE, MAX_TOKENS, DEADLINE_RESERVE_SECONDS
+
+OPENAI_TIMEOUT_SECONDS = 30  # per-call ceiling when no request deadline is active
 
 # Initialize OpenAI client
 client = None
 if OPENAI_API_KEY:
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
+        client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, http_client=http_pool.httpx_client())
         logging.info("OpenAI client initialized successfully")
     except Exception as e:
         logging.error(f"Failed to initialize OpenAI client: {e}")
@@ -21,38 +28,54 @@ def call(model: str, prompt: str, temperature: float = TEMPERATURE, max_tokens:
     if not client:
         return "Error: OpenAI client not initialized. Check your API key."
     
+    # Reserve rate-limit budget (OpenAI counts max_tokens against the TPM limit)
+    estimated_tokens = prompts.count_tokens(prompts.SYSTEM_MESSAGE + prompt) + max_tokens
+    if not rate_limits.acquire("openai", model, estimated_tokens):
+        return "Error: OpenAI rate-limit budget exhausted"
+    
     try:
         logging.info(f"Calling OpenAI {model} with prompt length: {len(prompt)}")
         
-        response = client.chat.completions.create(
+        raw = client.chat.completions.with_raw_response.create(
             model=model,
             messages=[
-                {"role": "system", "content": "You are a knowledgeable assistant for Plywood Studio, a premium plywood, doors, and laminate supplier in Hyderabad. Provide accurate, helpful, and detailed information about products, specifications, and services."},
+                {"role": "system", "content": prompts.SYSTEM_MESSAGE},
                 {"role": "user", "content": prompt}
             ],
             temperature=temperature,
             max_tokens=max_tokens,
             top_p=1.0,
             frequency_penalty=0.0,
-            presence_penalty=0.0
+            presence_penalty=0.0,
+            timeout=deadline.timeout(OPENAI_TIMEOUT_SECONDS, reserve=DEADLINE_RESERVE_SECONDS)
         )
+        rate_limits.update_from_headers("openai", model, raw.headers)
+        response = raw.parse()
         
         answer = response.choices[0].message.content.strip()
         
-        # Log token usage
-        usage = response.usage
-        logging.info(f"OpenAI response: {len(answer)} chars, tokens: {usage.total_tokens} (prompt: {usage.prompt_tokens}, completion: {usage.completion_tokens})")
+        # Record token usage (cached_tokens = prompt tokens served from OpenAI's prompt cache)
+        tokens = response.usage
+        if tokens is not None:
+            details = getattr(tokens, "prompt_tokens_details", None)
+            usage.record("openai", model, tokens.prompt_tokens, tokens.completion_tokens,
+                         cached_prompt_tokens=getattr(details, "cached_tokens", 0) or 0)
+            rate_limits.settle("openai", model, estimated_tokens, tokens.total_tokens)
+        logging.info(f"OpenAI response: {len(answer)} chars")
         
         return answer
         
     except Exception as e:
         error_msg = str(e)
         logging.error(f"OpenAI API error: {error_msg}")
+        rate_limits.settle("openai", model, estimated_tokens, 0)  # refund the token reservation
         
         # Return more specific error messages
         if "authentication" in error_msg.lower() or "api key" in error_msg.lower():
             return "Error: Invalid OpenAI API key"
-        elif "rate limit" in error_msg.lower():
+        elif "rate limit" in error_msg.lower() or "429" in error_msg:
+            error_response = getattr(e, "response", None)
+            rate_limits.penalize("openai", model, error_response.headers if error_response is not None else None)
             return "Error: Rate limit exceeded. Please try again later."
         elif "quota" in error_msg.lower():
             return "Error: API quota exceeded"
@@ -0,0 +1,5 @@
+"""
+Load-testing tools
+stub_server.py stands in for the OpenAI and Hugging Face APIs so /chat can be load
+tested without API spend or provider rate limits.
+"""
@@ -0,0 +1,244 @@
+"""
+Traffic replay load generator
+Replays a JSONL log of questions against a running /chat endpoint or in-process
+run_pipeline and reports throughput, latency percentiles, cache hit ratio, error rate
+and answering routes, for capacity planning.
+
+Each line needs "message" (or "question"); optional "ts" (epoch seconds or ISO time),
+"user_id" and "session_id". Lines without a question are skipped.
+
+    # original inter-arrival times, twice as fast
+    python -m loadtest.replay loadtest/questions.jsonl --target http://localhost:8001 --speed 2
+    # open loop: 5 QPS for 30s, then 20 QPS for 60s (Poisson arrivals)
+    python -m loadtest.replay loadtest/questions.jsonl --qps-profile 5x30,20x60 --poisson
+    # closed loop: 8 concurrent clients against run_pipeline
+    python -m loadtest.replay loadtest/questions.jsonl --target pipeline --concurrency 8 --duration 60
+
+Open-loop latencies are measured from the scheduled send time, so a saturated server
+shows up as queueing delay instead of silently lowering the offered load.
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from benchmarks.run import percentile
+
+def load_records(path: str) -> List[dict]:
+    records, skipped = [], 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            message = entry.get("message") or entry.get("question")
+            if not isinstance(message, str) or not message.strip():
+                skipped += 1
+                continue
+            records.append({"message": message, "ts": _timestamp(entry.get("ts") or entry.get("timestamp")),
+                            "user_id": entry.get("user_id"), "session_id": entry.get("session_id")})
+    if skipped:
+        print(f"Skipped {skipped} lines without a message/question")
+    return records
+
+def _timestamp(value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+def parse_profile(spec: str) -> List[Tuple[float, float]]:
+    """'5x30,20x60' -> [(5 qps, 30 s), (20 qps, 60 s)]"""
+    stages = []
+    for part in spec.split(","):
+        qps, _, seconds = part.strip().partition("x")
+        stages.append((float(qps), float(seconds)))
+    return stages
+
+def schedule(records: List[dict], args) -> Iterator[Tuple[float, int, dict]]:
+    """(send offset in seconds, profile stage, record) for open-loop modes"""
+    if args.qps_profile:
+        source = itertools.cycle(records)
+        rng = random.Random(args.seed)
+        start = 0.0
+        for stage, (qps, seconds) in enumerate(parse_profile(args.qps_profile)):
+            offset = start
+            while qps > 0:
+                offset += rng.expovariate(qps) if args.poisson else 1.0 / qps
+                if offset >= start + seconds:
+                    break
+                yield offset, stage, next(source)
+            start += seconds
+        return
+    first = records[0]["ts"]
+    for loop in itertools.count():
+        for record in records:
+            yield (record["ts"] - first) / args.speed + loop * ((records[-1]["ts"] - first) / args.speed + 1.0), 0, record
+        if not args.loop:
+            return
+
+class ChatTarget:
+    """POST /chat on a running server"""
+
+    def __init__(self, base_url: str, timeout: float, pool_size: int):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.url = base_url.rstrip("/") + "/chat"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def send(self, record: dict, index: int) -> dict:
+        payload = {"message": record["message"], "user_id": record["user_id"] or f"replay-{index}",
+                   "session_id": record["session_id"]}
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            return {"error": f"HTTP {response.status_code}"}
+        body = response.json()
+        route = (body.get("usage") or {}).get("route")
+        error = "technical difficulties" in body.get("response", "")
+        return {"cached": body.get("cached", route == "cache"), "route": route,
+                "error": "error response" if error else None}
+
+class PipelineTarget:
+    """cli_interface.run_pipeline in this process"""
+
+    def __init__(self):
+        from cli_interface import run_pipeline
+        self.run_pipeline = run_pipeline
+
+    def send(self, record: dict, index: int) -> dict:
+        import contextvars
+        import usage
+        ctx = contextvars.copy_context()
+        answer = ctx.run(self.run_pipeline, record["message"])
+        route = ctx.run(usage.answered_route)
+        return {"cached": route == "cache", "route": route,
+                "error": "error response" if answer.startswith("Error") else None}
+
+def _execute(target, record: dict, index: int, scheduled: float, stage: int) -> dict:
+    try:
+        result = target.send(record, index)
+    except Exception as e:
+        result = {"error": type(e).__name__}
+    result.update(ms=(time.perf_counter() - scheduled) * 1000, stage=stage)
+    return result
+
+def run_open_loop(target, records: List[dict], args) -> Tuple[List[dict], float]:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_in_flight, thread_name_prefix="replay") as pool:
+        futures = []
+        for index, (offset, stage, record) in enumerate(schedule(records, args)):
+            if args.duration and offset >= args.duration:
+                break
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(_execute, target, record, index, scheduled, stage))
+        results = [future.result() for future in futures]
+    return results, time.perf_counter() - started
+
+def run_closed_loop(target, records: List[dict], args) -> Tuple[List[dict], float]:
+    results, lock = [], threading.Lock()
+    source = itertools.cycle(enumerate(records)) if args.loop or args.duration else iter(enumerate(records))
+    started = time.perf_counter()
+
+    def client() -> None:
+        while not args.duration or time.perf_counter() - started < args.duration:
+            with lock:
+                item = next(source, None)
+            if item is None:
+                return
+            index, record = item
+            result = _execute(target, record, index, time.perf_counter(), 0)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=client, name=f"replay-client-{i}", daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+def report(results: List[dict], wall: float) -> dict:
+    latencies = [r["ms"] for r in results]
+    errors, routes = {}, {}
+    for r in results:
+        if r.get("error"):
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+        routes[r.get("route") or "none"] = routes.get(r.get("route") or "none", 0) + 1
+    completed = len(results)
+    return {
+        "requests": completed,
+        "duration_seconds": round(wall, 2),
+        "throughput_rps": round(completed / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {name: round(percentile(latencies, pct), 1)
+                       for name, pct in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))},
+        "cache_hit_ratio": round(sum(1 for r in results if r.get("cached")) / completed, 3) if completed else 0.0,
+        "error_rate": round(sum(errors.values()) / completed, 3) if completed else 0.0,
+        "errors": errors,
+        "routes": routes,
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay a JSONL question log against /chat or run_pipeline")
+    parser.add_argument("log", help="JSONL file of questions")
+    parser.add_argument("--target", default="http://localhost:8001", help="Base URL of the chatbot, or 'pipeline'")
+    parser.add_argument("--speed", type=float, default=1.0, help="Timestamp replay speed-up factor")
+    parser.add_argument("--qps-profile", help="Open-loop rate stages, e.g. 5x30,20x60 (QPS x seconds)")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times in --qps-profile")
+    parser.add_argument("--concurrency", type=int, help="Closed loop: number of clients sending back to back")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after this many seconds (0: end of the log)")
+    parser.add_argument("--loop", action="store_true", help="Repeat the log until --duration")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open-loop cap on outstanding requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP timeout per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    records = load_records(args.log)
+    if not records:
+        print("No questions to replay")
+        return 1
+    has_timestamps = all(r["ts"] is not None for r in records)
+    if not args.qps_profile and not args.concurrency and not has_timestamps:
+        args.concurrency = 4
+        print("Log has no timestamps, replaying closed loop with 4 clients")
+
+    pool_size = args.concurrency or args.max_in_flight
+    target = PipelineTarget() if args.target == "pipeline" else ChatTarget(args.target, args.timeout, pool_size)
+    if args.concurrency:
+        results, wall = run_closed_loop(target, records, args)
+    else:
+        results, wall = run_open_loop(target, records, args)
+
+    summary = report(results, wall)
+    if args.qps_profile:
+        summary["stages"] = [{"qps": qps, "seconds": seconds, **report([r for r in results if r["stage"] == stage], seconds)}
+                             for stage, (qps, seconds) in enumerate(parse_profile(args.qps_profile))]
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+OpenAI-compatible stand-in server for load tests
+Speaks the chat-completions (plain and streaming), embeddings and models APIs, plus
+the Hugging Face chat_completion routes, with configurable latency, canned or templated
+answers and injected errors, 429s and model-loading 503s.
+
+    python -m loadtest.stub_server --port 9000 --latency lognormal:400,0.3 --rate-limit-rate 0.02
+    OPENAI_BASE_URL=http://localhost:9000/v1 HUGGINGFACE_BASE_URL=http://localhost:9000 python business_chatbot.py
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fakes import Latency
+
+app = FastAPI(title="OpenAI-compatible stub")
+
+_DEFAULT_TEMPLATE = ("Plywood Studio stub answer to \"{question}\": we stock Centuryply, Sainik and Greenply "
+                     "plywood in BWP, BWR and MR grades from 4mm to 25mm. Visit our Goshamahal showroom for rates.")
+_QUESTION = re.compile(r"Question:\s*(.*?)\s*(?:Answer:|$)", re.DOTALL)
+
+_settings = {
+    "latency": Latency("lognormal:300,0.3"),
+    "stream_chunk_ms": 20.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "loading_rate": 0.0,
+    "rpm": 0,  # 0 = no simulated budget
+    "tpm": 0,
+    "retry_after_seconds": 2,
+    "template": _DEFAULT_TEMPLATE,
+    "canned": {},  # prompt substring -> answer
+    "embedding_dim": 1536,
+}
+_random = random.Random(0)
+_lock = threading.Lock()
+_window = {"started": time.time(), "requests": 0, "tokens": 0}
+_counts = {}
+
+def _count(outcome: str) -> None:
+    with _lock:
+        _counts[outcome] = _counts.get(outcome, 0) + 1
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _budget(tokens: int) -> Optional[dict]:
+    """Charge the simulated per-minute budget; returns x-ratelimit-* headers, or None if exhausted"""
+    rpm, tpm = _settings["rpm"], _settings["tpm"]
+    if not rpm and not tpm:
+        return {}
+    with _lock:
+        now = time.time()
+        if now - _window["started"] >= 60:
+            _window.update(started=now, requests=0, tokens=0)
+        if (rpm and _window["requests"] + 1 > rpm) or (tpm and _window["tokens"] + tokens > tpm):
+            return None
+        _window["requests"] += 1
+        _window["tokens"] += tokens
+        reset = max(0.0, 60 - (now - _window["started"]))
+        headers = {"x-ratelimit-reset-requests": f"{reset:.0f}s", "x-ratelimit-reset-tokens": f"{reset:.0f}s"}
+        if rpm:
+            headers.update({"x-ratelimit-limit-requests": str(rpm), "x-ratelimit-remaining-requests": str(rpm - _window["requests"])})
+        if tpm:
+            headers.update({"x-ratelimit-limit-tokens": str(tpm), "x-ratelimit-remaining-tokens": str(tpm - _window["tokens"])})
+        return headers
+
+def _injected_failure(model: str, huggingface: bool) -> Optional[JSONResponse]:
+    roll = _random.random()
+    if roll < _settings["rate_limit_rate"]:
+        return _rate_limited(model)
+    roll -= _settings["rate_limit_rate"]
+    if roll < _settings["error_rate"]:
+        _count("error")
+        return JSONResponse(status_code=500, content={"error": {"message": "Stub injected server error", "type": "server_error"}})
+    roll -= _settings["error_rate"]
+    if huggingface and roll < _settings["loading_rate"]:
+        _count("loading")
+        return JSONResponse(status_code=503, content={"error": f"Model {model} is currently loading", "estimated_time": 20.0})
+    return None
+
+def _rate_limited(model: str) -> JSONResponse:
+    _count("rate_limited")
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after": str(_settings["retry_after_seconds"]),
+                 "x-ratelimit-reset-requests": f"{_settings['retry_after_seconds']}s"},
+        content={"error": {"message": f"Rate limit reached for {model} (stub)", "type": "requests",
+                           "code": "rate_limit_exceeded"}},
+    )
+
+def _answer(messages: list) -> str:
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    for needle, canned in _settings["canned"].items():
+        if needle.lower() in prompt.lower():
+            return canned
+    user = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), prompt)
+    match = _QUESTION.search(user)
+    question = (match.group(1) if match else user).strip()[-200:]
+    return _settings["template"].format(question=question)
+
+@app.post("/v1/chat/completions")
+@app.post("/models/{model_id:path}/v1/chat/completions")  # Hugging Face serverless route
+async def chat_completions(request: Request, model_id: Optional[str] = None):
+    body = await request.json()
+    model = body.get("model") or model_id or "stub-model"
+    messages = body.get("messages", [])
+    prompt_tokens = sum(_tokens(str(m.get("content", ""))) for m in messages)
+
+    failure = _injected_failure(model, huggingface=model_id is not None or "/" in model)
+    if failure is not None:
+        return failure
+    headers = _budget(prompt_tokens + int(body.get("max_tokens") or 256))
+    if headers is None:
+        return _rate_limited(model)
+
+    content = _answer(messages)
+    completion_tokens = _tokens(content)
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens, "prompt_tokens_details": {"cached_tokens": 0}}
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        _count("stream")
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(_stream(completion_id, created, model, content, usage if include_usage else None),
+                                 media_type="text/event-stream", headers=headers)
+
+    await asyncio.sleep(_settings["latency"].sample_ms() / 1000.0)
+    _count("ok")
+    return JSONResponse(headers=headers, content={
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    })
+
+async def _stream(completion_id: str, created: int, model: str, content: str, usage: Optional[dict]):
+    def chunk(delta: dict, finish_reason=None, **extra) -> str:
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(_settings["latency"].sample_ms() / 1000.0)  # time to first token
+    yield chunk({"role": "assistant", "content": ""})
+    for word in re.findall(r"\S+\s*", content):
+        await asyncio.sleep(_settings["stream_chunk_ms"] / 1000.0)
+        yield chunk({"content": word})
+    yield chunk({}, finish_reason="stop")
+    if usage is not None:
+        yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+def _embedding(item) -> list:
+    """Deterministic unit-length vector for a string or a token-id list"""
+    seed = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    vector = [rng.uniform(-1.0, 1.0) for _ in range(_settings["embedding_dim"])]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    model = body.get("model", "text-embedding-3-small")
+    inputs = body.get("input", [])
+    # a single string or a single token-id list is one input
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    tokens = sum(len(item) if isinstance(item, list) else _tokens(item) for item in inputs)
+
+    failure = _injected_failure(model, huggingface=False)
+    if failure is not None:
+        return failure
+    headers = _budget(tokens)
+    if headers is None:
+        return _rate_limited(model)
+
+    await asyncio.sleep(_settings["latency"].sample_ms() / 1000.0 / 10)  # embeddings are much faster than chat
+    data = []
+    for index, item in enumerate(inputs):
+        vector = _embedding(item)
+        if body.get("encoding_format") == "base64":  # the openai SDK asks for base64 by default
+            vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+        data.append({"object": "embedding", "index": index, "embedding": vector})
+    _count("embeddings")
+    return JSONResponse(headers=headers, content={
+        "object": "list", "data": data, "model": model,
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    })
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "stub"},
+                                       {"id": "text-embedding-3-small", "object": "model", "owned_by": "stub"}]}
+
+@app.get("/stats")
+async def stats():
+    """Responses served by outcome"""
+    with _lock:
+        return dict(_counts)
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "service": "OpenAI-compatible stub"}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI / Hugging Face compatible stub server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="lognormal:300,0.3", help="Response latency: fixed:MS, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--stream-chunk-ms", type=float, default=20.0, help="Delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered with a 429")
+    parser.add_argument("--loading-rate", type=float, default=0.0, help="Share of Hugging Face calls answered 'model loading' (503)")
+    parser.add_argument("--rpm", type=int, default=0, help="Simulated requests-per-minute budget (429 beyond it)")
+    parser.add_argument("--tpm", type=int, default=0, help="Simulated tokens-per-minute budget")
+    parser.add_argument("--retry-after", type=int, default=2, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--template", default=_DEFAULT_TEMPLATE, help="Answer template ({question} is substituted)")
+    parser.add_argument("--canned", help="JSON file mapping prompt substrings to fixed answers")
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    _random.seed(args.seed)
+    _settings.update({
+        "latency": Latency(args.latency, args.seed),
+        "stream_chunk_ms": args.stream_chunk_ms,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "loading_rate": args.loading_rate,
+        "rpm": args.rpm,
+        "tpm": args.tpm,
+        "retry_after_seconds": args.retry_after,
+        "template": args.template,
+        "embedding_dim": args.embedding_dim,
+    })
+    if args.canned:
+        with open(args.canned, encoding="utf-8") as f:
+            _settings["canned"] = json.load(f)
+    print(f"🧪 Stub provider on http://{args.host}:{args.port} "
+          f"(OPENAI_BASE_URL=http://{args.host}:{args.port}/v1, HUGGINGFACE_BASE_URL=http://{args.host}:{args.port})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
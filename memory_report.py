@@ -0,0 +1,108 @@
+"""
+Approximate memory accounting for the admin endpoint
+Sizes are sys.getsizeof totals over the reachable objects of each structure: good
+for comparing tiers and spotting growth, not an exact share of RSS. tracemalloc is
+only started on request, since tracing every allocation slows the process down.
+"""
+import sys
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+from config import TRACEMALLOC_FRAMES, TRACEMALLOC_TOP_N
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate bytes of obj and the containers/objects it references (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") and not isinstance(current, type):
+            stack.append(vars(current))
+    return size
+
+def process_rss() -> Optional[int]:
+    """Resident set size in bytes (Linux /proc, else peak RSS from getrusage)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+def modules(top: int = 15) -> dict:
+    """Loaded modules grouped by top-level package (bytes are the module namespaces, shallow)"""
+    packages = {}
+    for name, module in list(sys.modules.items()):
+        if module is None:
+            continue
+        entry = packages.setdefault(name.split(".", 1)[0], {"modules": 0, "approx_bytes": 0})
+        entry["modules"] += 1
+        namespace = getattr(module, "__dict__", {})
+        entry["approx_bytes"] += sys.getsizeof(namespace) + sum(sys.getsizeof(v) for v in list(namespace.values()))
+    largest = sorted(packages.items(), key=lambda item: item[1]["approx_bytes"], reverse=True)[:top]
+    return {"loaded": sum(p["modules"] for p in packages.values()), "packages": len(packages),
+            "largest": [{"package": name, **entry} for name, entry in largest]}
+
+def tracemalloc_control(action: str, limit: int = TRACEMALLOC_TOP_N) -> dict:
+    """start / top / stop allocation tracing"""
+    if action == "start":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        return {"tracing": True}
+    if action == "stop":
+        tracemalloc.stop()
+        return {"tracing": False}
+    if action == "top":
+        if not tracemalloc.is_tracing():
+            return {"tracing": False, "error": "Error: tracemalloc is not running, start it first"}
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [{"location": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+                    for stat in snapshot.statistics("lineno")[:limit]],
+        }
+    return {"error": f"Error: unknown tracemalloc action {action!r} (use start, top or stop)"}
+
+def report() -> dict:
+    """Entry counts and approximate bytes of the process's caches and indexes"""
+    import cache_store
+    import conversation
+    import knowledge_base
+    result = {
+        "process_rss_bytes": process_rss(),
+        "cache": cache_store.memory_usage(),
+        "conversation": conversation.stats(),
+        "knowledge_base": {"version": knowledge_base.version(), "approx_bytes": deep_sizeof(knowledge_base.snapshot())},
+        "modules": modules(),
+        "tracemalloc": {"tracing": tracemalloc.is_tracing()},
+    }
+    # only report subsystems that are already loaded, never import them here
+    for name in ("rag_system", "catalogue"):
+        module = sys.modules.get(name)
+        if module is not None:
+            result[name] = module.memory_usage()
+    return result
@@ -1,27 +1,60 @@
 #logging and observability module
 import logging
-from prometheus_client import start_http_server, Counter, Histogram
+from prometheus_client import start_http_server, Counter, Histogram, Gauge
 
 # metrics
 REQUEST_COUNTER = Counter("genai_requests_total", "Total number of requests received")
 LLM_LATENCY = Histogram("genai_llm_latency_ms", "LLM call latency in milliseconds")
 RETRIEVAL_LATENCY = Histogram("genai_retrieval_latency_ms", "Retrieval latency in milliseconds")
+PROVIDER_EWMA_LATENCY = Gauge("genai_provider_ewma_latency_ms", "EWMA latency per provider in milliseconds", ["provider"])
+PROVIDER_SUCCESS_RATE = Gauge("genai_provider_success_rate", "EWMA success rate per provider", ["provider"])
+PROMPT_TOKENS = Histogram("genai_prompt_tokens", "Prompt size in tokens per template", ["template", "version"],
+                          buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192))
+LLM_TOKENS = Counter("genai_llm_tokens_total", "LLM tokens by provider, model, route and prompt-cache status",
+                     ["provider", "model", "route", "cache", "type"])
+LLM_COST_USD = Counter("genai_llm_cost_usd_total", "Estimated LLM spend in USD", ["provider", "model", "route"])
+RESPONSES_BY_ROUTE = Counter("genai_responses_total", "Answers served by route and response-cache status", ["route", "cache"])
+ADMISSION_IN_FLIGHT = Gauge("genai_admission_in_flight", "Requests currently in the LLM stage")
+ADMISSION_QUEUE_DEPTH = Gauge("genai_admission_queue_depth", "Requests waiting for an LLM stage slot")
+ADMISSION_SHED = Counter("genai_admission_shed_total", "Requests served a degraded answer instead of entering the LLM stage", ["reason"])
+ADMISSION_WAIT = Histogram("genai_admission_wait_ms", "Time spent waiting for an LLM stage slot in milliseconds",
+                           buckets=(1, 5, 25, 100, 250, 500, 1000, 2000, 5000))
+RATE_LIMIT_REMAINING = Gauge("genai_rate_limit_remaining", "Client-side rate-limit budget left per provider/model",
+                             ["provider", "model", "kind"])
+RATE_LIMIT_THROTTLED = Counter("genai_rate_limit_throttled_total", "Calls delayed or rerouted by the rate-limit scheduler",
+                               ["provider", "model", "action"])
+HF_MODEL_WARM = Gauge("genai_hf_model_warm", "1 if the Hugging Face model answered its last probe, 0 if loading/failing", ["model"])
+HF_WARM_PROBES = Counter("genai_hf_warm_probes_total", "Background warm-up probes by outcome", ["model", "result"])
+STAGE_LATENCY = Histogram("genai_stage_latency_ms", "Latency of each request stage in milliseconds", ["stage"],
+                          buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000))
+AUDIT_RECORDS = Counter("genai_audit_records_total", "Audit records by outcome", ["result"])
+AUDIT_QUEUE_DEPTH = Gauge("genai_audit_queue_depth", "Audit records waiting to be written")
+CACHE_EVENTS = Counter("genai_cache_events_total", "Cache hits, misses, writes, deletes and evictions per tier", ["tier", "event"])
+ANSWERS_BY_PROVIDER = Counter("genai_answers_total", "Answers by the provider/step that produced them", ["provider"])
+FALLBACK_DEPTH = Histogram("genai_fallback_depth", "Provider steps attempted before a request was answered (0 = catalogue)",
+                           buckets=(0, 1, 2, 3, 4, 5, 6))
+REQUESTS_IN_FLIGHT = Gauge("genai_requests_in_flight", "Chat requests currently being processed")
+GUARDRAIL_EVENTS = Counter("genai_guardrail_events_total", "Guardrail rejections and output modifications", ["reason"])
+WEB_SEARCH_CACHE = Counter("genai_web_search_cache_total", "Web search cache lookups", ["result"])
 
-def log(question, model_input,model_output, guardrail_output=None, model="unknown", latency_ms=None, user_id =None, retrieved_context=None):
+def log(question, model_input,model_output, guardrail_output=None, model="unknown", latency_ms=None, user_id =None, retrieved_context=None, **extra):
+    """Count the request and queue its audit record (written in batches off the request path, see audit.py)"""
+    import audit
 
     REQUEST_COUNTER.inc()
 
-    logging.info("---------AUDIT LOG---------")
-    logging.info(f"User ID: {user_id}") # user id is not used in the pipeline but it is good to have it
-    logging.info(f"Question: {question}")
-    logging.info(f"Model Input: {model_input}")
-    logging.info(f"Model Output: {model_output}")
-    if guardrail_output:
-        logging.info(f"Guardrail Output: {guardrail_output}")
-    logging.info(f"Model: {model}")
-    logging.info(f"Latency: {latency_ms}ms")
-    
-    logging.info(f"Retrieved Context: {retrieved_context}")
+    audit.submit({
+        "user_id": user_id,  # user id is not used in the pipeline but it is good to have it
+        "question": question,
+        "model_input": model_input,
+        "model_output": model_output,
+        "guardrail_output": guardrail_output,
+        "model": model,
+        "latency_ms": latency_ms,
+        "retrieved_context": retrieved_context,
+        **extra,
+    }, always=bool(guardrail_output) or bool(extra.get("error")))
+    logging.debug(f"Audit record queued for question: {question}")
 
 def record_metric(metric_name, value):
     if metric_name == "llm_latency_ms":
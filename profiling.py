@@ -0,0 +1,179 @@
+"""
+Opt-in per-request profiling
+Profiles randomly sampled (PROFILE_MODE=sample), all (PROFILE_MODE=all) or explicitly
+requested runs and writes them to PROFILE_DIR with bounded retention:
+- sampling engine: folded stacks (one "frame;frame;frame count" line per stack), ready
+  for flamegraph.pl / speedscope; samples the calling thread plus the pool threads
+  while they run work submitted for this run (via run_attached), not other requests'
+- cprofile engine: a pstats .prof file of the calling thread (snakeviz, flameprof)
+"""
+import contextvars
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Optional
+
+from config import (
+    PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_ENGINE, PROFILE_SAMPLING_INTERVAL_SECONDS,
+    PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_MAX_TOTAL_BYTES,
+)
+
+_retention_lock = threading.Lock()
+
+# thread ids working for the profiled run; shared with the worker threads it fans out to
+_threads: contextvars.ContextVar[Optional[set]] = contextvars.ContextVar("profiled_threads", default=None)
+
+def should_profile(force: bool = False) -> bool:
+    if force or PROFILE_MODE == "all":
+        return True
+    return PROFILE_MODE == "sample" and random.random() < PROFILE_SAMPLE_RATE
+
+class _Sampler(threading.Thread):
+    """Statistical profiler: periodically snapshots the stacks of the target threads"""
+
+    def __init__(self, threads: set, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def _targets(self) -> dict:
+        wanted = set(self.threads)  # copy: workers attach/detach while we sample
+        return {t.ident: t.name for t in threading.enumerate() if t.ident in wanted}
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            targets = self._targets()
+            for tid, frame in sys._current_frames().items():
+                if tid not in targets:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([targets[tid]] + stack[::-1])] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+@contextmanager
+def profile(name: str, force: bool = False):
+    """
+    with profiling.profile("chat") as info: ...
+
+    info is None when this run isn't profiled, otherwise a dict whose "path" is
+    set to the profile file once the block exits.
+    """
+    if not should_profile(force):
+        yield None
+        return
+
+    info = {"path": None}
+    started = time.perf_counter()
+    if PROFILE_ENGINE == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield info
+        finally:
+            profiler.disable()
+            info["path"] = _path(name, started, "prof")
+            _save(lambda path: profiler.dump_stats(path), info["path"])
+    else:
+        threads = {threading.get_ident()}
+        token = _threads.set(threads)
+        sampler = _Sampler(threads, PROFILE_SAMPLING_INTERVAL_SECONDS)
+        sampler.start()
+        try:
+            yield info
+        finally:
+            sampler.stop()
+            _threads.reset(token)
+            info["path"] = _path(name, started, "folded")
+            _save(lambda path: _write_folded(path, sampler.stacks), info["path"])
+
+def wrap(name: str, fn: Callable, force: bool = False) -> Callable:
+    """fn wrapped so it runs under profile(name) in whichever thread calls it"""
+    def run(*args, **kwargs):
+        with profile(name, force):
+            return fn(*args, **kwargs)
+    return run
+
+def run_attached(fn: Callable, *args, **kwargs):
+    """
+    Call fn in a pool thread, sampled as part of the submitting run if it is profiled
+
+    Use inside the copied context: executor.submit(ctx.run, profiling.run_attached, fn, ...)
+    """
+    threads = _threads.get()
+    if threads is None:
+        return fn(*args, **kwargs)
+    tid = threading.get_ident()
+    threads.add(tid)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        threads.discard(tid)
+
+def _path(name: str, started: float, ext: str) -> str:
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    return os.path.join(PROFILE_DIR, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{duration_ms}ms.{ext}")
+
+def _write_folded(path: str, stacks: Counter) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+def _save(writer: Callable[[str], None], path: str) -> None:
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        writer(path)
+        logging.info(f"🔬 Profile written: {path}")
+        _enforce_retention()
+    except Exception as e:
+        logging.error(f"Could not write profile {path}: {e}")
+
+def _enforce_retention() -> None:
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES / PROFILE_MAX_TOTAL_BYTES"""
+    with _retention_lock:
+        files = list_profiles()
+        total = sum(f["bytes"] for f in files)
+        while files and (len(files) > PROFILE_MAX_FILES or total > PROFILE_MAX_TOTAL_BYTES):
+            oldest = files.pop()
+            total -= oldest["bytes"]
+            try:
+                os.remove(os.path.join(PROFILE_DIR, oldest["file"]))
+            except OSError:
+                pass
+
+def list_profiles() -> list:
+    """Stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    rows = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file() and entry.name.endswith((".folded", ".prof")):
+            stat = entry.stat()
+            rows.append({"file": entry.name, "bytes": stat.st_size, "created": stat.st_mtime})
+    return sorted(rows, key=lambda row: row["created"], reverse=True)
+
+def status(recent: Optional[int] = 20) -> dict:
+    return {
+        "mode": PROFILE_MODE,
+        "engine": PROFILE_ENGINE,
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "directory": PROFILE_DIR,
+        "profiles": list_profiles()[:recent],
+    }
@@ -0,0 +1,159 @@
+"""
+Prompt template registry
+Every prompt starts with the same byte-identical static prefix (so provider-side prompt
+caching can reuse it), followed by per-template static instructions, with the variable
+parts (context, web results, question) last
+"""
+import logging
+from string import Formatter
+from typing import Dict, List, Tuple
+
+SYSTEM_MESSAGE = (
+    "You are a knowledgeable assistant for Plywood Studio, a premium plywood, doors, and laminate "
+    "supplier in Hyderabad. Provide accurate, helpful, and detailed information about products, "
+    "specifications, and services."
+)
+
+# Shared static prefix - do not interpolate anything into this block
+STATIC_PREFIX = """You are an expert assistant for Plywood Studio, a premium plywood, doors, and laminate supplier in Hyderabad, India.
+
+BUSINESS INFORMATION:
+- Company: Plywood Studio (established 2022)
+- Location: Goshamahal, Hyderabad-500012, Telangana
+- Products: Premium plywood, wooden doors, laminate sheets, door hardware
+- Brands: Centuryply (Club Prime, Bond 710), Sainik MR Plywood, Greenply
+- Specialties: Wholesale trading, GST registered, 5-star IndiaMART rating
+- Contact: www.indiamart.com/plywoodstudio or visit our Goshamahal showroom
+
+"""
+
+class PromptTemplate:
+    """A versioned template, parsed once into literal/field segments"""
+
+    def __init__(self, name: str, version: str, body: str):
+        self.name = name
+        self.version = version
+        self.text = STATIC_PREFIX + body
+        self._segments: List[Tuple[str, str]] = [
+            (literal, field) for literal, field, _, _ in Formatter().parse(self.text)
+        ]
+        self.variables = [field for _, field in self._segments if field]
+
+    def render(self, **values) -> str:
+        missing = [v for v in self.variables if v not in values]
+        if missing:
+            raise KeyError(f"prompt '{self.name}' missing variables: {', '.join(missing)}")
+        parts = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+_REGISTRY: Dict[str, PromptTemplate] = {}
+
+def register(name: str, version: str, body: str) -> PromptTemplate:
+    template = PromptTemplate(name, version, body)
+    _REGISTRY[name] = template
+    return template
+
+def get(name: str) -> PromptTemplate:
+    return _REGISTRY[name]
+
+def render(name: str, **values) -> str:
+    """Render a registered template and record its token counts"""
+    template = _REGISTRY[name]
+    prompt = template.render(**values)
+    _record_tokens(template, prompt)
+    return prompt
+
+def templates() -> List[dict]:
+    """Registered templates with versions and static prefix sizes"""
+    prefix_tokens = count_tokens(STATIC_PREFIX)
+    return [
+        {"name": t.name, "version": t.version, "variables": t.variables, "prefix_tokens": prefix_tokens}
+        for t in _REGISTRY.values()
+    ]
+
+# Token counting (tiktoken when installed, ~4 chars/token otherwise)
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+except Exception:
+    def count_tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+def _record_tokens(template: PromptTemplate, prompt: str) -> None:
+    try:
+        from observability import PROMPT_TOKENS
+        PROMPT_TOKENS.labels(template=template.name, version=template.version).observe(count_tokens(prompt))
+    except Exception as e:
+        logging.debug(f"Prompt token metric skipped: {e}")
+
+register("direct", "v2", """INSTRUCTIONS:
+- Provide accurate, detailed, and helpful information
+- If you don't know specific product details, acknowledge it and provide general guidance
+- Be professional yet friendly
+- Focus on practical advice for customers
+- Mention our location in Hyderabad and how to contact us if relevant
+
+{history}CUSTOMER QUESTION:
+{question}
+
+Your response:""")
+
+register("huggingface", "v2", """INSTRUCTIONS:
+Provide accurate, detailed, and helpful information about plywood products. Be professional yet friendly.
+
+{history}CUSTOMER QUESTION:
+{question}
+
+Your response:""")
+
+register("web_synthesis", "v2", """INSTRUCTIONS:
+Using the web search results below and your knowledge, provide a comprehensive answer.
+Mention that for exact specifications and current availability at Plywood Studio, they should contact us via IndiaMART or visit our Goshamahal showroom.
+
+WEB SEARCH RESULTS:
+{web_context}
+
+{history}CUSTOMER QUESTION:
+{question}
+
+Your response:""")
+
+register("rag", "v2", """INSTRUCTIONS:
+- Provide detailed, accurate, and helpful information
+- If the context doesn't contain specific details, provide general guidance based on your knowledge
+- Always mention how to contact us (IndiaMART or visit Goshamahal showroom) for pricing and availability
+- Be professional yet friendly
+- Focus on practical advice for customers
+
+Use the following product information to answer the customer's question accurately and helpfully:
+
+{context}
+
+{history}CUSTOMER QUESTION: {question}
+
+Your response:""")
+
+# {history} is conversation.format_history() output - empty for single-turn requests
+# "Question:" / "Answer:" markers are what llm_client_langchain extracts the user question from
+register("chat", "v2", """Please provide a helpful, accurate response focusing on our plywood products, doors, laminate sheets, and services. Be professional and informative.
+
+PLYWOOD STUDIO INFORMATION:
+{context}
+
+{history}Question: {question}
+
+Answer: """)
+
+register("router", "v1", """Answer questions as best as you can:
+{context}
+
+Question: {question}
+
+Answer: """)
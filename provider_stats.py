@@ -0,0 +1,122 @@
+"""
+Rolling latency/outcome statistics per provider
+Used to derive hedge delays (p95) and the latency-adaptive provider ordering
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from config import (
+    PROVIDER_DEFAULT_ORDER, PROVIDER_QUALITY, PROVIDER_QUALITY_FLOOR,
+    PROVIDER_MIN_SUCCESS_RATE, PROVIDER_PROBE_INTERVAL, EWMA_ALPHA,
+)
+
+WINDOW_SIZE = 200  # most recent calls kept per provider
+_PRIOR_LATENCY_MS = 1000.0  # assumed latency of the first provider before any data
+_PRIOR_STEP_MS = 1000.0  # each later provider in the default order is assumed this much slower
+
+_lock = threading.Lock()
+_latencies: Dict[str, deque] = {}
+_ewma: Dict[str, dict] = {}
+_rank_calls = 0
+
+def _prior(provider: str) -> dict:
+    position = PROVIDER_DEFAULT_ORDER.index(provider) if provider in PROVIDER_DEFAULT_ORDER else len(PROVIDER_DEFAULT_ORDER)
+    return {"latency_ms": _PRIOR_LATENCY_MS + position * _PRIOR_STEP_MS, "success_rate": 1.0, "calls": 0}
+
+def record(provider: str, latency_ms: float, success: bool) -> None:
+    """Record the outcome of one provider call"""
+    with _lock:
+        window = _latencies.setdefault(provider, deque(maxlen=WINDOW_SIZE))
+        if success:
+            window.append(latency_ms)
+
+        stats = _ewma.setdefault(provider, _prior(provider))
+        if stats["calls"] == 0:
+            stats["latency_ms"] = latency_ms
+            stats["success_rate"] = 1.0 if success else 0.0
+        else:
+            stats["latency_ms"] = EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * stats["latency_ms"]
+            stats["success_rate"] = EWMA_ALPHA * (1.0 if success else 0.0) + (1 - EWMA_ALPHA) * stats["success_rate"]
+        stats["calls"] += 1
+
+    try:
+        from observability import PROVIDER_EWMA_LATENCY, PROVIDER_SUCCESS_RATE
+        PROVIDER_EWMA_LATENCY.labels(provider=provider).set(stats["latency_ms"])
+        PROVIDER_SUCCESS_RATE.labels(provider=provider).set(stats["success_rate"])
+    except Exception:
+        pass
+
+def percentile(provider: str, pct: float, min_samples: int = 1) -> Optional[float]:
+    """Latency percentile in ms over successful calls, or None if too few samples"""
+    with _lock:
+        samples = sorted(_latencies.get(provider, ()))
+    if len(samples) < max(1, min_samples):
+        return None
+    index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[index]
+
+def timed(provider: str, fn: Callable[..., str], *args, **kwargs) -> str:
+    """Run a provider function that returns a response or an "Error..." string and record it"""
+    start = time.time()
+    result = None
+    try:
+        result = fn(*args, **kwargs)
+        return result
+    finally:
+        latency_ms = (time.time() - start) * 1000
+        record(provider, latency_ms, bool(result) and not result.startswith("Error"))
+
+def _expected_cost(stats: dict) -> float:
+    # expected time to a usable answer: a provider that fails half the time "costs" double
+    return stats["latency_ms"] / max(stats["success_rate"], 0.05)
+
+def rank(providers: List[str]) -> List[str]:
+    """
+    Order providers fastest-first by EWMA latency / success rate
+
+    Providers below the quality floor are dropped. Providers whose success rate
+    fell below PROVIDER_MIN_SUCCESS_RATE are skipped, except on every
+    PROVIDER_PROBE_INTERVAL-th call so they can recover.
+    """
+    global _rank_calls
+    with _lock:
+        _rank_calls += 1
+        probe = _rank_calls % PROVIDER_PROBE_INTERVAL == 0
+        snapshot = {p: dict(_ewma.get(p) or _prior(p)) for p in providers}
+
+    eligible = []
+    for provider in providers:
+        if PROVIDER_QUALITY.get(provider, 1.0) < PROVIDER_QUALITY_FLOOR:
+            continue
+        if snapshot[provider]["success_rate"] < PROVIDER_MIN_SUCCESS_RATE and not probe:
+            continue
+        eligible.append(provider)
+    return sorted(eligible, key=lambda p: _expected_cost(snapshot[p]))
+
+def ranking() -> List[dict]:
+    """Live ranking of every known provider, for the admin endpoint"""
+    with _lock:
+        known = list(dict.fromkeys(list(PROVIDER_DEFAULT_ORDER) + list(_ewma)))
+        rows = []
+        for provider in known:
+            stats = _ewma.get(provider) or _prior(provider)
+            p95 = None
+            samples = sorted(_latencies.get(provider, ()))
+            if samples:
+                p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+            rows.append({
+                "provider": provider,
+                "ewma_latency_ms": round(stats["latency_ms"], 1),
+                "success_rate": round(stats["success_rate"], 3),
+                "p95_latency_ms": round(p95, 1) if p95 is not None else None,
+                "calls": stats["calls"],
+                "quality": PROVIDER_QUALITY.get(provider, 1.0),
+                "meets_quality_floor": PROVIDER_QUALITY.get(provider, 1.0) >= PROVIDER_QUALITY_FLOOR,
+                "expected_cost_ms": round(_expected_cost(stats), 1),
+            })
+    rows.sort(key=lambda row: row["expected_cost_ms"])
+    for position, row in enumerate(rows, 1):
+        row["rank"] = position
+    return rows
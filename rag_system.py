@@ -2,7 +2,12 @@
 LangChain RAG System for Plywood Studio
 Uses vector embeddings and retrieval for intelligent product information
 """
+import hashlib
 import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from typing import List, Optional
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter  # Updated import
@@ -10,14 +15,82 @@ from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate  # Updated import
 from langchain_core.documents import Document  # Fixed import
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from config import OPENAI_API_KEY, TEMPERATURE, MAX_TOKENS
+from langchain_core.runnables import RunnableLambda
+import conversation
+import prompts
+import rate_limits
+import tracing
+import usage
+from observability import record_metric
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, TEMPERATURE, MAX_TOKENS
+from config import WEB_DOCUMENT_TTL_SECONDS, WEB_DOCUMENT_GC_INTERVAL_SECONDS
 
 # Initialize components
 embeddings = None
 vectorstore = None
 qa_chain = None
 
+class _ReadWriteLock:
+    """Many concurrent readers or one writer; waiting writers go first so GC can't starve"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+# Ephemeral (expiring) documents: id -> (expires_at, content hash)
+_ephemeral = {}
+_ephemeral_lock = threading.Lock()  # guards _ephemeral and serializes writers (taken before _store_lock)
+# FAISS can't search while vectors are added/deleted in place: searches read, add/delete write.
+# Embedding happens outside the lock, so only the in-memory index work is serialized.
+_store_lock = _ReadWriteLock()
+_gc_thread = None
+_web_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
+RAG_MODEL = "gpt-3.5-turbo"
+_RETRIEVED_CONTEXT_TOKENS = 1000  # rough size of 4 retrieved chunks, for the rate-limit reservation
+
+try:
+    from langchain_community.callbacks import get_openai_callback
+except ImportError:
+    get_openai_callback = None
+
+def _not_expired(metadata: dict) -> bool:
+    """Retrieval filter: hide ephemeral documents past their expiry (until GC removes them)"""
+    return metadata.get("expires_at", float("inf")) > time.time()
+
+def _search_kwargs(k: int = 4) -> dict:
+    return {"k": k, "filter": _not_expired}
+
 def initialize_rag_system():
     """Initialize the RAG system with product knowledge"""
     global embeddings, vectorstore, qa_chain
@@ -30,70 +103,15 @@ def initialize_rag_system():
         # Initialize embeddings
         embeddings = OpenAIEmbeddings(
             openai_api_key=OPENAI_API_KEY,
+            openai_api_base=OPENAI_BASE_URL,
             model="text-embedding-3-small"  # Cost-effective embedding model
         )
         
-        # Load product knowledge
-        documents = _load_product_documents()
-        
-        # Create vector store
-        vectorstore = FAISS.from_documents(documents, embeddings)
-        
-        # Initialize LLM
-        llm = ChatOpenAI(
-            openai_api_key=OPENAI_API_KEY,
-            model_name="gpt-3.5-turbo",
-            temperature=TEMPERATURE,
-            max_tokens=MAX_TOKENS
-        )
-        
-        # Create retriever
-        retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 4}  # Retrieve top 4 most relevant documents
-        )
-        
-        # Create custom prompt using LCEL (LangChain Expression Language)
-        prompt_template = """You are an expert assistant for Plywood Studio, a premium plywood, doors, and laminate supplier in Hyderabad, India.
-
-BUSINESS CONTEXT:
-- Company: Plywood Studio (established 2022)
-- Location: Goshamahal, Hyderabad-500012, Telangana
-- Products: Premium plywood, wooden doors, laminate sheets, door hardware
-- Brands: Centuryply (Club Prime, Bond 710), Sainik MR Plywood, Greenply
-- Contact: www.indiamart.com/plywoodstudio
-
-Use the following product information to answer the customer's question accurately and helpfully:
-
-{context}
-
-CUSTOMER QUESTION: {question}
-
-INSTRUCTIONS:
-- Provide detailed, accurate, and helpful information
-- If the context doesn't contain specific details, provide general guidance based on your knowledge
-- Always mention how to contact us (IndiaMART or visit Goshamahal showroom) for pricing and availability
-- Be professional yet friendly
-- Focus on practical advice for customers
-
-Your response:"""
-
-        prompt = PromptTemplate(
-            template=prompt_template,
-            input_variables=["context", "question"]
-        )
-        
-        # Create RAG chain using LCEL
-        def format_docs(docs):
-            return "\n\n".join(doc.page_content for doc in docs)
-        
-        qa_chain = (
-            {"context": retriever | format_docs, "question": RunnablePassthrough()}
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
+        import knowledge_base
+        vectorstore, qa_chain = _build_index(knowledge_base.snapshot())
+        knowledge_base.on_reload(_schedule_rebuild)
         
+        _start_gc()
         logging.info("✅ LangChain RAG system initialized successfully")
         return True
         
@@ -101,165 +119,92 @@ Your response:"""
         logging.error(f"Failed to initialize RAG system: {e}")
         return False
 
-def _load_product_documents() -> List[Document]:
-    """Load all product knowledge as LangChain documents"""
-    from knowledge_base import (
-        PLYWOOD_KNOWLEDGE, BRAND_KNOWLEDGE, DOOR_KNOWLEDGE, 
-        LAMINATE_KNOWLEDGE, TECHNICAL_SPECS
-    )
-    
-    documents = []
-    
-    # Add plywood knowledge
-    for product_type, info in PLYWOOD_KNOWLEDGE.items():
-        content = f"""Product: {product_type.replace('_', ' ').title()}
-
-Description: {info['description']}
-
-Features:
-{chr(10).join('- ' + feature for feature in info.get('features', []))}
-
-Applications: {info.get('applications', 'N/A')}
-
-Brands Available: {info.get('brands_we_carry', 'Various brands')}
-
-{info.get('difference_from_regular', '')}
-"""
-        documents.append(Document(
-            page_content=content,
-            metadata={"type": "plywood", "product": product_type}
-        ))
+def _build_index(kb: dict):
+    """Embed a knowledge snapshot into a new FAISS store and build its QA chain"""
+    # Load product knowledge
+    documents = _load_product_documents(kb)
     
-    # Add brand knowledge
-    for brand, info in BRAND_KNOWLEDGE.items():
-        products_text = "\n".join(
-            f"- {name}: {desc}" 
-            for name, desc in info.get('products_we_carry', {}).items()
-        )
-        
-        content = f"""Brand: {brand.title()}
-
-Description: {info['description']}
-
-History: {info.get('history', 'N/A')}
-
-Products We Carry:
-{products_text}
-
-Unique Features: {info.get('unique_features', 'N/A')}
-
-Warranty: {info.get('warranty', 'Available')}
-"""
-        documents.append(Document(
-            page_content=content,
-            metadata={"type": "brand", "brand": brand}
-        ))
+    # Create vector store
+    store = FAISS.from_documents(documents, embeddings)
+    return store, _build_chain()
+
+def _build_chain():
+    """LCEL answer chain: prompt -> LLM over documents retrieved by query_rag"""
+    # Initialize LLM
+    llm = ChatOpenAI(
+        openai_api_key=OPENAI_API_KEY,
+        openai_api_base=OPENAI_BASE_URL,
+        model_name=RAG_MODEL,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS
+    )
     
-    # Add door knowledge
-    for door_type, info in DOOR_KNOWLEDGE.items():
-        content = f"""Product: {door_type.replace('_', ' ').title()}
-
-Description: {info['description']}
-
-Construction: {info.get('construction', 'N/A')}
-
-Advantages: {info.get('advantages', 'N/A')}
-
-Applications: {info.get('applications', 'N/A')}
-
-Sizes Available: {info.get('sizes', 'Standard and custom sizes')}
+    # Create custom prompt using LCEL (LangChain Expression Language)
+    prompt_template = prompts.get("rag").text
 
-Brands: {info.get('brands_we_carry', 'Various brands')}
-"""
-        documents.append(Document(
-            page_content=content,
-            metadata={"type": "door", "product": door_type}
-        ))
+    prompt = PromptTemplate(
+        template=prompt_template,
+        input_variables=["context", "history", "question"]
+    )
     
-    # Add laminate knowledge
-    content = f"""Product: Decorative Laminates
-
-{LAMINATE_KNOWLEDGE['description']}
-
-Types Available:
-{chr(10).join(f"- {name}: {desc}" for name, desc in LAMINATE_KNOWLEDGE['types'].items())}
-
-Applications: {LAMINATE_KNOWLEDGE['applications']}
-
-Thickness Options: {LAMINATE_KNOWLEDGE['thickness_options']}
-
-Brands: {LAMINATE_KNOWLEDGE['brands_we_carry']}
-"""
-    documents.append(Document(
-        page_content=content,
-        metadata={"type": "laminate"}
-    ))
+    # Create RAG chain using LCEL
+    def format_docs(docs):
+        return "\n\n".join(doc.page_content for doc in docs)
     
-    # Add technical specifications
-    thickness_info = TECHNICAL_SPECS['plywood_thickness']
-    apps_text = "\n".join(
-        f"- {size}: {app}"
-        for size, app in thickness_info['applications'].items()
+    # Input: {"question", "history", "documents"} - query_rag retrieves once and passes the documents in
+    return (
+        {
+            "context": RunnableLambda(lambda inputs: format_docs(inputs["documents"])),
+            "history": RunnableLambda(lambda inputs: inputs["history"]),
+            "question": RunnableLambda(lambda inputs: inputs["question"]),
+        }
+        | prompt
+        | llm
+        | StrOutputParser()
     )
-    
-    content = f"""Technical Specifications: Plywood Thickness
-
-Common Sizes: {', '.join(thickness_info['common_sizes'])}
 
-Applications by Thickness:
-{apps_text}
+def _schedule_rebuild(kb: dict) -> None:
+    """Knowledge reload listener: re-embed in the background, then flip the active index"""
+    threading.Thread(target=_rebuild_index, args=(kb,), name="rag-rebuild", daemon=True).start()
 
-Plywood Grades:
-{chr(10).join(f"- {grade}: {desc}" for grade, desc in TECHNICAL_SPECS['plywood_grades'].items())}
-"""
-    documents.append(Document(
-        page_content=content,
-        metadata={"type": "technical"}
-    ))
+def _rebuild_index(kb: dict) -> None:
+    global vectorstore, qa_chain
+    try:
+        new_store, new_chain = _build_index(kb)
+    except Exception as e:
+        logging.error(f"RAG index rebuild for knowledge version {kb.get('version')} failed, keeping current index: {e}")
+        return
     
-    # Add business information
-    business_doc = Document(
-        page_content="""Plywood Studio - Business Information
-
-Company: Plywood Studio
-Type: Partnership Firm
-Established: 2022
-Location: 5-5-983, 5-5-982/1, Goshamahal, Hyderabad-500012, Telangana, India
-
-Contact Information:
-- Website: www.indiamart.com/plywoodstudio
-- Platform: IndiaMART (5-star verified supplier)
-- GST Number: 36ABCFP0708R1ZW
-
-Business Details:
-- Annual Turnover: 5-25 Cr
-- Employees: Up to 10 people
-- Business Type: Wholesale Trader
-- Rating: 5.0 stars on IndiaMART
-
-Specialties:
-- Authorized dealer for premium brands (Centuryply, Sainik, Greenply)
-- Wide variety of plywood grades and thicknesses
-- Quality wooden doors (flush, panel, laminate)
-- Decorative laminate sheets
-- Expert knowledge of wood products
-- GST registered and IndiaMART verified
-
-How to Contact:
-- Visit our showroom at Goshamahal, Hyderabad
-- Contact through IndiaMART for quotes and availability
-- Partner: Shubham Agarwal
-""",
-        metadata={"type": "business"}
-    )
-    documents.append(business_doc)
+    with _ephemeral_lock:
+        # carry unexpired web documents over to the new index
+        live = {doc_id: entry for doc_id, entry in _ephemeral.items() if entry[0] > time.time()}
+        carried = []
+        for doc_id in live:
+            doc = vectorstore.docstore.search(doc_id) if vectorstore else None
+            if isinstance(doc, Document):
+                carried.append((doc_id, doc))
+        if carried:
+            new_store.add_documents([doc for _, doc in carried], ids=[doc_id for doc_id, _ in carried])
+        _ephemeral.clear()
+        _ephemeral.update({doc_id: live[doc_id] for doc_id, _ in carried})
+        # in-flight queries keep using the chain they already hold
+        vectorstore, qa_chain = new_store, new_chain
+    logging.info(f"✅ RAG index rebuilt for knowledge version {kb.get('version')} ({len(carried)} web documents carried over)")
+
+def _load_product_documents(kb: dict) -> List[Document]:
+    """Wrap a knowledge snapshot's pre-rendered documents as LangChain documents"""
+    documents = [
+        Document(page_content=content, metadata=dict(metadata))
+        for content, metadata in kb["rendered_documents"]
+    ]
     
-    logging.info(f"Loaded {len(documents)} product documents into RAG system")
+    logging.info(f"Loaded {len(documents)} product documents (knowledge version {kb.get('version')}) into RAG system")
     return documents
 
 def query_rag(question: str, chat_history: Optional[List] = None) -> dict:
     """
     Query the RAG system with a question
+    chat_history: earlier (role, content) turns of the session (see conversation.history)
     Returns: {"answer": str, "source_documents": List[Document]}
     """
     global qa_chain
@@ -272,13 +217,36 @@ def query_rag(question: str, chat_history: Optional[List] = None) -> dict:
                 "source_documents": []
             }
     
+    # Hold references so a concurrent index swap doesn't change them mid-query
+    # (in-place adds/deletes on the store are excluded by _store_lock while searching)
+    chain, store = qa_chain, vectorstore
+    # Follow-ups ("what about 12mm?") retrieve with the previous customer message for context
+    retrieval_query = f"{conversation.last_user_turn(chat_history)} {question}".strip()
+    inputs = {"question": question, "history": conversation.format_history(chat_history)}
+    estimated_tokens = (prompts.count_tokens(prompts.get("rag").text + inputs["history"] + question)
+                        + _RETRIEVED_CONTEXT_TOKENS + MAX_TOKENS)
+    if not rate_limits.acquire("openai", RAG_MODEL, estimated_tokens):
+        return {
+            "answer": "Error: OpenAI rate-limit budget exhausted",
+            "source_documents": []
+        }
     try:
-        # Invoke the LCEL chain
-        answer = qa_chain.invoke(question)
+        # Retrieve once: the documents are both the chain's context and the returned sources
+        with tracing.span("retrieval") as retrieval:
+            source_docs = _search(store, retrieval_query, 4)
+        record_metric("retrieval_latency_ms", retrieval["duration_ms"])
+        inputs["documents"] = source_docs
         
-        # Get source documents
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-        source_docs = retriever.invoke(question)
+        # Invoke the LCEL chain (with the OpenAI callback capturing token usage)
+        with tracing.span("rag.llm"):
+            if get_openai_callback is not None:
+                with get_openai_callback() as cb:
+                    answer = chain.invoke(inputs)
+                usage.record("openai", RAG_MODEL, cb.prompt_tokens, cb.completion_tokens,
+                             cached_prompt_tokens=getattr(cb, "prompt_tokens_cached", 0))
+                rate_limits.settle("openai", RAG_MODEL, estimated_tokens, cb.total_tokens)
+            else:
+                answer = chain.invoke(inputs)
         
         logging.info(f"RAG query successful, found {len(source_docs)} sources")
         return {
@@ -287,33 +255,143 @@ def query_rag(question: str, chat_history: Optional[List] = None) -> dict:
         }
     except Exception as e:
         logging.error(f"RAG query failed: {e}")
+        rate_limits.settle("openai", RAG_MODEL, estimated_tokens, 0)  # refund the token reservation
         return {
             "answer": f"Error querying RAG system: {str(e)}",
             "source_documents": []
         }
 
-def add_documents(documents: List[Document]):
-    """Add new documents to the vector store"""
+def add_documents(documents: List[Document], ttl_seconds: Optional[int] = None) -> List[str]:
+    """
+    Add new documents to the vector store
+
+    With ttl_seconds the documents are ephemeral: they get fetched_at/expires_at
+    metadata, are hidden from retrieval once expired and are deleted by the
+    background GC. Returns the ids of the added documents.
+    """
     global vectorstore
     
-    if vectorstore:
-        vectorstore.add_documents(documents)
-        logging.info(f"Added {len(documents)} new documents to RAG system")
-    else:
+    if not vectorstore:
         logging.warning("Vector store not initialized")
+        return []
+    
+    ids = [str(uuid.uuid4()) for _ in documents]
+    if ttl_seconds:
+        now = time.time()
+        for doc in documents:
+            doc.metadata.setdefault("fetched_at", now)
+            doc.metadata["expires_at"] = now + ttl_seconds
+    
+    # embed before locking: searches only wait for the FAISS insert itself
+    texts = [doc.page_content for doc in documents]
+    vectors = embeddings.embed_documents(texts)
+    with _ephemeral_lock:
+        with _store_lock.write():
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=[doc.metadata for doc in documents], ids=ids)
+        if ttl_seconds:
+            for doc_id, doc in zip(ids, documents):
+                _ephemeral[doc_id] = (doc.metadata["expires_at"], _content_hash(doc.page_content))
+    logging.info(f"Added {len(documents)} new documents to RAG system" + (f" (expire in {ttl_seconds}s)" if ttl_seconds else ""))
+    return ids
+
+def add_web_results(query: str, web_context: str, source: str = "web_search",
+                    ttl_seconds: int = WEB_DOCUMENT_TTL_SECONDS) -> List[str]:
+    """Chunk web search snippets and index them as expiring documents (skips chunks already indexed)"""
+    if not vectorstore or not web_context:
+        return []
+    
+    with _ephemeral_lock:
+        known = {content_hash for expires_at, content_hash in _ephemeral.values() if expires_at > time.time()}
+    documents = [
+        Document(page_content=chunk, metadata={"type": "web", "source": source, "query": query})
+        for chunk in _web_splitter.split_text(web_context)
+        if _content_hash(chunk) not in known
+    ]
+    if not documents:
+        return []
+    return add_documents(documents, ttl_seconds=ttl_seconds)
+
+def purge_expired() -> int:
+    """Delete expired ephemeral documents from the vector store"""
+    now = time.time()
+    with _ephemeral_lock:
+        expired_ids = [doc_id for doc_id, (expires_at, _) in _ephemeral.items() if expires_at <= now]
+        if not expired_ids or not vectorstore:
+            return 0
+        try:
+            with _store_lock.write():
+                vectorstore.delete(expired_ids)
+        except Exception as e:
+            logging.warning(f"Failed to purge expired documents: {e}")
+            return 0
+        for doc_id in expired_ids:
+            _ephemeral.pop(doc_id, None)
+    logging.info(f"Purged {len(expired_ids)} expired web documents from RAG index")
+    return len(expired_ids)
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _start_gc() -> None:
+    """Start the background thread that garbage-collects expired documents"""
+    global _gc_thread
+    if _gc_thread and _gc_thread.is_alive():
+        return
+    
+    def _loop():
+        while True:
+            time.sleep(WEB_DOCUMENT_GC_INTERVAL_SECONDS)
+            try:
+                purge_expired()
+            except Exception as e:
+                logging.warning(f"RAG document GC failed: {e}")
+    
+    _gc_thread = threading.Thread(target=_loop, name="rag-gc", daemon=True)
+    _gc_thread.start()
+
+def _search(store, query: str, k: int) -> List[Document]:
+    """Embed the query, then search the store under the read lock"""
+    vector = embeddings.embed_query(query)
+    with _store_lock.read():
+        return store.similarity_search_by_vector(vector, **_search_kwargs(k))
 
 def search_similar(query: str, k: int = 4) -> List[Document]:
     """Search for similar documents without generating answer"""
-    if not vectorstore:
+    store = vectorstore
+    if not store:
         return []
     
     try:
-        docs = vectorstore.similarity_search(query, k=k)
+        docs = _search(store, query, k)
         return docs
     except Exception as e:
         logging.error(f"Similarity search failed: {e}")
         return []
 
+def memory_usage() -> dict:
+    """Vector count and approximate bytes of the FAISS index and its docstore"""
+    from memory_report import deep_sizeof
+    store = vectorstore
+    if store is None:
+        return {"loaded": False}
+    index = store.index
+    documents = getattr(store.docstore, "_dict", {})
+    seen = set()
+    with _ephemeral_lock:
+        ephemeral = len(_ephemeral)
+    with _store_lock.read():
+        return {
+            "loaded": True,
+            "vectors": index.ntotal,
+            "dimensions": index.d,
+            "index_bytes": index.ntotal * index.d * 4,  # flat float32 index
+            "documents": len(documents),
+            "docstore_approx_bytes": sum(deep_sizeof(doc.page_content, seen) + deep_sizeof(doc.metadata, seen)
+                                         for doc in list(documents.values())),
+            "id_map_approx_bytes": deep_sizeof(store.index_to_docstore_id),
+            "ephemeral_documents": ephemeral,
+        }
+
 # Auto-initialize on import (if API key available)
 if OPENAI_API_KEY:
     initialize_rag_system()
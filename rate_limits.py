@@ -0,0 +1,165 @@
+"""
+Client-side rate-limit scheduler
+One token bucket pair (requests per minute, tokens per minute) per provider/model.
+Calls reserve budget before they are sent: they wait briefly if the budget refills
+in time, otherwise the caller gets False and the fallback chain moves on to the next
+provider instead of collecting a 429. Budgets are corrected from x-ratelimit-*
+response headers and frozen after a 429 until Retry-After has passed.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+import deadline
+from config import RATE_LIMITS, RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS, DEADLINE_RESERVE_SECONDS
+
+class _Bucket:
+    """Refills continuously at limit/60 per second; the level may go negative (reserved debt)"""
+
+    def __init__(self, limit: float):
+        self.limit = float(limit)
+        self.level = float(limit)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Seconds until amount is available"""
+        amount = min(amount, self.limit)
+        wait = max(0.0, self.blocked_until - now)
+        if self.level < amount:
+            wait = max(wait, (amount - self.level) * 60.0 / self.limit)
+        return wait
+
+_lock = threading.Lock()
+_buckets: Dict[Tuple[str, str], Dict[str, _Bucket]] = {}
+
+def _get(provider: str, model: str) -> Dict[str, _Bucket]:
+    key = (provider, model)
+    if key not in _buckets:
+        limits = RATE_LIMITS.get(provider, {"rpm": 60, "tpm": 100000})
+        _buckets[key] = {"requests": _Bucket(limits["rpm"]), "tokens": _Bucket(limits["tpm"])}
+    return _buckets[key]
+
+def acquire(provider: str, model: str, estimated_tokens: int) -> bool:
+    """
+    Reserve one request and estimated_tokens for a call
+
+    Waits up to RATE_LIMIT_MAX_WAIT_SECONDS (bounded by the request deadline) for
+    budget to refill. Returns False if the call should be rerouted instead.
+    """
+    max_wait = RATE_LIMIT_MAX_WAIT_SECONDS
+    left = deadline.remaining()
+    if left is not None:
+        max_wait = min(max_wait, max(0.0, left - DEADLINE_RESERVE_SECONDS))
+
+    with _lock:
+        buckets = _get(provider, model)
+        now = time.monotonic()
+        for bucket in buckets.values():
+            bucket.refill(now)
+        wait = max(buckets["requests"].wait_for(1, now), buckets["tokens"].wait_for(estimated_tokens, now))
+        if wait > max_wait:
+            _throttled(provider, model, "rerouted")
+            logging.warning(f"{provider}/{model} rate-limit budget exhausted ({wait:.1f}s to refill), rerouting")
+            return False
+        buckets["requests"].level -= 1
+        buckets["tokens"].level -= min(estimated_tokens, buckets["tokens"].limit)
+        _export(provider, model, buckets)
+
+    if wait > 0:
+        _throttled(provider, model, "waited")
+        logging.info(f"Waiting {wait:.2f}s for {provider}/{model} rate-limit budget")
+        time.sleep(wait)
+    return True
+
+def settle(provider: str, model: str, estimated_tokens: int, actual_tokens: int) -> None:
+    """Correct the token reservation once the real usage is known (actual_tokens=0 refunds a failed call)"""
+    with _lock:
+        buckets = _get(provider, model)
+        buckets["tokens"].level += min(estimated_tokens, buckets["tokens"].limit) - actual_tokens
+        _export(provider, model, buckets)
+
+def update_from_headers(provider: str, model: str, headers: Mapping[str, str]) -> None:
+    """Adopt the provider's own limits/remaining counts (OpenAI x-ratelimit-* headers)"""
+    with _lock:
+        buckets = _get(provider, model)
+        now = time.monotonic()
+        for kind in ("requests", "tokens"):
+            limit = _number(headers.get(f"x-ratelimit-limit-{kind}"))
+            remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            bucket = buckets[kind]
+            bucket.refill(now)
+            if limit:
+                bucket.limit = limit
+            if remaining is not None:
+                # reservations for calls still in flight stay deducted
+                bucket.level = min(bucket.level, remaining)
+        _export(provider, model, buckets)
+
+def penalize(provider: str, model: str, headers: Optional[Mapping[str, str]] = None) -> float:
+    """Freeze a provider/model after a 429 until Retry-After (or the default back-off) has passed"""
+    retry_after = None
+    if headers:
+        retry_after = _number(headers.get("retry-after")) or _duration(headers.get("x-ratelimit-reset-requests"))
+    retry_after = retry_after or RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS
+    with _lock:
+        buckets = _get(provider, model)
+        for bucket in buckets.values():
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+        _export(provider, model, buckets)
+    logging.warning(f"{provider}/{model} rate limited, holding calls for {retry_after:.1f}s")
+    return retry_after
+
+def snapshot() -> list:
+    """Current budgets for the admin endpoint"""
+    with _lock:
+        now = time.monotonic()
+        rows = []
+        for (provider, model), buckets in _buckets.items():
+            for bucket in buckets.values():
+                bucket.refill(now)
+            rows.append({
+                "provider": provider,
+                "model": model,
+                "requests_remaining": round(buckets["requests"].level, 1),
+                "requests_per_minute": buckets["requests"].limit,
+                "tokens_remaining": round(buckets["tokens"].level),
+                "tokens_per_minute": buckets["tokens"].limit,
+                "blocked_for_seconds": round(max(0.0, buckets["requests"].blocked_until - now), 1),
+            })
+    return rows
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations like '1s', '6m0s', '20ms'"""
+    if not value:
+        return None
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    return sum(float(amount) * units[unit] for amount, unit in parts) if parts else None
+
+def _throttled(provider: str, model: str, action: str) -> None:
+    try:
+        from observability import RATE_LIMIT_THROTTLED
+        RATE_LIMIT_THROTTLED.labels(provider=provider, model=model, action=action).inc()
+    except Exception:
+        pass
+
+def _export(provider: str, model: str, buckets: Dict[str, _Bucket]) -> None:
+    try:
+        from observability import RATE_LIMIT_REMAINING
+        for kind, bucket in buckets.items():
+            RATE_LIMIT_REMAINING.labels(provider=provider, model=model, kind=kind).set(max(0.0, bucket.level))
+    except Exception:
+        pass
@@ -0,0 +1,61 @@
+"""
+Test the structured catalogue short-circuit
+Questions it answers must come from the catalogue; everything else must return None
+so the pipeline falls through to RAG / LLM.
+"""
+import pytest
+
+import catalogue
+
+@pytest.mark.parametrize("question, intent", [
+    ("Price of 18mm BWP plywood", "price"),
+    ("How much is Centuryply Club Prime?", "price"),
+    ("What sizes do flush doors come in?", "sizes"),
+    ("Door dimensions for flush doors", "sizes"),
+    ("How thick are your laminates?", "thickness"),
+    ("Which grade handles moderate humidity, MR or BWP?", None),  # 'rate' inside 'moderate'
+    ("Is marine plywood accurate for boats?", None),              # 'rate' inside 'accurate'
+    ("Corporate history of Greenply", None),                      # 'rate' inside 'corporate'
+    ("Is BWP plywood costly?", None),                             # 'cost' inside 'costly'
+])
+def test_parse_query_intent(question, intent):
+    assert catalogue.parse_query(question)["intent"] == intent
+
+def test_parse_query_size_either_orientation():
+    assert catalogue.parse_query("price of 7ft x 3ft flush doors")["size"] == "7ft x 3ft"
+    assert catalogue.parse_query("price of 3ft x 7ft flush doors")["size"] == "7ft x 3ft"
+
+@pytest.mark.parametrize("question", [
+    "Which grade handles moderate humidity, MR or BWP?",
+    "Is marine plywood accurate for boats?",
+    "Corporate history of Greenply",
+    "What is marine plywood and where is it used?",
+    "Price of 9ft x 5ft flush doors",  # not a size we stock
+    "What thickness of plywood should I use for kitchen cabinets?",  # advice, not a stocked attribute
+    "Which size plywood for wardrobe 19mm",  # plywood sheet sizes aren't in the catalogue
+])
+def test_answer_falls_through(question):
+    assert catalogue.answer(question) is None
+
+def test_answer_price():
+    reply = catalogue.answer("Price of 18mm BWP plywood")
+    assert reply is not None
+    assert "18mm" in reply and "BWP" in reply
+    assert "quote" in reply
+
+def test_answer_door_sizes():
+    reply = catalogue.answer("What sizes do flush doors come in?")
+    assert reply is not None
+    assert "7ft x 3ft" in reply and "8ft x 4ft" in reply
+
+def test_answer_filters_on_size():
+    reply = catalogue.answer("Price of 7ft x 3ft flush doors")
+    assert reply is not None
+    assert "Flush Doors" in reply
+
+def test_laminate_thickness_is_not_a_size():
+    sizes = catalogue.answer("laminate sizes")
+    assert sizes is None or "0.8mm" not in sizes
+    thickness = catalogue.answer("laminate thickness")
+    assert thickness is not None
+    assert "0.8mm" in thickness
@@ -0,0 +1,50 @@
+"""
+Test web search negative caching
+Empty and failed lookups are cached briefly; searches cut short by the deadline are not.
+"""
+import time
+
+import deadline
+import web_search
+
+def _isolate(monkeypatch):
+    store = {}
+    monkeypatch.setattr(web_search, "cache_get", store.get)
+    monkeypatch.setattr(web_search, "cache_set", lambda key, value, ttl: store.__setitem__(key, value))
+    monkeypatch.setattr(web_search, "SERPER_API_KEY", None)
+    return store
+
+def test_failed_engine_is_negatively_cached(monkeypatch):
+    _isolate(monkeypatch)
+    calls = []
+
+    def failing(query, num_results=3):
+        calls.append(query)
+        raise RuntimeError("DNS lookup failed")
+    monkeypatch.setattr(web_search, "_search_with_duckduckgo", failing)
+
+    assert web_search.search_web("marine plywood uses") is None
+    assert web_search.search_web("marine plywood uses") is None
+    assert len(calls) == 1
+
+def test_empty_result_is_negatively_cached(monkeypatch):
+    _isolate(monkeypatch)
+    calls = []
+    monkeypatch.setattr(web_search, "_search_with_duckduckgo", lambda query, num_results=3: calls.append(query) or [])
+
+    web_search.search_web("flexi ply bending radius")
+    web_search.search_web("flexi ply bending radius")
+    assert len(calls) == 1
+
+def test_deadline_cut_off_is_not_cached(monkeypatch):
+    store = _isolate(monkeypatch)
+    monkeypatch.setattr(web_search, "WEB_SEARCH_DEADLINE_SECONDS", 0.05)
+    monkeypatch.setattr(web_search, "DEADLINE_RESERVE_SECONDS", 0.0)
+    monkeypatch.setattr(web_search, "_search_with_duckduckgo", lambda query, num_results=3: time.sleep(0.3) or [])
+
+    deadline.start(5)
+    try:
+        assert web_search.search_web("block board sizes") is None
+    finally:
+        deadline.clear()
+    assert store == {}
@@ -0,0 +1,71 @@
+"""
+Per-request stage tracing
+Each stage of a request runs inside tracing.span(name). Durations go to the
+genai_stage_latency_ms histogram and, for /chat, into a Server-Timing header.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+_trace: ContextVar[Optional[dict]] = ContextVar("request_trace", default=None)
+_lock = threading.Lock()
+
+def start() -> dict:
+    """Start a trace for the current request"""
+    # the dict is shared by reference with contexts copied into worker threads
+    trace = {"started": time.perf_counter(), "spans": []}
+    _trace.set(trace)
+    return trace
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage
+
+    Spans outside a request (no trace started) still feed the histogram.
+    """
+    begin = time.perf_counter()
+    record = {"name": name, "start_ms": None, "duration_ms": None, **attributes}
+    try:
+        yield record
+    finally:
+        end = time.perf_counter()
+        duration_ms = (end - begin) * 1000
+        record["duration_ms"] = round(duration_ms, 2)
+        trace = _trace.get()
+        if trace is not None:
+            record["start_ms"] = round((begin - trace["started"]) * 1000, 2)
+            with _lock:
+                trace["spans"].append(record)
+        try:
+            from observability import STAGE_LATENCY
+            STAGE_LATENCY.labels(stage=name).observe(duration_ms)
+        except Exception:
+            pass
+
+def spans() -> List[dict]:
+    """Finished spans of the current request, in start order"""
+    trace = _trace.get()
+    if trace is None:
+        return []
+    with _lock:
+        return sorted(trace["spans"], key=lambda s: s["start_ms"])
+
+def server_timing() -> str:
+    """Server-Timing header value (stages repeated across retries are summed)"""
+    trace = _trace.get()
+    if trace is None:
+        return ""
+    totals = {}
+    for record in spans():
+        totals[record["name"]] = totals.get(record["name"], 0.0) + record["duration_ms"]
+    totals["total"] = (time.perf_counter() - trace["started"]) * 1000
+    return ", ".join(f"{name.replace('.', '_')};dur={duration:.1f}" for name, duration in totals.items())
+
+def log_summary() -> None:
+    timeline = " | ".join(f"{s['name']} {s['duration_ms']:.0f}ms" for s in spans())
+    if timeline:
+        logging.info(f"⏱️ Stages: {timeline}")
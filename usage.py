@@ -0,0 +1,120 @@
+"""
+Token usage and cost accounting
+LLM clients report token counts here; totals go to Prometheus (by provider, model,
+route and cache status) and are accumulated per request for the API response
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from config import TOKEN_PRICES_USD_PER_1K, CACHED_PROMPT_PRICE_RATIO
+
+# Routes: how an answer was produced
+ROUTES = ("direct", "rag", "web", "curated", "catalogue", "cache", "memory")
+
+_route: ContextVar[str] = ContextVar("usage_route", default="direct")
+_request: ContextVar[Optional[dict]] = ContextVar("request_usage", default=None)
+_lock = threading.Lock()
+
+def start() -> dict:
+    """Start accumulating usage for the current request"""
+    totals = {"route": None, "provider": None, "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0,
+              "total_tokens": 0, "estimated_cost_usd": 0.0, "calls": []}
+    # the dict is shared by reference with contexts copied into worker threads (hedging, web search)
+    _request.set(totals)
+    return totals
+
+def current() -> Optional[dict]:
+    """Usage accumulated so far by the current request (None outside a request)"""
+    totals = _request.get()
+    if totals is None:
+        return None
+    with _lock:
+        return {**totals, "estimated_cost_usd": round(totals["estimated_cost_usd"], 6), "calls": list(totals["calls"])}
+
+@contextmanager
+def route(name: str):
+    """Attribute LLM calls made inside the block to a route"""
+    token = _route.set(name)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+    prompt_price, completion_price = TOKEN_PRICES_USD_PER_1K.get(model, (0.0, 0.0))
+    uncached = prompt_tokens - cached_prompt_tokens
+    return (uncached * prompt_price
+            + cached_prompt_tokens * prompt_price * CACHED_PROMPT_PRICE_RATIO
+            + completion_tokens * completion_price) / 1000
+
+def record(provider: str, model: str, prompt_tokens: int, completion_tokens: int,
+           cached_prompt_tokens: int = 0, estimated: bool = False) -> None:
+    """
+    Record one LLM call's token usage
+
+    Args:
+        provider: "openai" or "huggingface" (the billing provider, whatever the route)
+        model: Model name as billed
+        prompt_tokens: Prompt tokens including cached ones
+        completion_tokens: Generated tokens
+        cached_prompt_tokens: Prompt tokens served from the provider's prompt cache
+        estimated: True when counts were estimated locally (provider returned no usage)
+    """
+    prompt_tokens, completion_tokens = int(prompt_tokens or 0), int(completion_tokens or 0)
+    cached_prompt_tokens = min(int(cached_prompt_tokens or 0), prompt_tokens)
+    cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens)
+    route_name = _route.get()
+
+    try:
+        from observability import LLM_TOKENS, LLM_COST_USD
+        labels = {"provider": provider, "model": model, "route": route_name}
+        LLM_TOKENS.labels(cache="miss", type="prompt", **labels).inc(prompt_tokens - cached_prompt_tokens)
+        LLM_TOKENS.labels(cache="hit", type="prompt", **labels).inc(cached_prompt_tokens)
+        LLM_TOKENS.labels(cache="miss", type="completion", **labels).inc(completion_tokens)
+        LLM_COST_USD.labels(**labels).inc(cost)
+    except Exception as e:
+        logging.debug(f"Token metrics skipped: {e}")
+
+    totals = _request.get()
+    if totals is not None:
+        with _lock:
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cached_prompt_tokens"] += cached_prompt_tokens
+            totals["total_tokens"] += prompt_tokens + completion_tokens
+            totals["estimated_cost_usd"] += cost
+            totals["calls"].append({"provider": provider, "model": model, "route": route_name,
+                                    "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                    "cached_prompt_tokens": cached_prompt_tokens, "estimated": estimated})
+
+    logging.info(f"Token usage [{provider}/{model}, {route_name}]: prompt {prompt_tokens} "
+                 f"(cached {cached_prompt_tokens}), completion {completion_tokens}, ~${cost:.5f}")
+
+def answered(route_name: str, cache_hit: bool = False, provider: Optional[str] = None,
+             depth: Optional[int] = None) -> None:
+    """
+    Record which route (and provider step) produced the answer for the current request
+
+    depth is the number of provider steps attempted, including the answering one
+    (0 for answers that never entered the chain: catalogue, response cache).
+    """
+    provider = provider or route_name
+    totals = _request.get()
+    if totals is not None:
+        totals["route"] = route_name
+        totals["provider"] = provider
+    try:
+        from observability import RESPONSES_BY_ROUTE, ANSWERS_BY_PROVIDER, FALLBACK_DEPTH
+        RESPONSES_BY_ROUTE.labels(route=route_name, cache="hit" if cache_hit else "miss").inc()
+        ANSWERS_BY_PROVIDER.labels(provider=provider).inc()
+        if depth is not None:
+            FALLBACK_DEPTH.observe(depth)
+    except Exception as e:
+        logging.debug(f"Route metric skipped: {e}")
+
+def answered_route() -> Optional[str]:
+    totals = _request.get()
+    return totals["route"] if totals is not None else None
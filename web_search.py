@@ -1,34 +1,163 @@
 """
 Web Search Tool - Search for product specifications and information
 """
+import contextvars
+import hashlib
 import logging
-import requests
-from typing import Optional, List, Dict
-from config import SERPER_API_KEY
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Tuple
+import deadline
+import http_pool
+import profiling
+import tracing
+from cache_store import get as cache_get, set as cache_set
+from config import SERPER_API_KEY, DEADLINE_RESERVE_SECONDS
+from config import WEB_SEARCH_CACHE_TTL_SECONDS, WEB_SEARCH_NEGATIVE_TTL_SECONDS, WEB_SEARCH_DEADLINE_SECONDS
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+
+_NO_RESULTS = "__no_results__"  # negative-cache marker (empty strings can't be stored in Redis)
 
 def search_web(query: str, num_results: int = 3) -> Optional[str]:
     """
     Search the web for information using Serper API (Google Search)
     Falls back to DuckDuckGo if Serper is not available
+
+    Results are cached per normalized query for WEB_SEARCH_CACHE_TTL_SECONDS;
+    empty/failed lookups are cached for WEB_SEARCH_NEGATIVE_TTL_SECONDS. Searches cut
+    short by the deadline aren't cached, the next request tries again.
     """
-    logging.info(f"Web search for: {query}")
+    from observability import WEB_SEARCH_CACHE
     
-    # Try Serper API (Google Search) first
-    if SERPER_API_KEY and SERPER_API_KEY != "your_serper_api_key_here":
-        result = _search_with_serper(query, num_results)
-        if result:
-            return result
+    key = _cache_key(query, num_results)
+    cached = cache_get(key)
+    if cached == _NO_RESULTS:
+        WEB_SEARCH_CACHE.labels(result="negative_hit").inc()
+        logging.info(f"Web search negative-cache hit for: {query}")
+        return None
+    if cached:
+        WEB_SEARCH_CACHE.labels(result="hit").inc()
+        logging.info(f"Web search cache hit for: {query}")
+        return cached
+    WEB_SEARCH_CACHE.labels(result="miss").inc()
     
-    # Fallback to DuckDuckGo Instant Answer
-    result = _search_with_duckduckgo(query)
+    with tracing.span("web_search"):
+        result, complete = _search_uncached(query, num_results)
     if result:
-        return result
+        cache_set(key, result, WEB_SEARCH_CACHE_TTL_SECONDS)
+    elif complete:
+        cache_set(key, _NO_RESULTS, WEB_SEARCH_NEGATIVE_TTL_SECONDS)
+    else:
+        logging.info(f"Web search cut short by the deadline, not caching the miss for: {query}")
+    return result
+
+def _normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so equivalent queries share a cache entry"""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+def _cache_key(query: str, num_results: int) -> str:
+    digest = hashlib.sha1(_normalize_query(query).encode("utf-8")).hexdigest()
+    return f"web_search:{num_results}:{digest}"
+
+def _search_uncached(query: str, num_results: int) -> Tuple[Optional[str], bool]:
+    """Query Serper and DuckDuckGo concurrently and merge their results; also returns the complete flag"""
+    logging.info(f"Web search for: {query}")
+    results, complete = search_web_results(query, num_results)
+    if not results:
+        logging.warning("Web search failed or unavailable")
+        return None, complete
+    return _format_results(results), complete
+
+def search_web_results(query: str, num_results: int = 3) -> Tuple[List[Dict], bool]:
+    """
+    Query every available engine concurrently under a shared deadline
+
+    Returns as soon as one engine alone yields num_results results; otherwise waits
+    for the rest (or the deadline) and merges everything, deduplicated by URL/title.
+    Each result is {"title", "snippet", "url", "engine"}.
+
+    The second value is False when the deadline cut the search short (the shared
+    WEB_SEARCH_DEADLINE_SECONDS budget ran out, or the request deadline expired and
+    clipped an engine's timeout); an engine that failed on its own counts as finished.
+    """
+    engines = {"duckduckgo": lambda: _search_with_duckduckgo(query)}
+    if SERPER_API_KEY and SERPER_API_KEY != "your_serper_api_key_here":
+        engines["serper"] = lambda: _search_with_serper(query, num_results)
+    
+    if deadline.expired():
+        logging.warning("Request deadline reached, skipping web search")
+        return [], False
+    budget = deadline.timeout(WEB_SEARCH_DEADLINE_SECONDS, reserve=DEADLINE_RESERVE_SECONDS)
+    stop_at = time.monotonic() + budget
+    
+    futures = {}
+    for name, fn in engines.items():
+        ctx = contextvars.copy_context()  # carry the request deadline into the worker thread
+        futures[_executor.submit(ctx.run, profiling.run_attached, _timed_engine, name, fn)] = name
     
-    logging.warning("Web search failed or unavailable")
-    return None
+    collected = {}
+    complete = True
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, stop_at - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            logging.warning(f"Web search deadline ({budget:.1f}s) hit, still waiting on: {', '.join(futures[f] for f in pending)}")
+            complete = False
+            break
+        for future in done:
+            name = futures[future]
+            try:
+                collected[name] = future.result() or []
+            except Exception:
+                collected[name] = []  # the engine logged its own failure
+                if deadline.expired():
+                    complete = False  # most likely a timeout clipped by the request deadline
+            if len(collected[name]) >= num_results:
+                logging.info(f"{name} returned a full result set, not waiting for other engines")
+                pending = set()
+                break
+    for future in futures:
+        future.cancel()  # no-op for engines already running; their results are dropped
+    
+    # Serper (Google) first, then DuckDuckGo, de-duplicated
+    merged = []
+    for name in ("serper", "duckduckgo"):
+        merged.extend(collected.get(name, []))
+    return _dedupe(merged), complete
+
+def _timed_engine(name: str, fn) -> List[Dict]:
+    # per-engine latency goes to the stage metrics; provider_stats only ranks the answer chain's steps
+    with tracing.span(f"web_search.{name}"):
+        return fn()
+
+def _dedupe(results: List[Dict]) -> List[Dict]:
+    """Drop results whose URL or normalized title was already seen"""
+    seen = set()
+    unique = []
+    for item in results:
+        keys = {k for k in (item.get("url", "").rstrip("/").lower(), _normalize_query(item.get("title", ""))) if k}
+        if keys & seen:
+            continue
+        seen |= keys
+        unique.append(item)
+    return unique
 
-def _search_with_serper(query: str, num_results: int) -> Optional[str]:
+def _format_results(results: List[Dict]) -> str:
+    """Render merged results as the markdown context block used by the answer synthesizer"""
+    blocks = []
+    for item in results:
+        if item.get("title"):
+            blocks.append(f"**{item['title']}**\n{item['snippet']}")
+        else:
+            blocks.append(f"• {item['snippet']}")
+    context = "\n\n".join(blocks)
+    return f"Web Search Results:\n\n{context}"
+
+def _search_with_serper(query: str, num_results: int) -> List[Dict]:
     """Search using Serper API (Google Search)"""
+    results = []
     try:
         url = "https://google.serper.dev/search"
         headers = {
@@ -40,31 +169,32 @@ def _search_with_serper(query: str, num_results: int) -> Optional[str]:
             "num": num_results
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=5)
+        response = http_pool.session().post(
+            url, headers=headers, json=payload,
+            timeout=http_pool.timeout(deadline.timeout(5, reserve=DEADLINE_RESERVE_SECONDS)))
         response.raise_for_status()
         data = response.json()
         
         # Extract organic results
-        results = []
         if "organic" in data:
             for item in data["organic"][:num_results]:
                 title = item.get("title", "")
                 snippet = item.get("snippet", "")
                 if title and snippet:
-                    results.append(f"**{title}**\n{snippet}")
+                    results.append({"title": title, "snippet": snippet, "url": item.get("link", ""), "engine": "serper"})
         
         if results:
-            context = "\n\n".join(results)
             logging.info(f"Serper API returned {len(results)} results")
-            return f"Web Search Results:\n\n{context}"
         
     except Exception as e:
         logging.warning(f"Serper API search failed: {e}")
+        raise  # a failure is not an empty result (see search_web_results)
     
-    return None
+    return results
 
-def _search_with_duckduckgo(query: str) -> Optional[str]:
+def _search_with_duckduckgo(query: str) -> List[Dict]:
     """Search using DuckDuckGo Instant Answer API (free, no API key)"""
+    results = []
     try:
         url = "https://api.duckduckgo.com/"
         params = {
@@ -79,7 +209,9 @@ def _search_with_duckduckgo(query: str) -> Optional[str]:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_pool.session().get(
+            url, params=params, headers=headers,
+            timeout=http_pool.timeout(deadline.timeout(10, reserve=DEADLINE_RESERVE_SECONDS)))
         response.raise_for_status()
         data = response.json()
         
@@ -90,33 +222,32 @@ def _search_with_duckduckgo(query: str) -> Optional[str]:
         if abstract and len(abstract) > 50:
             logging.info("DuckDuckGo returned abstract")
             source = data.get("AbstractSource", "web")
-            return f"**Information from {source}:**\n\n{abstract}"
+            results.append({"title": f"Information from {source}", "snippet": abstract,
+                            "url": data.get("AbstractURL", ""), "engine": "duckduckgo"})
         elif definition and len(definition) > 50:
             logging.info("DuckDuckGo returned definition")
             source = data.get("DefinitionSource", "dictionary")
-            return f"**Definition from {source}:**\n\n{definition}"
-        
-        # Try related topics
-        related = data.get("RelatedTopics", [])
-        if related:
-            snippets = []
-            for topic in related[:3]:
+            results.append({"title": f"Definition from {source}", "snippet": definition,
+                            "url": data.get("DefinitionURL", ""), "engine": "duckduckgo"})
+        else:
+            # Try related topics
+            for topic in data.get("RelatedTopics", [])[:3]:
                 if isinstance(topic, dict) and "Text" in topic:
                     text = topic.get("Text", "")
                     if len(text) > 30:  # Only meaningful snippets
-                        snippets.append(text)
-            
-            if snippets:
-                context = "\n\n• ".join(snippets)
-                logging.info(f"DuckDuckGo returned {len(snippets)} related topics")
-                return f"**Related Information:**\n\n• {context}"
+                        results.append({"title": "", "snippet": text,
+                                        "url": topic.get("FirstURL", ""), "engine": "duckduckgo"})
+            if results:
+                logging.info(f"DuckDuckGo returned {len(results)} related topics")
         
-        logging.info("DuckDuckGo returned no useful results")
+        if not results:
+            logging.info("DuckDuckGo returned no useful results")
         
     except Exception as e:
         logging.warning(f"DuckDuckGo search failed: {e}")
+        raise  # a failure is not an empty result (see search_web_results)
     
-    return None
+    return results
 
 def search_product_specs(product_name: str, brand: str = None) -> Optional[str]:
     """